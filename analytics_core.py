@@ -10,42 +10,168 @@ It is import-safe (does not call Ollama at import time) so it can be imported
 by UI modules without side-effects.
 """
 
+import asyncio
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
 import os
+import queue
+import threading
 import pandas as pd
 import numpy as np
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Union
 from dataclasses import dataclass
 from datetime import datetime
 import time
 
 # Local LLM client
 import ollama
+from context_builder import DEFAULT_NUM_CTX, DEFAULT_NUM_PREDICT, DEFAULT_PROMPT_BUDGET, answer_tokens, column_priority, compact_data_summary, compact_payload, estimate_tokens, prompt_budget_for, raw_data_summary
+from dataset_cache import get_dataset_cache
+from dtype_optimizer import OPTIMIZE_DTYPES, append_rows, optimize_dtypes
+import ingest
+from outliers import OUTLIER_METHOD
+from profiling import DatasetProfile, StreamingProfile
+from llm_cache import get_response_cache, make_cache_key
+from llm_client import LLMTimeoutError, OllamaRequestLayer, get_async_layer, run_coroutine
 
 # Set default Ollama host (can be overridden via env)
 os.environ.setdefault("OLLAMA_HOST", "http://localhost:11434")
 
+# Loading a model from disk can take much longer than answering a prompt
+WARMUP_TIMEOUT = float(os.environ.get("OLLAMA_WARMUP_TIMEOUT", "120"))
+
+# Files above this size are profiled chunk by chunk instead of loaded whole
+STREAMING_THRESHOLD_BYTES = int(float(os.environ.get("INGEST_STREAMING_THRESHOLD_MB", "1024")) * 1024 * 1024)
+INGEST_CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", "200000"))
+# Rows parsed for the instant preview shown while the full load runs
+PREVIEW_ROWS = int(os.environ.get("INGEST_PREVIEW_ROWS", "1000"))
+# Full loads running at once across sessions; each may hold a whole dataset in memory
+LOAD_WORKERS = int(os.environ.get("INGEST_LOAD_WORKERS", "2"))
+
+_load_executor = None
+_load_executor_lock = threading.Lock()
+
+
+def get_load_executor() -> ThreadPoolExecutor:
+	"""Process-wide worker pool for background dataset loads."""
+	global _load_executor
+	with _load_executor_lock:
+		if _load_executor is None:
+			_load_executor = ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="ingest")
+		return _load_executor
+
 @dataclass
 class AnalysisResult:
 	"""Structure for analysis results"""
 	analysis_type: str
 	results: Dict[str, Any]
-	insights: str
+	# Full text, or a chunk iterator for streamed analyses until it is consumed
+	insights: Union[str, Iterator[str]]
 	visualizations: List[Dict] = None
 	timestamp: str = None
+	# "[ERROR] ..." message of a streamed answer that failed; `insights` keeps any text received before it
+	error: Optional[str] = None
 
 	def __post_init__(self):
 		if self.timestamp is None:
 			self.timestamp = datetime.now().isoformat()
 
 
+class StartedStream:
+	"""Chunks of a stream pulled by a background thread from the moment it is created.
+
+	A streamed analysis hands one of these out as its insights, so the request
+	to Ollama is under way while charts are built. `seconds` is the time from
+	creation to the last chunk, once the stream has ended. A failure, even
+	after some text arrived, is kept in `error` as the "[ERROR] ..." message
+	rather than passed on as a chunk. Closing the iterator early closes the
+	underlying stream, which cancels the request.
+	"""
+
+	_END = object()
+
+	def __init__(self, chunks: Iterator[str]):
+		self.started = time.time()
+		self.seconds: Optional[float] = None
+		self.error: Optional[str] = None
+		self._queue: "queue.Queue" = queue.Queue()
+		self._abandoned = threading.Event()
+		threading.Thread(target=self._pull, args=(chunks,), name="llm-stream", daemon=True).start()
+
+	def _pull(self, chunks: Iterator[str]):
+		try:
+			with closing(chunks):
+				for chunk in chunks:
+					if self._abandoned.is_set():
+						return
+					if chunk.startswith("[ERROR]"):
+						self.error = chunk
+						continue
+					self._queue.put(chunk)
+		except Exception as e:
+			self.error = f"[ERROR] Error communicating with Ollama: {e}"
+		finally:
+			self.seconds = time.time() - self.started
+			self._queue.put(self._END)
+
+	def __iter__(self) -> Iterator[str]:
+		try:
+			while True:
+				chunk = self._queue.get()
+				if chunk is self._END:
+					return
+				yield chunk
+		finally:
+			self._abandoned.set()
+
+
 class OllamaAnalyticsAgent:
 	"""Enhanced AI Data Analytics Agent using Ollama local models"""
 
-	def __init__(self, model_name: str = "llama3"):
+	def __init__(self, model_name: str = "llama3", timeout: float = None, keep_alive: str = None, reuse_context: bool = None, prompt_budget: int = None, warm_up: bool = False, optimize_dtypes: bool = None, parse_engine: str = None, num_ctx: int = None):
 		self.model_name = model_name
 		self.conversation_history: List[Dict[str, Any]] = []
 		self.data_cache: Dict[str, Any] = {}
+		self.llm = OllamaRequestLayer()
+		# Async layer is process-wide so its concurrency bound spans sessions
+		self.allm = get_async_layer()
+		# Shared on-disk response cache; None when disabled or not writable
+		self.response_cache = get_response_cache()
+		# Parsed datasets as memory-mappable Arrow files; None when disabled
+		self.dataset_cache = get_dataset_cache()
+		# Convert loaded frames to compact dtypes (category, datetime, narrow numbers)
+		self.optimize_dtypes = OPTIMIZE_DTYPES if optimize_dtypes is None else optimize_dtypes
+		# 'auto' (pyarrow for larger files when installed), 'pandas' or 'pyarrow'
+		self.parse_engine = parse_engine or ingest.PARSE_ENGINE
+		# Background loads of one agent never overlap; a load superseded before it starts is skipped
+		self._load_lock = threading.Lock()
+		self._generation_lock = threading.Lock()
+		self._load_generation = 0
+		self._pending_load: Optional[Future] = None
+		self._profile_lock = threading.Lock()
+		# Per-call deadline in seconds for LLM requests
+		self.timeout = self.llm.timeout if timeout is None else timeout
+		# Keep the model (and its KV cache for the dataset prefix) resident between calls
+		self.keep_alive = keep_alive or os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+		# Opt-in: prefill the prompt prefix once and pass Ollama's `context` tokens afterwards
+		if reuse_context is None:
+			reuse_context = os.environ.get('OLLAMA_REUSE_CONTEXT', '').lower() in ('1', 'true', 'yes')
+		self.reuse_context = reuse_context
+		self._prefix_lock = threading.Lock()
+		# Context window sent with every request (a different num_ctx makes Ollama reload the model)
+		self.num_ctx = num_ctx or DEFAULT_NUM_CTX
+		self.num_predict = DEFAULT_NUM_PREDICT
+		# Estimated token budget for data context + statistics in each prompt
+		if prompt_budget is None:
+			prompt_budget = DEFAULT_PROMPT_BUDGET if num_ctx is None else prompt_budget_for(self.num_ctx, self.num_predict)
+		self.prompt_budget = prompt_budget
+		# Model preload state: idle -> loading -> ready | failed
+		self.warmup_status = 'idle'
+		self.warmup_seconds = None
+		self.warmup_error = None
+		self._warmup_done = threading.Event()
 
 		# Note: do not raise on import-time failures; just log and continue.
 		try:
@@ -72,51 +198,300 @@ class OllamaAnalyticsAgent:
 			# If Ollama is not reachable at init, we defer errors until a call is made.
 			pass
 
-	def ask_ollama_stream(self, prompt: str, context: str = None) -> str:
-		"""Call Ollama with a composed prompt; returns text or error string."""
+		if warm_up:
+			self.warm_up()
+
+	def warm_up(self, timeout: float = None) -> None:
+		"""Load the model into Ollama in the background and keep it resident.
+
+		Sends an empty prompt, which makes Ollama load the model without generating,
+		with `keep_alive` so it stays loaded. Returns immediately; see `is_ready`.
+		"""
+		if self.warmup_status in ('loading', 'ready'):
+			return
+		self.warmup_status = 'loading'
+		self.warmup_error = None
+		self._warmup_done.clear()
+		timeout = WARMUP_TIMEOUT if timeout is None else timeout
+
+		def _load():
+			t0 = time.time()
+			try:
+				self.llm.generate(self.model_name, '', options={'num_ctx': self.num_ctx}, timeout=timeout, keep_alive=self.keep_alive)
+				self.warmup_seconds = time.time() - t0
+				self.warmup_status = 'ready'
+			except Exception as e:
+				self.warmup_error = str(e)
+				self.warmup_status = 'failed'
+			finally:
+				self._warmup_done.set()
+
+		threading.Thread(target=_load, name='ollama-warmup', daemon=True).start()
+
+	def is_ready(self) -> bool:
+		"""True once the warm-up has loaded the model."""
+		return self.warmup_status == 'ready'
+
+	def wait_until_ready(self, timeout: float = None) -> bool:
+		"""Block until a started warm-up finishes; returns `is_ready()`."""
+		if self.warmup_status != 'idle':
+			self._warmup_done.wait(timeout)
+		return self.is_ready()
+
+	def _generation_options(self, prompt: str) -> Dict[str, Any]:
+		# Set the window explicitly and keep the answer within what the prompt leaves of it
+		return {
+			'temperature': 0.7,
+			'top_p': 0.9,
+			'num_ctx': self.num_ctx,
+			'num_predict': answer_tokens(prompt, self.num_ctx, self.num_predict),
+		}
+
+	def stream_ollama(self, prompt: str, context: str = None, timeout: float = None, use_cache: bool = True) -> Iterator[str]:
+		"""Yield response chunks from Ollama as they are generated.
+
+		Errors are yielded as a single "[ERROR] ..." chunk so callers can render
+		the stream without special casing failures. The request is cancelled once
+		`timeout` (default: `self.timeout`) seconds have passed. Set `use_cache`
+		to False to bypass the persistent response cache for this call.
+		"""
+		enhanced_prompt = self._build_enhanced_prompt(prompt, context)
+		options = self._generation_options(enhanced_prompt)
+		cache_key, cached = self._lookup_cache(enhanced_prompt, options, use_cache)
+		parts: List[str] = []
+		t0 = time.time()
+		# kept locally for the history entry: data_cache is shared with concurrent streams
+		ttft = elapsed = metrics = None
+		self.data_cache['last_ollama_ttft'] = None
+		self.data_cache['last_ollama_cached'] = cached is not None
+		self.data_cache['last_ollama_metrics'] = None
+
+		if cached is not None:
+			ttft = elapsed = time.time() - t0
+			self.data_cache['last_ollama_ttft'] = self.data_cache['last_ollama_time'] = elapsed
+			parts.append(cached)
+			yield cached
+		else:
+			try:
+				timeout = self.timeout if timeout is None else timeout
+				request_prompt, request_kwargs = self._request_args(prompt, context, timeout)
+				for chunk in self.llm.stream(self.model_name, request_prompt, options=options, timeout=timeout, **request_kwargs):
+					if chunk.get('done'):
+						metrics = self.data_cache['last_ollama_metrics'] = self._eval_metrics(chunk)
+					text = chunk.get('response', '')
+					if not text:
+						continue
+					if not parts:
+						ttft = self.data_cache['last_ollama_ttft'] = time.time() - t0
+					parts.append(text)
+					yield text
+			except LLMTimeoutError:
+				self.data_cache['last_ollama_time'] = None
+				yield "[ERROR] Ollama timeout"
+				return
+			except Exception as e:
+				self.data_cache['last_ollama_time'] = None
+				yield f"[ERROR] Error communicating with Ollama: {e}"
+				return
+			elapsed = self.data_cache['last_ollama_time'] = time.time() - t0
+
+		full_response = ''.join(parts)
+		if not full_response:
+			yield "[ERROR] Ollama returned no 'response' field."
+			return
+		self._record_response(prompt, full_response, cache_key, cached is not None, elapsed, ttft, metrics)
+
+	async def aask_ollama(self, prompt: str, context: str = None, timeout: float = None, use_cache: bool = True) -> str:
+		"""Async counterpart of `ask_ollama_stream` on the shared, concurrency-bounded layer."""
 		enhanced_prompt = self._build_enhanced_prompt(prompt, context)
+		options = self._generation_options(enhanced_prompt)
+		cache_key, cached = self._lookup_cache(enhanced_prompt, options, use_cache)
+		if cached is not None:
+			self._record_response(prompt, cached, cache_key, True, 0.0, 0.0)
+			return cached
+		t0 = time.time()
 		try:
-			# Use a short prediction budget for interactive requests
-			options = {
-				'temperature': 0.7,
-				'top_p': 0.9,
-				'num_predict': 512,
-			}
+			timeout = self.timeout if timeout is None else timeout
+			request_prompt, request_kwargs = await asyncio.to_thread(self._request_args, prompt, context, timeout)
+			response = await self.allm.generate(self.model_name, request_prompt, options=options, timeout=timeout, **request_kwargs)
+		except LLMTimeoutError:
+			return "[ERROR] Ollama timeout"
+		except Exception as e:
+			return f"[ERROR] Error communicating with Ollama: {e}"
+		full_response = response.get('response', None)
+		if not full_response:
+			return "[ERROR] Ollama returned no 'response' field."
+		self._record_response(prompt, full_response, cache_key, False, time.time() - t0, None, self._eval_metrics(response))
+		return full_response
 
-			# Execute in a worker with a timeout to avoid blocking callers
-			import concurrent.futures
+	def _request_args(self, prompt: str, context: str, timeout: float):
+		"""Prompt and extra generate() arguments for one request.
 
-			def _gen():
-				return ollama.generate(model=self.model_name, prompt=enhanced_prompt, options=options)
+		By default the full prompt is sent; its prefix is byte-identical across
+		analyses so Ollama can reuse the cached prefill. With `reuse_context` the
+		prefix is evaluated once and only the question is sent with its tokens.
+		"""
+		kwargs = {'keep_alive': self.keep_alive}
+		if self.reuse_context and context:
+			tokens = self._prefix_tokens(self._build_prompt_prefix(context), timeout)
+			if tokens:
+				kwargs['context'] = tokens
+				return self._build_prompt_question(prompt), kwargs
+		return self._build_enhanced_prompt(prompt, context), kwargs
 
-			with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-				future = executor.submit(_gen)
-				try:
-					t0 = time.time()
-					response = future.result(timeout=30)
-					t1 = time.time()
-					self.data_cache['last_ollama_time'] = t1 - t0
-				except concurrent.futures.TimeoutError:
-					future.cancel()
-					self.data_cache['last_ollama_time'] = None
-					return "[ERROR] Ollama timeout"
-
-			full_response = response.get('response', None)
-			if not full_response:
-				return "[ERROR] Ollama returned no 'response' field."
-
-			# store conversation
-			self.conversation_history.append({
-				'prompt': prompt,
-				'response': full_response,
-				'timestamp': datetime.now().isoformat(),
-				'ollama_time': self.data_cache.get('last_ollama_time')
-			})
-			return full_response
+	def _prefix_tokens(self, prefix: str, timeout: float):
+		"""Ollama `context` tokens for `prefix`, evaluated once per model and dataset."""
+		key = hashlib.sha256(f"{self.model_name}\0{prefix}".encode('utf-8')).hexdigest()
+		with self._prefix_lock:
+			entry = self.data_cache.get('prefix_context')
+			if entry and entry['key'] == key:
+				return entry['tokens']
+			try:
+				response = self.llm.generate(self.model_name, prefix, options={'num_ctx': self.num_ctx, 'num_predict': 1}, timeout=timeout, keep_alive=self.keep_alive)
+			except Exception:
+				# fall back to sending the full prompt
+				return None
+			tokens = response.get('context')
+			generated = response.get('eval_count')
+			if tokens and generated is not None:
+				# the context ends with the token generated to close the request; keep only the prefix's own
+				tokens = tokens[:len(tokens) - generated] if generated else tokens
+			else:
+				# cannot tell the prefix from generated tokens, so send the full prompt instead
+				tokens = None
+			self.data_cache['prefix_context'] = {'key': key, 'tokens': tokens, 'metrics': self._eval_metrics(response)}
+			return tokens
+
+	@staticmethod
+	def _eval_metrics(chunk: Dict[str, Any]) -> Dict[str, Any]:
+		"""Prefill/decode counters from Ollama's final chunk; durations in seconds."""
+		def _seconds(key):
+			value = chunk.get(key)
+			return value / 1e9 if value is not None else None
+		return {
+			'prompt_eval_count': chunk.get('prompt_eval_count'),
+			'prompt_eval_seconds': _seconds('prompt_eval_duration'),
+			'eval_count': chunk.get('eval_count'),
+			'eval_seconds': _seconds('eval_duration'),
+			'load_seconds': _seconds('load_duration'),
+		}
+
+	def _lookup_cache(self, enhanced_prompt: str, options: Dict[str, Any], use_cache: bool):
+		"""Return (cache key, cached response); both None when the cache is bypassed."""
+		if not use_cache or self.response_cache is None:
+			return None, None
+		cache_key = make_cache_key(self.model_name, enhanced_prompt, options)
+		return cache_key, self.response_cache.get(cache_key)
+
+	def _record_response(self, prompt: str, response: str, cache_key: str, cached: bool, ollama_time: float, ollama_ttft: float, metrics: Dict[str, Any] = None):
+		if cache_key is not None and not cached:
+			try:
+				self.response_cache.put(cache_key, response, model=self.model_name)
+			except Exception:
+				# a full or read-only cache must not fail the analysis
+				pass
+
+		# store conversation
+		self.conversation_history.append({
+			'prompt': prompt,
+			'response': response,
+			'timestamp': datetime.now().isoformat(),
+			'ollama_time': ollama_time,
+			'ollama_ttft': ollama_ttft,
+			'cached': cached,
+			'metrics': metrics
+		})
+
+	def ask_ollama_stream(self, prompt: str, context: str = None, timeout: float = None, use_cache: bool = True) -> str:
+		"""Call Ollama with a composed prompt; returns text or error string.
+
+		Returns at the deadline: the request layer cancels the generation rather
+		than waiting for Ollama to finish it.
+		"""
+		try:
+			parts = []
+			for chunk in self.stream_ollama(prompt, context, timeout=timeout, use_cache=use_cache):
+				if chunk.startswith("[ERROR]"):
+					# drop any partial text so callers see only the error
+					return chunk
+				parts.append(chunk)
+			return ''.join(parts)
 		except Exception as e:
 			return f"[ERROR] Error communicating with Ollama: {e}"
 
+	def _ask(self, prompt: str, stream: bool = False, use_cache: bool = True):
+		"""Ask about the loaded dataset; returns a chunk iterator when `stream` is set."""
+		context = self.data_cache.get('data_summary', '')
+		if stream:
+			# started now, so the model works on the prompt while the caller builds charts
+			return StartedStream(self.stream_ollama(prompt, context, use_cache=use_cache))
+		return self.ask_ollama_stream(prompt, context, use_cache=use_cache)
+
+	async def _arun_analysis(self, prepare, finish, args: tuple, use_cache: bool = True) -> AnalysisResult:
+		"""Run one analysis with pandas work off the event loop and an async LLM call."""
+		prompt, state = await asyncio.to_thread(prepare, *args)
+		t0 = time.time()
+		insights = await self.aask_ollama(prompt, self.data_cache.get('data_summary', ''), use_cache=use_cache)
+		ollama_seconds = time.time() - t0
+		result = await asyncio.to_thread(finish, state, insights)
+		timings = result.results.get('timings')
+		if isinstance(timings, dict):
+			# data_cache timings are shared between concurrent analyses; use our own
+			timings['ollama_seconds'] = ollama_seconds
+		return result
+
+	async def arun_analyses(self, data: pd.DataFrame, target_column: str = None, query: str = None, use_cache: bool = True) -> Dict[str, AnalysisResult]:
+		"""Run every analysis concurrently; the custom one only when `query` is given."""
+		jobs = {
+			'descriptive': self.adescriptive_analytics(data, use_cache=use_cache),
+			'predictive': self.apredictive_analytics(data, target_column, use_cache=use_cache),
+			'data_cleaning': self.adata_cleaning_suggestions(data, use_cache=use_cache),
+			'visualization': self.avisualization_suggestions(data, use_cache=use_cache),
+		}
+		if query:
+			jobs['custom'] = self.acustom_analysis(data, query, use_cache=use_cache)
+		results = await asyncio.gather(*jobs.values())
+		return dict(zip(jobs.keys(), results))
+
+	def run_all_analyses(self, data: pd.DataFrame, target_column: str = None, query: str = None, use_cache: bool = True) -> Dict[str, AnalysisResult]:
+		"""Blocking wrapper around `arun_analyses` using the process-wide event loop."""
+		return run_coroutine(self.arun_analyses(data, target_column, query, use_cache))
+
+	def _attach_stream(self, result: AnalysisResult) -> AnalysisResult:
+		"""Finalize a result whose `insights` is still a chunk iterator.
+
+		Once the stream is consumed `insights` is replaced by the full text and the
+		Ollama timing of this stream is filled in, so streamed results look like
+		blocking ones. A stream that failed sets `error`; its `insights` are the
+		text received before the failure, or the error itself when there was none.
+		"""
+		if isinstance(result.insights, str):
+			return result
+		chunks = result.insights
+
+		def _consume():
+			started = time.time()
+			parts = []
+			for chunk in chunks:
+				parts.append(chunk)
+				yield chunk
+			result.error = getattr(chunks, 'error', None)
+			result.insights = ''.join(parts) or result.error or ''
+			timings = result.results.get('timings')
+			if isinstance(timings, dict):
+				# time of this stream only; concurrent streams share data_cache
+				seconds = getattr(chunks, 'seconds', None)
+				timings['ollama_seconds'] = seconds if seconds is not None else time.time() - started
+
+		result.insights = _consume()
+		return result
+
 	def _build_enhanced_prompt(self, user_prompt: str, context: str = None) -> str:
+		return self._build_prompt_prefix(context) + self._build_prompt_question(user_prompt)
+
+	def _build_prompt_prefix(self, context: str = None) -> str:
+		# Everything shared by all analyses of a dataset goes first, in a fixed
+		# order, so the prefill for it can be reused across analysis types.
 		system_prompt = (
 			"You are an expert data analyst AI assistant. Your responses should be:\n"
 			"1. Accurate and data-driven\n"
@@ -127,32 +502,89 @@ class OllamaAnalyticsAgent:
 			"When analyzing data, always consider:\n- Data quality and completeness\n- Statistical significance\n- Business implications\n- Potential limitations\n"
 		)
 		if context:
-			return f"{system_prompt}\n\nData Context:\n{context}\n\nUser Question: {user_prompt}\n\nProvide a comprehensive analysis:"
-		return f"{system_prompt}\n\nUser Question: {user_prompt}\n\nProvide a comprehensive analysis:"
+			return f"{system_prompt}\n\nData Context:\n{context}\n\n"
+		return f"{system_prompt}\n\n"
+
+	def _build_prompt_question(self, user_prompt: str) -> str:
+		return f"User Question: {user_prompt}\n\nProvide a comprehensive analysis:"
 
-	def load_and_analyze_data(self, file_path: str) -> pd.DataFrame:
-		"""Load a dataset from CSV/Excel/JSON and cache a lightweight summary."""
+	def load_and_analyze_data(self, file_path: str, content_hash: str = None, streaming: bool = None, sheet_name=None,
+			columns: List[str] = None, filters=None, table: str = None, query: str = None) -> pd.DataFrame:
+		"""Load a dataset from CSV/Excel/JSON/Parquet/Feather/SQLite and cache a lightweight summary.
+
+		Parsed frames are kept in the columnar dataset cache keyed by the file's
+		content, so reopening the same bytes skips parsing. Pass `content_hash`
+		(SHA-256 of the file) when it is already known to avoid hashing again.
+		A CSV or JSON-lines file that is a cached one plus trailing rows (a
+		growing daily export) is loaded by parsing only the new rows.
+
+		With `streaming` (default: CSV and JSON-lines files larger than
+		INGEST_STREAMING_THRESHOLD_MB) the file is read in chunks into a
+		`StreamingProfile` and the returned frame is its bounded row sample;
+		analyses of that frame take exact counts, moments and missing values
+		from the profile. Profiles are cached the same way, and extended with
+		only the new rows of a file that grew.
+
+		`sheet_name` selects the worksheet of an Excel file (default: the
+		first); see `list_sheets`. `table` or `query` select the data of a
+		SQLite database; see `list_tables`. `columns` and `filters` (see
+		`ingest.read_file`) are pushed down to Parquet, Feather and SQLite
+		readers, so wide files load in time proportional to the columns used.
+		"""
 		try:
-			low = file_path.lower()
-			if low.endswith('.csv'):
-				data = pd.read_csv(file_path)
-			elif low.endswith('.xlsx') or low.endswith('.xls'):
-				# prefer openpyxl engine when available
-				try:
-					data = pd.read_excel(file_path, engine='openpyxl')
-				except Exception:
-					# fallback to default engine
-					data = pd.read_excel(file_path)
-			elif low.endswith('.json'):
+			started = time.perf_counter()
+			selective = bool(columns or filters)
+			if streaming is None:
+				streaming = not selective and ingest.can_stream(file_path) and ingest.data_size(file_path) > STREAMING_THRESHOLD_BYTES
+			self.data_cache.pop('appended_rows', None)
+			if streaming:
+				profile = self._stream_profile(file_path, content_hash)
+				self.data_cache['profile'] = profile
+				self.data_cache['current_data'] = profile.sample
+				self.data_cache['dataset_key'] = None
+				self.data_cache['load'] = {
+					'source': 'stream', 'engine': self.data_cache.pop('parse_engine', None), 'seconds': time.perf_counter() - started,
+					'profile_source': self.data_cache.pop('profile_source', 'parse'), 'appended_rows': self.data_cache.get('appended_rows'), **profile.to_dict(),
+				}
+				self.data_cache['data_summary'] = self._generate_data_summary(profile.sample)
+				return profile.sample
+
+			key = None
+			variant = None
+			data = None
+			base = None
+			appendable = not selective and ingest.can_append(file_path)
+			# Parquet and Feather are already columnar; the cache would only duplicate them
+			if self.dataset_cache is not None and not ingest.is_columnar(file_path):
 				try:
-					data = pd.read_json(file_path)
-				except ValueError:
-					# try treating as ndjson / lines
-					data = pd.read_json(file_path, lines=True)
-			else:
-				raise ValueError("Unsupported file format. Use CSV, Excel, or JSON.")
+					# engines differ in type inference, so each gets its own entry
+					variant = f"{ingest.pick_engine(file_path, self.parse_engine)}|{'dtypes' if self.optimize_dtypes else ''}|{sheet_name!r}"
+					if selective or table or query:
+						variant += f"|{table!r}|{query!r}|{columns!r}|{filters!r}"
+					base = self._find_base(file_path, variant, content_hash, appendable, before_key=True)
+					key = self.dataset_cache.key_for(file_path, content_hash, variant=variant)
+					data = self.dataset_cache.get(key)
+				except OSError:
+					key = None
+			source = 'cache' if data is not None else 'parse'
+			engine = None
+			self.data_cache.pop('dtype_report', None)
+			if data is None and key is not None and appendable:
+				base = base or self._find_base(file_path, variant, content_hash, appendable, before_key=False)
+				data, engine = self._load_appended(file_path, base)
+				if data is not None:
+					source = 'append'
+			if data is None:
+				data, engine = ingest.read_file(file_path, self.parse_engine, sheet_name=sheet_name, columns=columns, filters=filters, table=table, query=query)
+				if self.optimize_dtypes:
+					data, self.data_cache['dtype_report'] = optimize_dtypes(data)
+			if key is not None and source != 'cache' and self.dataset_cache.put(key, data):
+				self.dataset_cache.remember_source(file_path, key, variant, content_hash)
 
+			self.data_cache.pop('profile', None)
 			self.data_cache['current_data'] = data
+			self.data_cache['dataset_key'] = key
+			self.data_cache['load'] = {'source': source, 'engine': engine, 'seconds': time.perf_counter() - started, 'appended_rows': self.data_cache.get('appended_rows')}
 			self.data_cache['data_summary'] = self._generate_data_summary(data)
 			return data
 		except Exception as e:
@@ -164,89 +596,305 @@ class OllamaAnalyticsAgent:
 				pass
 			return None
 
+	def preview_data(self, file_path: str, rows: int = None, **options) -> pd.DataFrame:
+		"""The first `rows` (default INGEST_PREVIEW_ROWS) rows of a dataset, for display before the full load.
+
+		Takes the selection options of `load_and_analyze_data`; reads about as
+		much as it returns, whatever the file size. Returns None on errors,
+		recorded in `data_cache['load_error']`.
+		"""
+		try:
+			options.pop('content_hash', None)
+			options.pop('streaming', None)
+			return ingest.read_head(file_path, rows or PREVIEW_ROWS, self.parse_engine, **options)
+		except Exception as e:
+			self.data_cache['load_error'] = str(e)
+			return None
+
+	def load_in_background(self, file_path: str, **options) -> Future:
+		"""Run `load_and_analyze_data` on the shared load pool; the future resolves to its result.
+
+		Each call supersedes the earlier ones: a load that has not started yet
+		is cancelled (or, if already picked up, resolves to None without
+		loading), and one still running is followed by the newest. So the
+		newest request is always the last to write `data_cache`, whatever
+		order the loads finish or acquire the lock in.
+		"""
+		with self._generation_lock:
+			self._load_generation += 1
+			generation = self._load_generation
+			if self._pending_load is not None:
+				self._pending_load.cancel()
+
+		def _load():
+			with self._load_lock:
+				if generation != self._load_generation:
+					return None
+				return self.load_and_analyze_data(file_path, **options)
+		future = get_load_executor().submit(_load)
+		with self._generation_lock:
+			if generation == self._load_generation:
+				self._pending_load = future
+		return future
+
+	def list_sheets(self, file_path: str) -> List[str]:
+		"""Worksheet names of an Excel file, without loading any of them."""
+		return ingest.excel_sheets(file_path)
+
+	def list_tables(self, file_path: str) -> List[str]:
+		"""Tables and views of a SQLite database."""
+		return ingest.sqlite_tables(file_path)
+
+	def list_columns(self, file_path: str, table: str = None, query: str = None) -> List[str]:
+		"""Column names of a Parquet, Feather or SQLite source, without reading its rows."""
+		return ingest.list_columns(file_path, table, query)
+
+	def _find_base(self, file_path: str, variant: str, content_hash: str, appendable: bool, before_key: bool):
+		"""The cached source `file_path` extends (see `DatasetCache.find_base`), looked up at the cheaper moment.
+
+		Without `content_hash` the file has to be hashed for its key anyway, so
+		the lookup runs before the key (`before_key`) and shares that read.
+		With it, the lookup waits until the key has missed, and only then reads
+		the prefix.
+		"""
+		if not appendable or before_key != (content_hash is None):
+			return None
+		try:
+			return self.dataset_cache.find_base(file_path, variant, content_hash)
+		except OSError:
+			# no earlier version to build on: a normal full load
+			return None
+
+	def _load_appended(self, file_path: str, base: Optional[Dict[str, Any]]):
+		"""(frame, engine) for a file that extends a cached one: the cached rows plus only the new ones parsed.
+
+		(None, None) when no cached version (`base`, from `_find_base`) is a
+		prefix of the file or the new rows do not fit its columns and types.
+		"""
+		try:
+			old = self.dataset_cache.get(base['key']) if base else None
+			if old is None:
+				return None, None
+			text_columns = [c for c in old.columns if not (pd.api.types.is_numeric_dtype(old[c]) or pd.api.types.is_datetime64_any_dtype(old[c]))]
+			new_rows, engine = ingest.read_appended(file_path, base['size'], list(old.columns), self.parse_engine, text_columns)
+			data = append_rows(old, new_rows)
+		except Exception:
+			# any surprise in the new rows means a normal full load
+			return None, None
+		if data is None:
+			return None, None
+		self.data_cache['appended_rows'] = len(new_rows)
+		return data, engine
+
+	def _stream_profile(self, file_path: str, content_hash: str = None) -> StreamingProfile:
+		"""Profile a file chunk by chunk without holding it in memory.
+
+		The profile is cached by file content. When the file extends a file
+		profiled before, that profile is merged with a profile of the new rows
+		only; `data_cache['profile_source']` tells which of 'parse', 'cache' and
+		'append' happened.
+		"""
+		key = variant = base = None
+		appendable = ingest.can_append(file_path)
+		if self.dataset_cache is not None:
+			try:
+				variant = f"profile|{ingest.pick_engine(file_path, self.parse_engine)}"
+				base = self._find_base(file_path, variant, content_hash, appendable, before_key=True)
+				key = self.dataset_cache.key_for(file_path, content_hash, variant=variant)
+				profile = self.dataset_cache.get_object(key)
+				if isinstance(profile, StreamingProfile):
+					self.data_cache['profile_source'] = 'cache'
+					return profile
+			except OSError:
+				key = None
+		profile = None
+		if key is not None and appendable:
+			base = base or self._find_base(file_path, variant, content_hash, appendable, before_key=False)
+			profile = self._extend_profile(file_path, base)
+		if profile is None:
+			self.data_cache['profile_source'] = 'parse'
+			profile = self._profile_with_fallback(file_path)
+		if key is not None and self.dataset_cache.put_object(key, profile):
+			self.dataset_cache.remember_source(file_path, key, variant, content_hash)
+		return profile
+
+	def _extend_profile(self, file_path: str, base: Optional[Dict[str, Any]]):
+		"""The cached profile of `base`, the file this one extends, updated with the new rows; None when there is none."""
+		profile = self.dataset_cache.get_object(base['key']) if base else None
+		if not isinstance(profile, StreamingProfile):
+			return None
+		try:
+			new_rows = self._profile_with_fallback(file_path, offset=base['size'], like=profile)
+		except Exception:
+			return None
+		profile.merge(new_rows)
+		self.data_cache['profile_source'] = 'append'
+		self.data_cache['appended_rows'] = new_rows.rows
+		return profile
+
+	def _profile_with_fallback(self, file_path: str, offset: int = 0, like: StreamingProfile = None) -> StreamingProfile:
+		try:
+			return self._profile_chunks(file_path, self.parse_engine, offset, like)
+		except Exception:
+			if ingest.pick_engine(file_path, self.parse_engine) == 'pandas':
+				raise
+			# pyarrow fixes column types on the first block; start over with pandas
+			return self._profile_chunks(file_path, 'pandas', offset, like)
+
+	def _profile_chunks(self, file_path: str, engine: str, offset: int = 0, like: StreamingProfile = None) -> StreamingProfile:
+		"""Profile the file, or only its rows after byte `offset` with the columns and kinds of `like`."""
+		profile = StreamingProfile() if like is None else like.empty_like()
+		text_columns = [c for c, kind in like.kinds.items() if kind == 'categorical'] if like is not None else ()
+		chunks, engine = ingest.read_chunks(file_path, INGEST_CHUNK_ROWS, engine, offset, profile.columns or None, text_columns)
+		with closing(chunks):
+			for chunk in chunks:
+				profile.update(chunk)
+		self.data_cache['parse_engine'] = engine
+		return profile
+
+	def _profile_for(self, data: pd.DataFrame):
+		"""The streaming profile behind `data` when it is the sample of a streamed file."""
+		profile = self.data_cache.get('profile')
+		if profile is not None and data is profile.sample:
+			return profile
+		return None
+
+	def _dataset_profile(self, data: pd.DataFrame) -> DatasetProfile:
+		"""The shared column profile of `data`, built on first use for each loaded frame."""
+		with self._profile_lock:
+			profile = self.data_cache.get('dataset_profile')
+			if profile is None or not profile.describes(data):
+				# the cache key names the loaded frame's content, so other sessions' results for it can be reused
+				fingerprint = self.data_cache.get('dataset_key') if data is self.data_cache.get('current_data') else None
+				profile = DatasetProfile(data, fingerprint)
+				self.data_cache['dataset_profile'] = profile
+			return profile
+
 	def _generate_data_summary(self, data: pd.DataFrame) -> str:
-		parts = []
-		parts.append(f"Dataset shape: {data.shape[0]} rows, {data.shape[1]} columns")
-		numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-		categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
-		datetime_cols = data.select_dtypes(include=['datetime64']).columns.tolist()
-		parts.append(f"Numeric columns ({len(numeric_cols)}): {numeric_cols}")
-		parts.append(f"Categorical columns ({len(categorical_cols)}): {categorical_cols}")
-		if datetime_cols:
-			parts.append(f"DateTime columns ({len(datetime_cols)}): {datetime_cols}")
-		missing_info = data.isnull().sum()
-		if missing_info.sum() > 0:
-			parts.append(f"Missing values: {missing_info[missing_info > 0].to_dict()}")
-		parts.append(f"Sample data:\n{data.head(3).to_string()}")
-		if len(numeric_cols) > 0:
-			parts.append(f"Numeric summary:\n{data[numeric_cols].describe().to_string()}")
-		return "\n".join(parts)
+		"""Dataset context for the prompt prefix, fitted to half of the prompt budget."""
+		profile = self._dataset_profile(data)
+		priority = column_priority(data, profile)
+		self.data_cache['column_priority'] = priority
+		summary = compact_data_summary(data, self.prompt_budget // 2, priority, profile=self._profile_for(data) or profile)
+		self.data_cache['data_summary_tokens'] = {'raw': estimate_tokens(raw_data_summary(data, profile)), 'compact': estimate_tokens(summary)}
+		return summary
+
+	def _fit_payload(self, payload: Dict[str, Any]):
+		"""Render analysis statistics into what the data context leaves of the budget.
+
+		Returns the prompt text and a report of estimated prompt tokens and the
+		tokens saved against the uncompacted context and statistics.
+		"""
+		context_tokens = estimate_tokens(self._build_prompt_prefix(self.data_cache.get('data_summary', '')))
+		# keep room for the question wording around the statistics
+		remaining = max(self.prompt_budget - context_tokens - 150, 256)
+		text = compact_payload(payload, remaining, self.data_cache.get('column_priority'))
+		payload_tokens = estimate_tokens(text)
+		summary_tokens = self.data_cache.get('data_summary_tokens', {})
+		saved = estimate_tokens(json.dumps(payload, indent=2, default=str)) - payload_tokens
+		saved += summary_tokens.get('raw', 0) - summary_tokens.get('compact', 0)
+		return text, {
+			'budget_tokens': self.prompt_budget,
+			'estimated_prompt_tokens': context_tokens + payload_tokens + 150,
+			'tokens_saved': max(saved, 0),
+		}
 
 	# Descriptive, predictive, cleaning and visualization helper methods
 	# (copied from the original implementation)
-	def descriptive_analytics(self, data: pd.DataFrame) -> AnalysisResult:
+	#
+	# Each analysis is split into a `_prepare_*` step (statistics and prompt) and a
+	# `_finish_*` step (visualizations and result) around the LLM call, so the
+	# same code backs the blocking, streaming and async variants.
+	def descriptive_analytics(self, data: pd.DataFrame, stream: bool = False, use_cache: bool = True) -> AnalysisResult:
+		prompt, state = self._prepare_descriptive(data)
+		return self._finish_descriptive(state, self._ask(prompt, stream, use_cache))
+
+	async def adescriptive_analytics(self, data: pd.DataFrame, use_cache: bool = True) -> AnalysisResult:
+		return await self._arun_analysis(self._prepare_descriptive, self._finish_descriptive, (data,), use_cache)
+
+	def _prepare_descriptive(self, data: pd.DataFrame):
 		MAX_ROWS = 20000
 		SAMPLE_ROWS = 5000
-		if data.shape[0] > MAX_ROWS:
+		profile = self._profile_for(data)
+		# statistics come from the shared profile of the whole frame; only the charts use a sample
+		if data.shape[0] > MAX_ROWS and profile is None:
 			used = data.sample(n=SAMPLE_ROWS, random_state=42)
 			self.data_cache['analysis_used_sample'] = True
 		else:
 			used = data
 
-		stats_summary = self._generate_statistical_summary(used)
+		stats_summary = self._generate_statistical_summary(data)
+		if profile is not None:
+			stats_summary = self._apply_profile_stats(stats_summary, profile, len(data))
+		stats_text, budget = self._fit_payload(stats_summary)
 
-		prompt = f"""Analyze this dataset and provide comprehensive descriptive insights:\n\nStatistical Summary:\n{stats_summary}\n\nPlease provide:\n1. Key characteristics of the data\n2. Distribution patterns\n3. Notable outliers or anomalies\n4. Data quality assessment\n5. Recommendations for further analysis\n"""
+		prompt = f"""Analyze this dataset and provide comprehensive descriptive insights:\n\nStatistical Summary:\n{stats_text}\n\nPlease provide:\n1. Key characteristics of the data\n2. Distribution patterns\n3. Notable outliers or anomalies\n4. Data quality assessment\n5. Recommendations for further analysis\n"""
+		return prompt, {'used': used, 'profile': self._dataset_profile(data), 'stats_summary': stats_summary, 'context_budget': budget}
 
-		insights = self.ask_ollama_stream(prompt, self.data_cache.get('data_summary', ''))
+	def _finish_descriptive(self, state: Dict[str, Any], insights) -> AnalysisResult:
+		used = state['used']
+		stats_summary = state['stats_summary']
 		t_vis0 = time.time()
-		visualizations = self._create_descriptive_visualizations(used)
+		visualizations = self._create_descriptive_visualizations(used, state['profile'])
 		t_vis1 = time.time()
 		self.data_cache['last_visualization_time'] = t_vis1 - t_vis0
 
 		results = {
 			'statistical_summary': stats_summary,
+			'context_budget': state['context_budget'],
 			'timings': {
 				'ollama_seconds': self.data_cache.get('last_ollama_time'),
 				'visualization_seconds': self.data_cache.get('last_visualization_time')
 			}
 		}
-		return AnalysisResult(analysis_type='descriptive', results=results, insights=insights, visualizations=visualizations)
+		return self._attach_stream(AnalysisResult(analysis_type='descriptive', results=results, insights=insights, visualizations=visualizations))
 
 	def _generate_statistical_summary(self, data: pd.DataFrame) -> Dict[str, Any]:
 		summary = {}
-		numeric_cols = data.select_dtypes(include=[np.number]).columns
-		if len(numeric_cols) > 0:
-			summary['numeric_stats'] = data[numeric_cols].describe().to_dict()
-			if len(numeric_cols) > 1:
-				summary['correlations'] = data[numeric_cols].corr().to_dict()
-			outliers = {}
-			for col in numeric_cols:
-				Q1 = data[col].quantile(0.25)
-				Q3 = data[col].quantile(0.75)
-				IQR = Q3 - Q1
-				outliers[col] = len(data[(data[col] < (Q1 - 1.5 * IQR)) | (data[col] > (Q3 + 1.5 * IQR))])
-			summary['outliers'] = outliers
-		categorical_cols = data.select_dtypes(include=['object', 'category']).columns
-		if len(categorical_cols) > 0:
-			cat_summary = {}
-			for col in categorical_cols:
-				cat_summary[col] = {
-					'unique_count': data[col].nunique(),
-					'most_frequent': data[col].mode().iloc[0] if len(data[col].mode()) > 0 else None,
-					'value_counts': data[col].value_counts().head().to_dict()
-				}
-			summary['categorical_stats'] = cat_summary
+		profile = self._dataset_profile(data)
+		if profile.columns_of('numeric'):
+			summary['numeric_stats'] = profile.describe().to_dict()
+			correlations = profile.correlations()
+			if correlations is not None:
+				summary['correlations'] = correlations.to_dict()
+			summary['outliers'] = dict(profile.outlier_counts())
+			if OUTLIER_METHOD != 'iqr':
+				summary['outlier_method'] = OUTLIER_METHOD
+		categorical = profile.categorical_summary()
+		if categorical:
+			summary['categorical_stats'] = categorical
+		return summary
+
+	@staticmethod
+	def _apply_profile_stats(summary: Dict[str, Any], profile: StreamingProfile, sample_rows: int) -> Dict[str, Any]:
+		"""Replace sample statistics with the streamed file's exact (or sketched) ones where the profile has them."""
+		scale = profile.rows / sample_rows if sample_rows else 0
+		summary = dict(summary)
+		summary['rows_profiled'] = profile.rows
+		summary['sample_rows'] = sample_rows
+		if 'numeric_stats' in summary:
+			summary['numeric_stats'] = profile.describe().to_dict()
+		correlations = profile.correlations()
+		if 'correlations' in summary and correlations is not None:
+			summary['correlations'] = correlations.to_dict()
+		if 'outliers' in summary:
+			summary['outliers'] = {col: int(round(n * scale)) for col, n in summary['outliers'].items()}
+		categorical = profile.categorical_summary()
+		if categorical:
+			summary['categorical_stats'] = categorical
+		summary['estimated_from_sample'] = [k for k in ('outliers',) if k in summary]
+		summary['sketch_error_bounds'] = profile.error_bounds()
 		return summary
 
-	def _create_descriptive_visualizations(self, data: pd.DataFrame) -> List[Dict]:
+	def _create_descriptive_visualizations(self, data: pd.DataFrame, profile: DatasetProfile) -> List[Dict]:
 		visualizations = []
-		numeric_cols = data.select_dtypes(include=[np.number]).columns
+		numeric_cols = profile.columns_of('numeric')
 		import plotly.express as px
 		import plotly.graph_objects as go
 		from plotly.subplots import make_subplots
 
 		if len(numeric_cols) > 1:
-			fig_corr = px.imshow(data[numeric_cols].corr(), title='Correlation Matrix', color_continuous_scale='RdBu', aspect='auto')
+			fig_corr = px.imshow(profile.correlations(), title='Correlation Matrix', color_continuous_scale='RdBu', aspect='auto')
 			visualizations.append({'type': 'correlation_heatmap', 'figure': fig_corr, 'description': 'Correlation between numeric variables'})
 
 		if len(numeric_cols) > 0:
@@ -260,25 +908,37 @@ class OllamaAnalyticsAgent:
 
 		return visualizations
 
-	def predictive_analytics(self, data: pd.DataFrame, target_column: str = None) -> AnalysisResult:
+	def predictive_analytics(self, data: pd.DataFrame, target_column: str = None, stream: bool = False, use_cache: bool = True) -> AnalysisResult:
+		prompt, state = self._prepare_predictive(data, target_column)
+		return self._finish_predictive(state, self._ask(prompt, stream, use_cache))
+
+	async def apredictive_analytics(self, data: pd.DataFrame, target_column: str = None, use_cache: bool = True) -> AnalysisResult:
+		return await self._arun_analysis(self._prepare_predictive, self._finish_predictive, (data, target_column), use_cache)
+
+	def _prepare_predictive(self, data: pd.DataFrame, target_column: str = None):
+		profile = self._dataset_profile(data)
 		if target_column is None:
-			numeric_cols = data.select_dtypes(include=[np.number]).columns
-			if len(numeric_cols) > 0:
-				target_column = data[numeric_cols].var().idxmax()
+			if profile.columns_of('numeric'):
+				target_column = profile.describe().loc['std'].idxmax()
 
 		trends = self._analyze_trends(data, target_column)
-		prompt = f"""Based on this dataset, provide predictive insights:\n\nTarget Variable: {target_column}\nTrend Analysis: {trends}\n\nPlease provide:\n1. Predictive patterns identified\n2. Key predictive features\n3. Potential forecasting approach\n4. Risk factors and limitations\n5. Recommendations for predictive modeling\n"""
-		insights = self.ask_ollama_stream(prompt, self.data_cache.get('data_summary', ''))
+		trends_text, budget = self._fit_payload(trends)
+		prompt = f"""Based on this dataset, provide predictive insights:\n\nTarget Variable: {target_column}\nTrend Analysis: {trends_text}\n\nPlease provide:\n1. Predictive patterns identified\n2. Key predictive features\n3. Potential forecasting approach\n4. Risk factors and limitations\n5. Recommendations for predictive modeling\n"""
+		return prompt, {'data': data, 'target_column': target_column, 'trends': trends, 'context_budget': budget}
+
+	def _finish_predictive(self, state: Dict[str, Any], insights) -> AnalysisResult:
+		data, target_column, trends = state['data'], state['target_column'], state['trends']
 		visualizations = self._create_predictive_visualizations(data, target_column)
-		return AnalysisResult(analysis_type='predictive', results={'trends': trends, 'target_column': target_column}, insights=insights, visualizations=visualizations)
+		return self._attach_stream(AnalysisResult(analysis_type='predictive', results={'trends': trends, 'target_column': target_column, 'context_budget': state['context_budget']}, insights=insights, visualizations=visualizations))
 
 	def _analyze_trends(self, data: pd.DataFrame, target_column: str) -> Dict[str, Any]:
 		import numpy as np
 		from scipy import stats
 		trends = {}
 		if target_column and target_column in data.columns:
-			trends['basic_stats'] = {'mean': data[target_column].mean(), 'std': data[target_column].std(), 'trend': 'increasing' if data[target_column].iloc[-1] > data[target_column].iloc[0] else 'decreasing'}
-			date_cols = data.select_dtypes(include=['datetime64']).columns
+			profile = self._dataset_profile(data)
+			trends['basic_stats'] = {'mean': profile.stat(target_column, 'mean'), 'std': profile.stat(target_column, 'std'), 'trend': 'increasing' if data[target_column].iloc[-1] > data[target_column].iloc[0] else 'decreasing'}
+			date_cols = profile.columns_of('datetime')
 			if len(date_cols) > 0:
 				data_sorted = data.sort_values(date_cols[0])
 				x = np.arange(len(data_sorted))
@@ -291,63 +951,107 @@ class OllamaAnalyticsAgent:
 		visualizations = []
 		import plotly.express as px
 		if target_column and target_column in data.columns:
-			date_cols = data.select_dtypes(include=['datetime64']).columns
+			profile = self._dataset_profile(data)
+			date_cols = profile.columns_of('datetime')
 			if len(date_cols) > 0:
 				fig_ts = px.line(data.sort_values(date_cols[0]), x=date_cols[0], y=target_column, title=f"Time Series: {target_column}")
 				visualizations.append({'type': 'time_series', 'figure': fig_ts, 'description': f'Temporal trend of {target_column}'})
-			numeric_cols = data.select_dtypes(include=[np.number]).columns
-			if len(numeric_cols) > 1:
-				correlations = data[numeric_cols].corr()[target_column].drop(target_column).abs().sort_values(ascending=True)
+			numeric_cols = profile.columns_of('numeric')
+			if len(numeric_cols) > 1 and target_column in numeric_cols:
+				correlations = profile.correlations()[target_column].drop(target_column).abs().sort_values(ascending=True)
 				fig_importance = px.bar(x=correlations.values, y=correlations.index, orientation='h', title=f"Feature Importance (Correlation with {target_column})")
 				visualizations.append({'type': 'feature_importance', 'figure': fig_importance, 'description': 'Correlation-based feature importance'})
 		return visualizations
 
-	def data_cleaning_suggestions(self, data: pd.DataFrame) -> AnalysisResult:
+	def data_cleaning_suggestions(self, data: pd.DataFrame, stream: bool = False, use_cache: bool = True) -> AnalysisResult:
+		prompt, state = self._prepare_cleaning(data)
+		return self._finish_cleaning(state, self._ask(prompt, stream, use_cache))
+
+	async def adata_cleaning_suggestions(self, data: pd.DataFrame, use_cache: bool = True) -> AnalysisResult:
+		return await self._arun_analysis(self._prepare_cleaning, self._finish_cleaning, (data,), use_cache)
+
+	def _prepare_cleaning(self, data: pd.DataFrame):
 		quality_issues = self._assess_data_quality(data)
-		prompt = f"""Analyze this dataset for data quality issues and provide cleaning recommendations:\n\nData Quality Issues Detected:\n{json.dumps(quality_issues, indent=2)}\n\nPlease provide:\n1. Priority ranking of issues to address\n2. Specific cleaning steps for each issue\n3. Potential risks of each cleaning approach\n4. Data validation recommendations\n5. Best practices for maintaining data quality\n"""
-		insights = self.ask_ollama_stream(prompt, self.data_cache.get('data_summary', ''))
-		return AnalysisResult(analysis_type='data_cleaning', results={'quality_issues': quality_issues}, insights=insights)
+		profile = self._profile_for(data)
+		if profile is not None:
+			quality_issues = self._apply_profile_quality(quality_issues, profile, len(data))
+		issues_text, budget = self._fit_payload(quality_issues)
+		prompt = f"""Analyze this dataset for data quality issues and provide cleaning recommendations:\n\nData Quality Issues Detected:\n{issues_text}\n\nPlease provide:\n1. Priority ranking of issues to address\n2. Specific cleaning steps for each issue\n3. Potential risks of each cleaning approach\n4. Data validation recommendations\n5. Best practices for maintaining data quality\n"""
+		return prompt, {'quality_issues': quality_issues, 'context_budget': budget}
+
+	def _finish_cleaning(self, state: Dict[str, Any], insights) -> AnalysisResult:
+		return self._attach_stream(AnalysisResult(analysis_type='data_cleaning', results={'quality_issues': state['quality_issues'], 'context_budget': state['context_budget']}, insights=insights))
 
 	def _assess_data_quality(self, data: pd.DataFrame) -> Dict[str, Any]:
 		issues = {}
-		missing_counts = data.isnull().sum()
+		profile = self._dataset_profile(data)
+		missing_counts = profile.missing_counts()
 		if missing_counts.sum() > 0:
 			issues['missing_values'] = missing_counts[missing_counts > 0].to_dict()
-		duplicate_count = data.duplicated().sum()
+		duplicate_count = profile.duplicate_rows()
 		if duplicate_count > 0:
 			issues['duplicate_rows'] = duplicate_count
-		type_issues = {}
-		for col in data.columns:
-			if data[col].dtype == 'object':
-				numeric_conversion = pd.to_numeric(data[col], errors='coerce')
-				if not numeric_conversion.isnull().all() and numeric_conversion.isnull().sum() < len(data) * 0.5:
-					type_issues[col] = "potentially_numeric"
+		type_issues = {col: "potentially_numeric" for col in profile.numeric_text_columns()}
 		if type_issues:
 			issues['type_inconsistencies'] = type_issues
-		numeric_cols = data.select_dtypes(include=[np.number]).columns
 		outlier_info = {}
-		for col in numeric_cols:
-			Q1 = data[col].quantile(0.25)
-			Q3 = data[col].quantile(0.75)
-			IQR = Q3 - Q1
-			outliers = data[(data[col] < (Q1 - 1.5 * IQR)) | (data[col] > (Q3 + 1.5 * IQR))]
-			if len(outliers) > 0:
-				outlier_info[col] = {'count': len(outliers), 'percentage': len(outliers) / len(data) * 100}
+		for col, count in profile.outlier_counts().items():
+			if count > 0:
+				outlier_info[col] = {'count': count, 'percentage': count / profile.rows * 100}
 		if outlier_info:
 			issues['outliers'] = outlier_info
+			if OUTLIER_METHOD != 'iqr':
+				issues['outlier_method'] = OUTLIER_METHOD
+		return issues
+
+	@staticmethod
+	def _apply_profile_quality(issues: Dict[str, Any], profile: StreamingProfile, sample_rows: int) -> Dict[str, Any]:
+		"""Exact missing values, duplicates and type mix-ups of the streamed file; the rest is scaled from its sample."""
+		scale = profile.rows / sample_rows if sample_rows else 0
+		issues = dict(issues)
+		missing = profile.missing_counts()
+		issues.pop('missing_values', None)
+		if missing.sum() > 0:
+			issues['missing_values'] = missing[missing > 0].to_dict()
+		duplicates = profile.duplicate_rows()
+		issues.pop('duplicate_rows', None)
+		if duplicates > 0:
+			issues['duplicate_rows'] = duplicates
+			if profile.duplicates.exact:
+				issues['duplicate_rows_method'] = 'exact'
+			else:
+				# too many distinct rows to index within bounded memory
+				issues['duplicate_rows_method'] = f"estimate from a distinct-row sketch, ±{profile.duplicates.error:,} rows (1 standard error)"
+		if profile.mixed_types:
+			issues['non_numeric_values_in_numeric_columns'] = dict(profile.mixed_types)
+		for info in issues.get('outliers', {}).values():
+			info['count'] = int(round(info['count'] * scale))
+		issues['rows_profiled'] = profile.rows
 		return issues
 
-	def visualization_suggestions(self, data: pd.DataFrame) -> AnalysisResult:
+	def visualization_suggestions(self, data: pd.DataFrame, stream: bool = False, use_cache: bool = True) -> AnalysisResult:
+		prompt, state = self._prepare_visualization(data)
+		return self._finish_visualization(state, self._ask(prompt, stream, use_cache))
+
+	async def avisualization_suggestions(self, data: pd.DataFrame, use_cache: bool = True) -> AnalysisResult:
+		return await self._arun_analysis(self._prepare_visualization, self._finish_visualization, (data,), use_cache)
+
+	def _prepare_visualization(self, data: pd.DataFrame):
 		viz_analysis = self._analyze_visualization_needs(data)
-		prompt = f"""Based on this dataset characteristics, recommend the best visualizations:\n\nDataset Analysis for Visualization:\n{json.dumps(viz_analysis, indent=2)}\n\nPlease provide:\n1. Most appropriate chart types for each variable\n2. Recommended multi-variable visualizations\n3. Interactive visualization opportunities\n4. Dashboard layout suggestions\n5. Specific insights each visualization would reveal\n"""
-		insights = self.ask_ollama_stream(prompt, self.data_cache.get('data_summary', ''))
+		viz_text, budget = self._fit_payload(viz_analysis)
+		prompt = f"""Based on this dataset characteristics, recommend the best visualizations:\n\nDataset Analysis for Visualization:\n{viz_text}\n\nPlease provide:\n1. Most appropriate chart types for each variable\n2. Recommended multi-variable visualizations\n3. Interactive visualization opportunities\n4. Dashboard layout suggestions\n5. Specific insights each visualization would reveal\n"""
+		return prompt, {'data': data, 'viz_analysis': viz_analysis, 'context_budget': budget}
+
+	def _finish_visualization(self, state: Dict[str, Any], insights) -> AnalysisResult:
+		data, viz_analysis = state['data'], state['viz_analysis']
 		sample_visualizations = self._create_sample_visualizations(data)
-		return AnalysisResult(analysis_type='visualization', results={'viz_analysis': viz_analysis}, insights=insights, visualizations=sample_visualizations)
+		return self._attach_stream(AnalysisResult(analysis_type='visualization', results={'viz_analysis': viz_analysis, 'context_budget': state['context_budget']}, insights=insights, visualizations=sample_visualizations))
 
 	def _analyze_visualization_needs(self, data: pd.DataFrame) -> Dict[str, Any]:
-		numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-		categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
-		datetime_cols = data.select_dtypes(include=['datetime64']).columns.tolist()
+		profile = self._dataset_profile(data)
+		numeric_cols = profile.columns_of('numeric')
+		categorical_cols = profile.columns_of('categorical')
+		datetime_cols = profile.columns_of('datetime')
 		analysis = {'column_types': {'numeric': len(numeric_cols), 'categorical': len(categorical_cols), 'datetime': len(datetime_cols)}}
 		chart_suggestions = []
 		if len(numeric_cols) >= 2:
@@ -359,7 +1063,7 @@ class OllamaAnalyticsAgent:
 		if len(numeric_cols) > 0:
 			chart_suggestions.extend(['histogram', 'box_plot'])
 		analysis['recommended_charts'] = chart_suggestions
-		data_size = len(data)
+		data_size = profile.rows
 		if data_size > 10000:
 			analysis['size_considerations'] = 'large_dataset_optimizations_needed'
 		elif data_size < 100:
@@ -368,49 +1072,62 @@ class OllamaAnalyticsAgent:
 
 	def _create_sample_visualizations(self, data: pd.DataFrame) -> List[Dict]:
 		visualizations = []
-		numeric_cols = data.select_dtypes(include=[np.number]).columns
-		categorical_cols = data.select_dtypes(include=['object', 'category']).columns
+		profile = self._dataset_profile(data)
+		numeric_cols = profile.columns_of('numeric')
+		categorical_cols = profile.columns_of('categorical')
 		import plotly.express as px
 		if len(numeric_cols) >= 2:
 			fig_scatter = px.scatter(data, x=numeric_cols[0], y=numeric_cols[1], title=f"Scatter Plot: {numeric_cols[0]} vs {numeric_cols[1]}")
 			visualizations.append({'type': 'scatter_plot', 'figure': fig_scatter, 'description': 'Sample scatter plot showing relationship between variables'})
 		if len(categorical_cols) > 0:
-			value_counts = data[categorical_cols[0]].value_counts().head(10)
+			value_counts = profile.value_counts[categorical_cols[0]].head(10)
 			fig_bar = px.bar(x=value_counts.index, y=value_counts.values, title=f"Distribution of {categorical_cols[0]}")
 			visualizations.append({'type': 'bar_chart', 'figure': fig_bar, 'description': f'Distribution of categories in {categorical_cols[0]}'})
 		return visualizations
 
-	def custom_analysis(self, data: pd.DataFrame, query: str) -> AnalysisResult:
+	def custom_analysis(self, data: pd.DataFrame, query: str, stream: bool = False, use_cache: bool = True) -> AnalysisResult:
+		prompt, state = self._prepare_custom(data, query)
+		return self._finish_custom(state, self._ask(prompt, stream, use_cache))
+
+	async def acustom_analysis(self, data: pd.DataFrame, query: str, use_cache: bool = True) -> AnalysisResult:
+		return await self._arun_analysis(self._prepare_custom, self._finish_custom, (data, query), use_cache)
+
+	def _prepare_custom(self, data: pd.DataFrame, query: str):
 		relevant_stats = self._generate_query_relevant_stats(data, query)
-		enhanced_prompt = f"""User Query: {query}\n\nRelevant Statistics:\n{json.dumps(relevant_stats, indent=2)}\n\nPlease provide a comprehensive analysis addressing the user's specific question with:\n1. Direct answer to the query\n2. Supporting statistical evidence\n3. Relevant insights and patterns\n4. Actionable recommendations\n5. Potential limitations or caveats\n"""
-		insights = self.ask_ollama_stream(enhanced_prompt, self.data_cache.get('data_summary', ''))
+		stats_text, budget = self._fit_payload(relevant_stats)
+		enhanced_prompt = f"""User Query: {query}\n\nRelevant Statistics:\n{stats_text}\n\nPlease provide a comprehensive analysis addressing the user's specific question with:\n1. Direct answer to the query\n2. Supporting statistical evidence\n3. Relevant insights and patterns\n4. Actionable recommendations\n5. Potential limitations or caveats\n"""
+		return enhanced_prompt, {'data': data, 'query': query, 'relevant_stats': relevant_stats, 'context_budget': budget}
+
+	def _finish_custom(self, state: Dict[str, Any], insights) -> AnalysisResult:
+		data, query, relevant_stats = state['data'], state['query'], state['relevant_stats']
 		visualizations = self._create_query_visualizations(data, query)
-		return AnalysisResult(analysis_type='custom', results={'relevant_stats': relevant_stats, 'query': query}, insights=insights, visualizations=visualizations)
+		return self._attach_stream(AnalysisResult(analysis_type='custom', results={'relevant_stats': relevant_stats, 'query': query, 'context_budget': state['context_budget']}, insights=insights, visualizations=visualizations))
 
 	def _generate_query_relevant_stats(self, data: pd.DataFrame, query: str) -> Dict[str, Any]:
 		stats = {'basic_info': {'shape': data.shape, 'columns': data.columns.tolist()}}
+		profile = self._dataset_profile(data)
 		query_lower = query.lower()
 		if any(word in query_lower for word in ['correlation', 'relationship', 'association']):
-			numeric_cols = data.select_dtypes(include=[np.number]).columns
-			if len(numeric_cols) > 1:
-				stats['correlations'] = data[numeric_cols].corr().to_dict()
+			correlations = profile.correlations()
+			if correlations is not None:
+				stats['correlations'] = correlations.to_dict()
 		if any(word in query_lower for word in ['distribution', 'histogram', 'spread']):
-			numeric_cols = data.select_dtypes(include=[np.number]).columns
-			if len(numeric_cols) > 0:
-				stats['distributions'] = data[numeric_cols].describe().to_dict()
+			if profile.columns_of('numeric'):
+				stats['distributions'] = profile.describe().to_dict()
 		if any(word in query_lower for word in ['trend', 'time', 'temporal']):
-			datetime_cols = data.select_dtypes(include=['datetime64']).columns
+			datetime_cols = profile.columns_of('datetime')
 			if len(datetime_cols) > 0:
-				stats['temporal_info'] = {'date_range': [str(data[datetime_cols[0]].min()), str(data[datetime_cols[0]].max())], 'date_columns': datetime_cols.tolist()}
+				first, last = profile.date_ranges[datetime_cols[0]]
+				stats['temporal_info'] = {'date_range': [str(first), str(last)], 'date_columns': datetime_cols}
 		return stats
 
 	def _create_query_visualizations(self, data: pd.DataFrame, query: str) -> List[Dict]:
 		visualizations = []
 		query_lower = query.lower()
 		if any(word in query_lower for word in ['correlation', 'relationship']):
-			numeric_cols = data.select_dtypes(include=[np.number]).columns
-			if len(numeric_cols) > 1:
+			correlations = self._dataset_profile(data).correlations()
+			if correlations is not None:
 				import plotly.express as px
-				fig_corr = px.imshow(data[numeric_cols].corr(), title='Correlation Matrix', color_continuous_scale='RdBu')
+				fig_corr = px.imshow(correlations, title='Correlation Matrix', color_continuous_scale='RdBu')
 				visualizations.append({'type': 'correlation', 'figure': fig_corr, 'description': 'Correlation matrix based on your query'})
 		return visualizations
@@ -0,0 +1,77 @@
+"""Time a daily refresh: reloading a CSV that grew by a few rows, from scratch and incrementally.
+
+Writes a base CSV of `--rows` rows and a second file that is the same bytes
+plus `--new-rows` rows. The grown file is loaded once into an empty dataset
+cache (everything is parsed / profiled) and once into a cache that already
+holds the base (only the new rows are), in memory and in streaming mode.
+
+    python benchmarks/bench_append.py [--rows 2000000] [--new-rows 20000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+
+def frame(rng, rows, start):
+    return pd.DataFrame({
+        'order_id': np.arange(start, start + rows),
+        'region': rng.choice(['north', 'south', 'east', 'west'], rows),
+        'amount': rng.lognormal(3, 1, rows).round(2),
+        'quantity': rng.integers(1, 10, rows),
+        'customer': pd.Series(rng.integers(0, rows // 4 + 1, rows)).map('c{}'.format),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--new-rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        base, grown = os.path.join(tmp, 'day1.csv'), os.path.join(tmp, 'day2.csv')
+        frame(rng, args.rows, 0).to_csv(base, index=False)
+        shutil.copy(base, grown)
+        frame(rng, args.new_rows, args.rows).to_csv(grown, mode='a', header=False, index=False)
+        print(f"{args.rows} rows + {args.new_rows} appended, {os.path.getsize(grown) / 1e6:.1f} MB")
+
+        os.environ.setdefault('OLLAMA_HOST', 'http://127.0.0.1:9')
+        from analytics_core import OllamaAnalyticsAgent
+        from dataset_cache import DatasetCache
+
+        print(f"{'mode':<12}{'full_s':>10}{'append_s':>10}  check")
+        for streaming in (False, True):
+            mode = 'streaming' if streaming else 'memory'
+            agent = OllamaAnalyticsAgent()
+            agent.dataset_cache = DatasetCache(os.path.join(tmp, f'{mode}-empty'))
+            t0 = time.perf_counter()
+            agent.load_and_analyze_data(grown, streaming=streaming)
+            full = time.perf_counter() - t0
+            expected = agent.data_cache['load']
+
+            agent.dataset_cache = DatasetCache(os.path.join(tmp, f'{mode}-warm'))
+            agent.load_and_analyze_data(base, streaming=streaming)
+            t0 = time.perf_counter()
+            data = agent.load_and_analyze_data(grown, streaming=streaming)
+            incremental = time.perf_counter() - t0
+            load = agent.data_cache['load']
+            rows = load['rows'] if streaming else len(data)
+            check = f"{load.get('profile_source') or load['source']}, {load.get('appended_rows')} new rows, {rows} total"
+            if streaming and rows != expected['rows']:
+                check += '  MISMATCH'
+            print(f"{mode:<12}{full:>10.2f}{incremental:>10.2f}  {check}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Time correlation matrices: pandas `corr()` vs the blockwise BLAS engine, and reuse from the store.
+
+Builds a numeric frame with `--cols` columns (a tenth of them with missing
+values) and times `DataFrame.corr()`, `correlation_matrix` and a second
+request for a subset of the columns served by the `CorrelationStore`.
+
+    python benchmarks/bench_correlations.py [--rows 1000000] [--cols 50]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+from correlations import CorrelationStore, correlation_matrix
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--cols', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(args.rows, args.cols))
+    values[:, 1:] += 0.5 * values[:, :1]
+    data = pd.DataFrame(values, columns=[f'x{i}' for i in range(args.cols)])
+    for col in data.columns[::10]:
+        data.loc[rng.random(args.rows) < 0.05, col] = np.nan
+    print(f"{args.rows} rows x {args.cols} columns")
+
+    t0 = time.perf_counter()
+    expected = data.corr()
+    pandas_time = time.perf_counter() - t0
+    print(f"{'pandas corr()':<22}{pandas_time:>8.2f}s")
+
+    t0 = time.perf_counter()
+    result = correlation_matrix(data)
+    elapsed = time.perf_counter() - t0
+    error = np.nanmax(np.abs(result.to_numpy() - expected.to_numpy()))
+    print(f"{'correlation_matrix':<22}{elapsed:>8.2f}s  {pandas_time / elapsed:.1f}x  max difference {error:.1e}")
+
+    store = CorrelationStore()
+    columns = list(data.columns)
+    store.correlations(data, columns, 'bench')
+    t0 = time.perf_counter()
+    store.correlations(data, columns[: args.cols // 2], 'bench')
+    print(f"{'store, column subset':<22}{time.perf_counter() - t0:>8.4f}s  {store.stats()}")
+
+
+if __name__ == '__main__':
+    main()
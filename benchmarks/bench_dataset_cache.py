@@ -0,0 +1,83 @@
+"""Time and measure reopening a dataset from the dataset cache against parsing its CSV.
+
+Writes a CSV with numeric (some with missing values), categorical and text
+columns, loads it once to fill the cache and then reopens it. For each step
+it prints the time and the growth of the process' anonymous memory. Mapped
+file pages are not anonymous, so numeric columns that come back as views of
+the cache file add nothing there.
+
+    python benchmarks/bench_dataset_cache.py [--rows 2000000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import DatasetCache
+
+
+def anonymous_bytes():
+    # Linux only; None elsewhere
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Anonymous:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def measure(label, load):
+    gc.collect()
+    before = anonymous_bytes()
+    t0 = time.perf_counter()
+    data = load()
+    elapsed = time.perf_counter() - t0
+    after = anonymous_bytes()
+    grown = f"{(after - before) / 1e6:>8.0f} MB" if before is not None else '       n/a'
+    print(f"{label:<26}{elapsed:>8.2f}s{grown}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = args.rows
+    frame = pd.DataFrame({
+        'amount': rng.lognormal(3, 1, rows),
+        'score': np.where(rng.random(rows) < 0.1, np.nan, rng.normal(size=rows)),
+        'quantity': rng.integers(1, 1000, rows),
+        'region': rng.choice(['north', 'south', 'east', 'west'], rows),
+        'customer': pd.Series(rng.integers(0, rows, rows)).map('c{}'.format),
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.csv')
+        frame.to_csv(path, index=False)
+        del frame
+        print(f"{rows} rows, {os.path.getsize(path) / 1e6:.1f} MB CSV")
+        print(f"{'step':<26}{'time':>9}{'anon mem':>11}")
+
+        cache = DatasetCache(os.path.join(tmp, 'cache'))
+        key = cache.key_for(path)
+        parsed = measure('parse CSV (pandas)', lambda: pd.read_csv(path))
+        cache.put(key, parsed)
+        del parsed
+        reopened = measure('reopen from cache', lambda: cache.get(key))
+        measure('sum of numeric columns', lambda: reopened.select_dtypes('number').sum())
+
+
+if __name__ == '__main__':
+    main()
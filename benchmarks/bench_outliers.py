@@ -0,0 +1,68 @@
+"""Time outlier counting: the per-column loop against the vectorized engine.
+
+Builds a random numeric frame (normal values with a few planted outliers and
+missing values), counts IQR outliers the old way (two `quantile` calls and a
+filtered frame per column) and with `outliers.count_outliers` for every
+method, and checks that the IQR counts agree. The last line reuses the
+quartiles of a `describe()` table, as `DatasetProfile` does.
+
+    python benchmarks/bench_outliers.py [--rows 1000000] [--cols 50]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+from outliers import METHODS, count_outliers
+
+
+def loop_iqr(data):
+    counts = {}
+    for col in data.columns:
+        q1 = data[col].quantile(0.25)
+        q3 = data[col].quantile(0.75)
+        iqr = q3 - q1
+        counts[col] = len(data[(data[col] < (q1 - 1.5 * iqr)) | (data[col] > (q3 + 1.5 * iqr))])
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--cols', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(args.rows, args.cols))
+    values[rng.random(values.shape) < 0.001] *= 20
+    values[rng.random(values.shape) < 0.01] = np.nan
+    data = pd.DataFrame(values, columns=[f"c{i}" for i in range(args.cols)])
+    print(f"{args.rows} rows x {args.cols} columns")
+
+    t0 = time.perf_counter()
+    expected = loop_iqr(data)
+    print(f"{'loop iqr':<16}{time.perf_counter() - t0:>8.2f}s")
+    for method in METHODS:
+        t0 = time.perf_counter()
+        counts = count_outliers(data, method=method)
+        elapsed = time.perf_counter() - t0
+        note = ''
+        if method == 'iqr':
+            note = '  matches loop' if counts == expected else '  MISMATCH'
+        print(f"{'vector ' + method:<16}{elapsed:>8.2f}s  {sum(counts.values())} outliers{note}")
+
+    stats = data.describe()
+    t0 = time.perf_counter()
+    counts = count_outliers(data, method='iqr', stats=stats)
+    elapsed = time.perf_counter() - t0
+    print(f"{'iqr, describe':<16}{elapsed:>8.2f}s  {sum(counts.values())} outliers{'  matches loop' if counts == expected else '  MISMATCH'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Measure the app's own overhead (pandas, plotly) separately from model time.
+
+Starts the bundled fake Ollama server in-process, so no model is needed, then:
+1. loads the dataset and times each analysis, splitting wall time into model
+   time (as seen by the agent) and everything else;
+2. runs several concurrent sessions through `run_all_analyses` and reports
+   analyses per second.
+
+    python benchmarks/bench_overhead.py [path/to/data.csv] [--sessions 4] [--tps 200]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('data', nargs='?', default=str(ROOT / 'data' / 'temp_customers-10000.csv'))
+    parser.add_argument('--sessions', type=int, default=4)
+    parser.add_argument('--tps', type=float, default=200.0)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(models=['fake'], tokens_per_second=args.tps, latency=args.latency)
+    with FakeOllamaServer(config) as server:
+        # must be set before the agent builds its clients
+        os.environ['OLLAMA_HOST'] = server.url
+        os.environ['LLM_CACHE_DISABLED'] = '1'
+        from analytics_core import OllamaAnalyticsAgent
+
+        agent = OllamaAnalyticsAgent('fake')
+        t0 = time.perf_counter()
+        data = agent.load_and_analyze_data(args.data)
+        print(f"load_and_analyze_data: {time.perf_counter() - t0:.3f}s  shape={data.shape}")
+
+        print(f"{'analysis':<16}{'wall_s':>10}{'model_s':>10}{'overhead_s':>12}")
+        runs = [
+            ('descriptive', lambda: agent.descriptive_analytics(data)),
+            ('predictive', lambda: agent.predictive_analytics(data)),
+            ('data_cleaning', lambda: agent.data_cleaning_suggestions(data)),
+            ('visualization', lambda: agent.visualization_suggestions(data)),
+            ('custom', lambda: agent.custom_analysis(data, 'Which columns are correlated?')),
+        ]
+        for name, run in runs:
+            t0 = time.perf_counter()
+            result = run()
+            wall = time.perf_counter() - t0
+            model = agent.conversation_history[-1]['ollama_time'] or 0.0
+            if isinstance(result.insights, str) and result.insights.startswith('[ERROR]'):
+                print(f"{name:<16}{result.insights}")
+                continue
+            print(f"{name:<16}{wall:>10.3f}{model:>10.3f}{wall - model:>12.3f}")
+
+        sessions = [OllamaAnalyticsAgent('fake') for _ in range(args.sessions)]
+        for s in sessions:
+            s.load_and_analyze_data(args.data)
+
+        def session(a):
+            a.run_all_analyses(a.data_cache['current_data'], query='Which columns are correlated?')
+
+        threads = [threading.Thread(target=session, args=(a,)) for a in sessions]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+        total = 5 * args.sessions
+        print(f"{args.sessions} concurrent sessions: {total} analyses in {wall:.2f}s ({total / wall:.1f}/s, {server.request_count} model requests)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Compare Ollama prefill cost for a round of analyses with and without prefix reuse.
+
+Runs the four dataset analyses twice against a live Ollama (or any server
+`OLLAMA_HOST` points at): once sending the full prompt each time, once with
+`reuse_context` so the shared system prompt + data summary is evaluated once.
+The response cache is bypassed so every call reaches the model.
+
+    python benchmarks/bench_prefix_reuse.py [path/to/data.csv] [model]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics_core import OllamaAnalyticsAgent
+
+DATA = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent.parent / 'data' / 'temp_customers-10000.csv'
+MODEL = sys.argv[2] if len(sys.argv) > 2 else 'llama3.2'
+
+
+def run_round(reuse_context: bool):
+    agent = OllamaAnalyticsAgent(MODEL, reuse_context=reuse_context)
+    data = agent.load_and_analyze_data(str(DATA))
+    t0 = time.time()
+    agent.descriptive_analytics(data, use_cache=False)
+    agent.predictive_analytics(data, use_cache=False)
+    agent.data_cleaning_suggestions(data, use_cache=False)
+    agent.visualization_suggestions(data, use_cache=False)
+    wall = time.time() - t0
+
+    metrics = [h.get('metrics') or {} for h in agent.conversation_history]
+    prime = (agent.data_cache.get('prefix_context') or {}).get('metrics') or {}
+    if prime:
+        metrics.append(prime)
+    prompt_tokens = sum(m.get('prompt_eval_count') or 0 for m in metrics)
+    prompt_seconds = sum(m.get('prompt_eval_seconds') or 0 for m in metrics)
+    return wall, prompt_tokens, prompt_seconds
+
+
+if __name__ == '__main__':
+    print(f"dataset={DATA.name} model={MODEL}")
+    print(f"{'mode':<16}{'wall_s':>10}{'prompt_tokens':>16}{'prompt_eval_s':>16}")
+    for label, reuse in (('full prompt', False), ('reuse context', True)):
+        wall, tokens, seconds = run_round(reuse)
+        print(f"{label:<16}{wall:>10.2f}{tokens:>16}{seconds:>16.2f}")
@@ -0,0 +1,70 @@
+"""Replay a recorded Ollama cassette through every analysis and report the app's own cost.
+
+Record a cassette against a real model first:
+
+    OLLAMA_CASSETTE=cassettes/run.jsonl OLLAMA_CASSETTE_MODE=record \
+        python benchmarks/bench_replay.py data/temp_customers-10000.csv --model llama3.2
+
+then replay it offline, optionally faster or slower than it was recorded:
+
+    OLLAMA_CASSETTE=cassettes/run.jsonl python benchmarks/bench_replay.py data/temp_customers-10000.csv --scale 0
+
+Requests whose prompt no longer matches a recording are counted as misses:
+a changed prompt is a regression signal for prompt construction. With
+OLLAMA_CASSETTE_ON_MISS=sequence they are still answered from the recordings
+in order, so timings stay realistic.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('data', nargs='?', default=str(ROOT / 'data' / 'temp_customers-10000.csv'))
+    parser.add_argument('--model', default='llama3.2')
+    parser.add_argument('--scale', type=float, default=None, help='latency scale for replay (0 = no waiting)')
+    args = parser.parse_args()
+    if not os.environ.get('OLLAMA_CASSETTE'):
+        sys.exit('Set OLLAMA_CASSETTE to the cassette file (and OLLAMA_CASSETTE_MODE=record to record one).')
+    if args.scale is not None:
+        os.environ['OLLAMA_CASSETTE_LATENCY_SCALE'] = str(args.scale)
+    # every request must reach the layer to be recorded or replayed
+    os.environ['LLM_CACHE_DISABLED'] = '1'
+
+    from analytics_core import OllamaAnalyticsAgent
+    from llm_cassette import get_cassette
+
+    agent = OllamaAnalyticsAgent(args.model)
+    data = agent.load_and_analyze_data(args.data)
+    cassette = get_cassette()
+    print(f"cassette={cassette.path} mode={cassette.mode} scale={cassette.latency_scale}")
+    print(f"{'analysis':<16}{'wall_s':>10}{'model_s':>10}{'overhead_s':>12}{'prompt_tokens':>15}")
+    runs = [
+        ('descriptive', lambda: agent.descriptive_analytics(data)),
+        ('predictive', lambda: agent.predictive_analytics(data)),
+        ('data_cleaning', lambda: agent.data_cleaning_suggestions(data)),
+        ('visualization', lambda: agent.visualization_suggestions(data)),
+        ('custom', lambda: agent.custom_analysis(data, 'Which columns are correlated?')),
+    ]
+    for name, run in runs:
+        t0 = time.perf_counter()
+        result = run()
+        wall = time.perf_counter() - t0
+        if isinstance(result.insights, str) and result.insights.startswith('[ERROR]'):
+            print(f"{name:<16}{result.insights}")
+            continue
+        model = agent.conversation_history[-1]['ollama_time'] or 0.0
+        tokens = result.results['context_budget']['estimated_prompt_tokens']
+        print(f"{name:<16}{wall:>10.3f}{model:>10.3f}{wall - model:>12.3f}{tokens:>15}")
+    if cassette.mode == 'replay':
+        print(f"matched={cassette.matched} missed={cassette.missed}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Check the profiling sketches against exact answers, chunk by chunk and merged.
+
+Builds a frame with a skewed numeric column, an ID-like text column and a
+Zipf-distributed text column, feeds each sketch in chunks split over two
+partitions that are merged at the end (as parallel workers would), and prints
+time, size and the observed error next to the sketch's stated bound.
+
+    python benchmarks/bench_sketches.py [--rows 2000000] [--chunk 200000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+from sketches import HyperLogLog, KLLSketch, MisraGries
+
+
+def build(cls, column, chunk, *args):
+    # two partitions of alternating chunks, merged at the end
+    parts = [cls(*args), cls(*args)]
+    t0 = time.perf_counter()
+    for i, start in enumerate(range(0, len(column), chunk)):
+        parts[i % 2].update(column.iloc[start:start + chunk])
+    parts[0].merge(parts[1])
+    return parts[0], time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunk', type=int, default=200_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'amount': rng.lognormal(3, 1, args.rows),
+        'email': pd.Series([f"user{i}@example.com" for i in rng.permutation(args.rows)]),
+        'product': pd.Series(rng.zipf(1.3, args.rows) % 50_000).map('sku-{}'.format),
+    })
+    print(f"{args.rows} rows in chunks of {args.chunk}")
+
+    for k in (200, 1000):
+        sketch, elapsed = build(KLLSketch, data['amount'], args.chunk, k)
+        values = np.sort(data['amount'].to_numpy())
+        qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+        worst = max(abs(np.searchsorted(values, v) / len(values) - q) for q, v in zip(qs, sketch.quantiles(qs)))
+        items = sum(len(level) for level in sketch.levels)
+        print(f"{'kll k=' + str(k):<16}{elapsed:>8.2f}s  {items} items  rank error {worst:.4f} (bound {sketch.rank_error:.4f})")
+
+    for col in ('email', 'product'):
+        exact = data[col].nunique()
+        t0 = time.perf_counter()
+        data[col].nunique()
+        exact_time = time.perf_counter() - t0
+        sketch, elapsed = build(HyperLogLog, data[col], args.chunk)
+        error = abs(sketch.estimate() - exact) / exact
+        print(f"{'hll ' + col:<16}{elapsed:>8.2f}s  {sketch.estimate():.0f} vs {exact} (nunique {exact_time:.2f}s)  error {error:.4f} (std error {sketch.relative_error:.4f})")
+
+    counts = data['product'].value_counts()
+    sketch, elapsed = build(MisraGries, data['product'], args.chunk, 100)
+    top = sketch.top(10)
+    worst = max(int(counts[value]) - n for value, n in top.items())
+    found = len(set(top) & set(counts.index[:10]))
+    print(f"{'misra-gries':<16}{elapsed:>8.2f}s  {found}/10 true top values, undercount {worst} (bound {sketch.error_bound})")
+
+
+if __name__ == '__main__':
+    main()
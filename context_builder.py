@@ -0,0 +1,282 @@
+"""
+context_builder.py
+Fit the dataset context and analysis statistics into a prompt token budget.
+
+Statistics are rendered compactly (numbers rounded to a few significant digits,
+only the strongest correlation pairs, describe() without its redundant rows)
+and, when that is still too large, trimmed column by column in priority order
+until the estimate fits. Token counts are estimated from characters; no
+tokenizer is needed.
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CHARS_PER_TOKEN = 4
+# Context window requested from Ollama; without it many servers and Modelfiles use 2048
+DEFAULT_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "4096"))
+# Longest answer requested; lowered per request when a long prompt leaves less room
+DEFAULT_NUM_PREDICT = int(os.environ.get("OLLAMA_NUM_PREDICT", "512"))
+# Shortest answer room kept however long the prompt is
+MIN_ANSWER_TOKENS = 128
+SIGNIFICANT_DIGITS = 4
+
+# Progressively smaller renderings tried until one fits:
+# (max columns shown, correlation pairs, top values per category, sample rows)
+DETAIL_LEVELS = [
+	(None, 10, 5, 3),
+	(40, 8, 3, 3),
+	(20, 5, 3, 2),
+	(10, 3, 2, 1),
+	(5, 3, 1, 1),
+	(3, 1, 1, 0),
+]
+
+DESCRIBE_STATS = ['mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+def prompt_budget_for(num_ctx: int, num_predict: int) -> int:
+	"""Tokens for the data context and statistics in a `num_ctx` window that also holds a `num_predict` answer.
+
+	15% of the rest is left for the instructions, the question and the error
+	of the character-based estimate.
+	"""
+	return max(int((num_ctx - num_predict) * 0.85), 256)
+
+
+# Room for the data context and statistics in each prompt (3046 for a 4096 window and 512-token answers)
+DEFAULT_PROMPT_BUDGET = int(os.environ.get("LLM_PROMPT_TOKEN_BUDGET", "0")) or prompt_budget_for(DEFAULT_NUM_CTX, DEFAULT_NUM_PREDICT)
+
+
+def answer_tokens(prompt: str, num_ctx: int, num_predict: int) -> int:
+	"""`num_predict` capped so that `prompt` and the answer fit together in `num_ctx`."""
+	return max(min(num_predict, num_ctx - estimate_tokens(prompt)), MIN_ANSWER_TOKENS)
+
+
+def estimate_tokens(text: str) -> int:
+	"""Rough token count for English/number-heavy prompt text."""
+	return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def round_values(value: Any, digits: int = SIGNIFICANT_DIGITS) -> Any:
+	"""Round floats to `digits` significant digits and unwrap numpy scalars, recursively."""
+	if isinstance(value, dict):
+		return {str(k): round_values(v, digits) for k, v in value.items()}
+	if isinstance(value, (list, tuple)):
+		return [round_values(v, digits) for v in value]
+	if isinstance(value, (bool, np.bool_)):
+		return bool(value)
+	if isinstance(value, np.integer):
+		return int(value)
+	if isinstance(value, (float, np.floating)):
+		value = float(value)
+		if math.isnan(value):
+			return None
+		if math.isinf(value):
+			return str(value)
+		return float(f"{value:.{digits}g}")
+	return value
+
+
+def column_priority(data: pd.DataFrame, profile=None) -> List[str]:
+	"""Order columns by how much they matter to an analyst reading the prompt.
+
+	Columns with missing values come first, then numeric, datetime and
+	low-cardinality categorical columns; ID-like columns (all values distinct in
+	a sample) go last. Missing counts come from `profile` when given.
+	"""
+	head = data.head(1000)
+	missing = profile.missing_counts() if profile is not None else data.isnull().sum()
+
+	def rank(col):
+		series = head[col]
+		if missing[col] > 0:
+			return 0
+		if pd.api.types.is_numeric_dtype(series):
+			return 1
+		if pd.api.types.is_datetime64_any_dtype(series):
+			return 2
+		if len(series) > 1 and series.nunique() >= len(series):
+			return 4
+		return 3
+
+	return sorted(data.columns, key=lambda c: rank(c))
+
+
+def top_correlation_pairs(corr: Dict[str, Dict[str, float]], k: int) -> List[str]:
+	"""The `k` strongest off-diagonal pairs of a `corr().to_dict()` mapping."""
+	pairs = []
+	seen = set()
+	for a, row in corr.items():
+		for b, r in row.items():
+			if a == b or (b, a) in seen or r is None or (isinstance(r, float) and math.isnan(r)):
+				continue
+			seen.add((a, b))
+			pairs.append((abs(r), a, b, r))
+	pairs.sort(reverse=True)
+	return [f"{a}~{b}: {round_values(r, 2)}" for _, a, b, r in pairs[:k]]
+
+
+def _limit(items: Sequence, n: int = None) -> Tuple[list, int]:
+	items = list(items)
+	if n is None or len(items) <= n:
+		return items, 0
+	return items[:n], len(items) - n
+
+
+def _ordered(keys, priority: Sequence[str] = None) -> list:
+	keys = list(keys)
+	if not priority:
+		return keys
+	rank = {c: i for i, c in enumerate(priority)}
+	return sorted(keys, key=lambda c: rank.get(c, len(rank)))
+
+
+def _compact_describe(stats: Dict[str, Dict[str, Any]], max_cols: int, priority: Sequence[str], keep_count: bool = False) -> Dict[str, Any]:
+	# `count` (non-null values) is kept only at full detail; when space is short it goes first,
+	# as the shape line minus the missing-value report gives it for the columns that report lists
+	cols, hidden = _limit(_ordered(stats.keys(), priority), max_cols)
+	keep = ['count'] + DESCRIBE_STATS if keep_count else DESCRIBE_STATS
+	out = {c: {s: v for s, v in stats[c].items() if s in keep} for c in cols}
+	if hidden:
+		out['...'] = f"{hidden} more columns"
+	return out
+
+
+def _compact_payload(payload: Any, level: tuple, priority: Sequence[str]) -> Any:
+	max_cols, corr_k, top_values, _ = level
+	if isinstance(payload, dict):
+		out = {}
+		for key, value in payload.items():
+			if key == 'correlations' and isinstance(value, dict):
+				out[key] = top_correlation_pairs(value, corr_k)
+			elif key in ('numeric_stats', 'distributions') and isinstance(value, dict):
+				out[key] = _compact_describe(value, max_cols, priority, keep_count=level == DETAIL_LEVELS[0])
+			elif key == 'value_counts' and isinstance(value, dict):
+				# all-distinct (ID-like) columns have nothing to say in their counts
+				if any(count > 1 for count in value.values()):
+					out[key] = dict(list(value.items())[:top_values])
+			elif isinstance(value, dict) and value and all(isinstance(k, str) for k in value) and priority and set(value) <= set(priority):
+				# per-column mapping (outliers, missing values, categorical stats, ...)
+				cols, hidden = _limit(_ordered(value.keys(), priority), max_cols)
+				out[key] = {c: _compact_payload(value[c], level, priority) for c in cols}
+				if hidden:
+					out[key]['...'] = f"{hidden} more columns"
+			else:
+				out[key] = _compact_payload(value, level, priority)
+		return out
+	if isinstance(payload, (list, tuple)):
+		items, hidden = _limit(payload, max_cols)
+		items = [_compact_payload(v, level, priority) for v in items]
+		if hidden:
+			items.append(f"... {hidden} more")
+		return items
+	return payload
+
+
+def render_payload(payload: Any) -> str:
+	return json.dumps(round_values(payload), separators=(',', ':'), default=str)
+
+
+def compact_payload(payload: Dict[str, Any], budget: int, priority: Sequence[str] = None) -> str:
+	"""Render analysis statistics as compact JSON within `budget` tokens, if possible."""
+	text = ''
+	for level in DETAIL_LEVELS:
+		text = render_payload(_compact_payload(payload, level, priority))
+		if estimate_tokens(text) <= budget:
+			break
+	return text
+
+
+def _columns_by_kind(data: pd.DataFrame, profile=None) -> Tuple[list, list, list]:
+	"""(numeric, categorical, datetime) columns, from the profile's classification when given."""
+	if profile is not None:
+		return profile.columns_of('numeric'), profile.columns_of('categorical'), profile.columns_of('datetime')
+	return (
+		data.select_dtypes(include=[np.number]).columns.tolist(),
+		data.select_dtypes(include=['object', 'category', 'string']).columns.tolist(),
+		data.select_dtypes(include=['datetime64']).columns.tolist(),
+	)
+
+
+def raw_data_summary(data: pd.DataFrame, profile=None) -> str:
+	"""The uncompacted summary format, used to report how many tokens were saved."""
+	parts = []
+	parts.append(f"Dataset shape: {data.shape[0]} rows, {data.shape[1]} columns")
+	numeric_cols, categorical_cols, datetime_cols = _columns_by_kind(data, profile)
+	parts.append(f"Numeric columns ({len(numeric_cols)}): {numeric_cols}")
+	parts.append(f"Categorical columns ({len(categorical_cols)}): {categorical_cols}")
+	if datetime_cols:
+		parts.append(f"DateTime columns ({len(datetime_cols)}): {datetime_cols}")
+	missing_info = profile.missing_counts() if profile is not None else data.isnull().sum()
+	if missing_info.sum() > 0:
+		parts.append(f"Missing values: {missing_info[missing_info > 0].to_dict()}")
+	parts.append(f"Sample data:\n{data.head(3).to_string()}")
+	if len(numeric_cols) > 0:
+		describe = profile.describe()[numeric_cols] if profile is not None else data[numeric_cols].describe()
+		parts.append(f"Numeric summary:\n{describe.to_string()}")
+	return "\n".join(parts)
+
+
+def _format_number(value: float) -> str:
+	if abs(value) >= 1000:
+		return f"{value:.0f}"
+	return f"{value:.{SIGNIFICANT_DIGITS}g}"
+
+
+def _column_list(cols: List[str], max_cols: int = None) -> str:
+	shown, hidden = _limit(cols, max_cols)
+	text = ", ".join(str(c) for c in shown)
+	return f"{text}, ... (+{hidden} more)" if hidden else text
+
+
+def compact_data_summary(data: pd.DataFrame, budget: int, priority: Sequence[str] = None, profile=None) -> str:
+	"""Dataset context for the prompt prefix, fitted to `budget` tokens.
+
+	Pass the frame's `profiling.DatasetProfile` to reuse its statistics, or,
+	when `data` is the row sample of a streamed file, its
+	`profiling.StreamingProfile` so shape, missing values and the numeric
+	summary describe the whole file.
+	"""
+	priority = list(priority) if priority else list(data.columns)
+	numeric, categorical, datetime = (set(cols) for cols in _columns_by_kind(data, profile))
+	numeric_cols = [c for c in priority if c in numeric]
+	categorical_cols = [c for c in priority if c in categorical]
+	datetime_cols = [c for c in priority if c in datetime]
+	if profile is not None:
+		rows = profile.rows
+		missing_info = profile.missing_counts()
+		describe = profile.describe().T.reindex(numeric_cols) if numeric_cols else None
+	else:
+		rows = data.shape[0]
+		missing_info = data.isnull().sum()
+		describe = data[numeric_cols].describe().T if numeric_cols else None
+	missing_info = missing_info[missing_info > 0]
+
+	text = ''
+	for max_cols, _, _, sample_rows in DETAIL_LEVELS:
+		parts = [f"Dataset shape: {rows} rows, {data.shape[1]} columns"]
+		parts.append(f"Numeric columns ({len(numeric_cols)}): {_column_list(numeric_cols, max_cols)}")
+		parts.append(f"Categorical columns ({len(categorical_cols)}): {_column_list(categorical_cols, max_cols)}")
+		if datetime_cols:
+			parts.append(f"DateTime columns ({len(datetime_cols)}): {_column_list(datetime_cols, max_cols)}")
+		if len(missing_info) > 0:
+			shown, hidden = _limit(_ordered(missing_info.index, priority), max_cols)
+			missing = {str(c): int(missing_info[c]) for c in shown}
+			parts.append(f"Missing values: {missing}" + (f" (+{hidden} more columns)" if hidden else ""))
+		if sample_rows:
+			sample_cols, _ = _limit(priority, max_cols)
+			parts.append(f"Sample data:\n{data[sample_cols].head(sample_rows).to_string(float_format=_format_number)}")
+		if describe is not None:
+			cols, hidden = _limit(numeric_cols, max_cols)
+			table = describe.loc[cols, [s for s in DESCRIBE_STATS if s in describe.columns]]
+			parts.append(f"Numeric summary:\n{table.to_string(float_format=_format_number)}" + (f"\n(+{hidden} more numeric columns)" if hidden else ""))
+		text = "\n".join(parts)
+		if estimate_tokens(text) <= budget:
+			break
+	return text
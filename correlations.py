@@ -0,0 +1,203 @@
+"""
+correlations.py
+Pearson correlation matrices: mergeable co-moments, blockwise computation and a shared store.
+
+`CoMoments` keeps pairwise co-moment sums that can be merged across chunks or
+partitions; streamed files use it directly. `correlation_matrix` computes the
+same pairwise-complete matrix as `DataFrame.corr()` for a frame in memory,
+with centred matrix products (BLAS) over blocks of rows, so memory stays
+bounded by the block and the p x p result however long or wide the frame is.
+
+`CorrelationStore` keeps computed matrices by dataset fingerprint (the dataset
+cache key) and column set, so every analysis, session and reload of the same
+data shares one computation. A request for fewer columns is served from a
+stored matrix that covers them.
+"""
+
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Cells converted to one float64 matrix at a time (8 bytes each)
+BLOCK_CELLS = 16 * 1024 * 1024
+DEFAULT_MAX_BYTES = int(float(os.environ.get("CORRELATION_CACHE_MB", "256")) * 1024 * 1024)
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+class CoMoments:
+	"""Pairwise co-moments of numeric columns: exact correlations, mergeable across chunks.
+
+	For every pair of columns this keeps the number of rows where both are
+	present and the sums of x, x*x and x*y over those rows, so the result
+	matches pandas' pairwise-complete `corr()`. Values are shifted by `shift`
+	(default: the first chunk's means) to keep the sums well conditioned. A
+	chunk costs one matrix product, four when it has missing values.
+	"""
+
+	__slots__ = ('columns', 'shift', 'n', 'sx', 'sxx', 'sxy')
+
+	def __init__(self, columns: List[str], shift: np.ndarray = None):
+		self.columns = list(columns)
+		p = len(self.columns)
+		self.shift: Optional[np.ndarray] = None if shift is None else np.nan_to_num(np.asarray(shift, dtype='float64'))
+		self.n = np.zeros((p, p))
+		# sx[i, j]: sum of column i over the rows where both i and j are present
+		self.sx = np.zeros((p, p))
+		self.sxx = np.zeros((p, p))
+		self.sxy = np.zeros((p, p))
+
+	def update(self, values: np.ndarray):
+		"""Add rows of a float matrix (NaN for missing) with one column per entry of `columns`."""
+		if len(values) == 0 or not self.columns:
+			return
+		if self.shift is None:
+			with warnings.catch_warnings():
+				# all-missing columns have no mean
+				warnings.simplefilter('ignore', RuntimeWarning)
+				self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+		x = values - self.shift
+		present = ~np.isnan(x)
+		if present.all():
+			self.n += len(x)
+			self.sx += x.sum(axis=0)[:, None]
+			self.sxx += (x * x).sum(axis=0)[:, None]
+		else:
+			mask = present.astype('float64')
+			x = np.where(present, x, 0.0)
+			self.n += mask.T @ mask
+			self.sx += x.T @ mask
+			self.sxx += (x * x).T @ mask
+		self.sxy += x.T @ x
+
+	def merge(self, other: "CoMoments"):
+		if other.shift is None:
+			return
+		if self.shift is None:
+			self.shift = other.shift.copy()
+			self.n, self.sx, self.sxx, self.sxy = other.n.copy(), other.sx.copy(), other.sxx.copy(), other.sxy.copy()
+			return
+		# re-express the other sums around this shift: x - shift = (x - other.shift) + d
+		d = other.shift - self.shift
+		self.n += other.n
+		self.sx += other.sx + d[:, None] * other.n
+		self.sxx += other.sxx + 2 * d[:, None] * other.sx + (d * d)[:, None] * other.n
+		self.sxy += other.sxy + other.sx * d[None, :] + d[:, None] * other.sx.T + np.outer(d, d) * other.n
+
+	def correlations(self) -> pd.DataFrame:
+		with np.errstate(invalid='ignore', divide='ignore'):
+			cov = self.n * self.sxy - self.sx * self.sx.T
+			var = self.n * self.sxx - self.sx * self.sx
+			corr = cov / np.sqrt(var * var.T)
+		# constant columns and pairs seen together fewer than twice have no correlation
+		corr[(var <= 0) | (var.T <= 0) | (self.n < 2)] = np.nan
+		corr = np.clip(corr, -1.0, 1.0)
+		diagonal = np.diag_indices_from(corr)
+		corr[diagonal] = np.where(np.isnan(corr[diagonal]), np.nan, 1.0)
+		return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+
+def correlation_matrix(data: pd.DataFrame, columns: List[str] = None, shift: np.ndarray = None) -> pd.DataFrame:
+	"""Pearson correlations of `columns` (default: numeric, non-boolean) with pairwise-complete rows, as `DataFrame.corr()`.
+
+	Rows are converted and folded in blocks of about BLOCK_CELLS values, each
+	with one matrix product (four with missing values). `shift`, e.g. the
+	column means, centres the values; without it the first block's means are
+	used.
+	"""
+	if columns is None:
+		columns = [c for c in data.columns if pd.api.types.is_numeric_dtype(data[c]) and not pd.api.types.is_bool_dtype(data[c])]
+	moments = CoMoments(columns, shift)
+	step = max(1, BLOCK_CELLS // max(len(moments.columns), 1))
+	for start in range(0, len(data), step):
+		moments.update(data.iloc[start:start + step][moments.columns].to_numpy(dtype='float64', na_value=np.nan))
+	return moments.correlations()
+
+
+class CorrelationStore:
+	"""Correlation matrices by dataset fingerprint and column set, bounded by total size.
+
+	Least recently used matrices are evicted first. Returned frames are shared
+	between callers and must not be modified.
+	"""
+
+	def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+		self.max_bytes = max_bytes
+		self._entries: "OrderedDict[Tuple[str, Tuple[str, ...]], pd.DataFrame]" = OrderedDict()
+		self._pending: Dict[Tuple[str, Tuple[str, ...]], threading.Lock] = {}
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, fingerprint: str, columns: List[str]) -> Optional[pd.DataFrame]:
+		"""The stored matrix of `columns`, cut from any stored matrix of the same dataset that covers them."""
+		key = (fingerprint, tuple(columns))
+		with self._lock:
+			matrix = self._entries.get(key)
+			if matrix is None:
+				wanted = set(columns)
+				for (other, stored), candidate in self._entries.items():
+					if other == fingerprint and wanted <= set(stored):
+						# each pairwise-complete entry depends only on its own two columns
+						matrix = candidate.loc[list(columns), list(columns)]
+						key = (other, stored)
+						break
+			if matrix is None:
+				self.misses += 1
+				return None
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return matrix
+
+	def put(self, fingerprint: str, columns: List[str], matrix: pd.DataFrame):
+		if matrix.size * 8 > self.max_bytes:
+			return
+		with self._lock:
+			self._entries[(fingerprint, tuple(columns))] = matrix
+			while sum(m.size * 8 for m in self._entries.values()) > self.max_bytes:
+				self._entries.popitem(last=False)
+
+	def correlations(self, data: pd.DataFrame, columns: List[str], fingerprint: str = None, shift: np.ndarray = None) -> pd.DataFrame:
+		"""`correlation_matrix(data, columns, shift)`, computed once per fingerprint and column set.
+
+		Without a fingerprint the data cannot be recognized later and the
+		matrix is computed and not stored.
+		"""
+		if fingerprint is None or self.max_bytes <= 0:
+			return correlation_matrix(data, columns, shift)
+		key = (fingerprint, tuple(columns))
+		with self._lock:
+			pending = self._pending.setdefault(key, threading.Lock())
+		# sessions opening the same dataset wait for the first computation instead of repeating it
+		with pending:
+			matrix = self.get(fingerprint, columns)
+			if matrix is None:
+				matrix = correlation_matrix(data, columns, shift)
+				self.put(fingerprint, columns, matrix)
+		with self._lock:
+			self._pending.pop(key, None)
+		return matrix
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': sum(m.size * 8 for m in self._entries.values())}
+
+
+def get_correlation_store() -> CorrelationStore:
+	"""Process-wide correlation store shared by all sessions."""
+	global _shared_store
+	with _shared_lock:
+		if _shared_store is None:
+			_shared_store = CorrelationStore()
+		return _shared_store
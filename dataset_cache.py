@@ -0,0 +1,401 @@
+"""
+dataset_cache.py
+Content-addressed columnar cache of parsed datasets.
+
+The first load of a file parses it as usual and stores the resulting DataFrame
+as an uncompressed Feather (Arrow IPC) file named after the hash of the source
+bytes. Later opens of the same content, under any file name, read that file
+memory-mapped instead of re-parsing CSV/Excel/JSON text. Each column is
+written as one contiguous array, and floats keep NaN as a value rather than
+an Arrow null, so numeric columns come back as views of the mapped file:
+reopening costs page-ins of the columns used, not a copy of the dataset.
+Text and categorical columns are still converted. Parquet can be chosen
+instead when disk space matters more than load time; it is decoded in full.
+
+The cache is bounded by total size and entry age; least recently opened
+entries are evicted first. pyarrow is optional: without it the cache is off.
+
+Other derived state, such as the profile of a streamed file, is kept next to
+the frames as pickles (`put_object` / `get_object`) under the same limits.
+Loading a pickle can run code, so the cache refuses a directory that another
+user owns or could write into (see `check_private`).
+
+`remember_source` records which file each entry was built from, by size and
+hash. `find_base` then recognizes a new file that is a recorded one plus
+trailing rows (same leading bytes, ending on a line break), so only the new
+rows have to be parsed and profiled.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import stat
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+	import pyarrow as pa
+	import pyarrow.feather as feather
+	import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+	pa = None
+
+DEFAULT_CACHE_DIR = os.environ.get("DATASET_CACHE_DIR") or os.path.join(os.environ.get("APP_CACHE_DIR", "/tmp/app_cache"), "datasets")
+DEFAULT_MAX_BYTES = int(float(os.environ.get("DATASET_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+DEFAULT_MAX_AGE = float(os.environ.get("DATASET_CACHE_MAX_AGE_DAYS", "7")) * 86400
+DEFAULT_FORMAT = os.environ.get("DATASET_CACHE_FORMAT", "feather")
+FORMATS = {'feather': '.feather', 'parquet': '.parquet'}
+OBJECT_SUFFIX = '.pkl'
+SOURCE_SUFFIX = '.src.json'
+
+# Bump when loader behaviour changes so stale conversions are not served
+LOADER_VERSION = "3"
+HASH_BLOCK = 4 * 1024 * 1024
+# Bytes at the end of a recorded source hashed for a quick append check
+TAIL_BYTES = 4096
+# Longest first line (header) used to find the recorded versions of a file
+HEAD_BYTES = 64 * 1024
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def _feed(h, f, count: int = None) -> int:
+	# hash up to `count` more bytes of `f` (all that is left when None); returns how many were read
+	done = 0
+	while count is None or done < count:
+		block = f.read(HASH_BLOCK if count is None else min(HASH_BLOCK, count - done))
+		if not block:
+			break
+		h.update(block)
+		done += len(block)
+	return done
+
+
+def hash_file(path: str) -> str:
+	"""SHA-256 of a file's bytes, read in blocks."""
+	h = hashlib.sha256()
+	with open(path, 'rb') as f:
+		_feed(h, f)
+	return h.hexdigest()
+
+
+def hash_prefixes(path: str, sizes, whole: bool = True) -> Tuple[Optional[str], Dict[int, str]]:
+	"""SHA-256 of the first `size` bytes of a file for each of `sizes`, all in one read.
+
+	With `whole` the read goes on to the end and the hash of the whole file
+	is returned as well (otherwise None). Sizes beyond the end are left out.
+	"""
+	h = hashlib.sha256()
+	prefixes = {}
+	pos = 0
+	with open(path, 'rb') as f:
+		for size in sorted(set(sizes)):
+			pos += _feed(h, f, size - pos)
+			if pos < size:
+				break
+			prefixes[size] = h.copy().hexdigest()
+		if whole:
+			_feed(h, f)
+	return (h.hexdigest() if whole else None), prefixes
+
+
+def check_private(directory: str):
+	"""Raise PermissionError unless only this user (or root) can change what `directory` holds.
+
+	The directory must belong to the current user and not be group or world
+	writable. Its parents must belong to the user or root and be writable
+	only by them, or carry the sticky bit like /tmp, so nobody else can swap
+	the directory out either.
+	"""
+	if not hasattr(os, 'getuid'):
+		# no POSIX owners (Windows); the user profile directory is private already
+		return
+	uid = os.getuid()
+	path = os.path.realpath(directory)
+	st = os.stat(path)
+	if st.st_uid != uid or st.st_mode & 0o022:
+		raise PermissionError(f"{path} must be owned by uid {uid} and not writable by group or others")
+	while True:
+		parent = os.path.dirname(path)
+		if parent == path:
+			return
+		path = parent
+		st = os.stat(path)
+		if st.st_uid not in (uid, 0) or (st.st_mode & 0o022 and not st.st_mode & stat.S_ISVTX):
+			raise PermissionError(f"{path} can be modified by other users")
+
+
+def _read_range(path: str, start: int, end: int) -> bytes:
+	with open(path, 'rb') as f:
+		f.seek(max(start, 0))
+		return f.read(end - max(start, 0))
+
+
+def _head(path: str) -> bytes:
+	# the first line (a CSV header, or the first JSON record) stays the same as rows are appended
+	head = _read_range(path, 0, HEAD_BYTES)
+	end = head.find(b'\n')
+	return head if end < 0 else head[:end + 1]
+
+
+class DatasetCache:
+	"""Parsed DataFrames stored as Feather/Parquet files keyed by source content."""
+
+	def __init__(self, directory: str = None, max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE, fmt: str = DEFAULT_FORMAT):
+		if pa is None:
+			raise RuntimeError("pyarrow is required for the dataset cache")
+		if fmt not in FORMATS:
+			raise ValueError(f"Dataset cache format must be one of {sorted(FORMATS)}, got {fmt!r}")
+		self.directory = directory or DEFAULT_CACHE_DIR
+		os.makedirs(self.directory, mode=0o700, exist_ok=True)
+		check_private(self.directory)
+		self.max_bytes = max_bytes
+		self.max_age = max_age
+		self.format = fmt
+		self.hits = 0
+		self.misses = 0
+		self._lock = threading.Lock()
+		# (path, size, mtime) -> content hash, so an unchanged file is hashed once per process
+		self._digests: Dict[Tuple[str, int, int], str] = {}
+
+	@staticmethod
+	def _stat_key(file_path: str) -> Tuple[str, int, int]:
+		st = os.stat(file_path)
+		return (os.path.realpath(file_path), st.st_size, st.st_mtime_ns)
+
+	def digest(self, file_path: str, content_hash: str = None) -> str:
+		"""SHA-256 of a file, remembered per (path, size, mtime); `content_hash` is returned as is."""
+		if content_hash is None:
+			stat_key = self._stat_key(file_path)
+			content_hash = self._digests.get(stat_key)
+			if content_hash is None:
+				content_hash = hash_file(file_path)
+				self._digests[stat_key] = content_hash
+		return content_hash
+
+	def key_for(self, file_path: str, content_hash: str = None, variant: str = '') -> str:
+		"""Cache key for a file; pass `content_hash` when the caller already has it."""
+		content_hash = self.digest(file_path, content_hash)
+		return hashlib.sha256(f"{content_hash}\0{variant}\0{LOADER_VERSION}".encode('utf-8')).hexdigest()
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.directory, key + FORMATS[self.format])
+
+	def get(self, key: str) -> Optional[pd.DataFrame]:
+		"""Load the cached DataFrame for `key`, or None on a miss."""
+		path = self._path(key)
+		try:
+			if self.format == 'feather':
+				table = feather.read_table(path, memory_map=True)
+			else:
+				table = pq.read_table(path, memory_map=True)
+			# one block per column, so single-chunk columns without nulls stay views of the file
+			data = table.to_pandas(split_blocks=True, self_destruct=True)
+			del table
+		except FileNotFoundError:
+			self.misses += 1
+			return None
+		except Exception:
+			# A truncated or unreadable entry is treated as a miss and dropped.
+			self.misses += 1
+			self._remove(path)
+			return None
+		try:
+			# mtime doubles as the last-access time for eviction
+			os.utime(path)
+		except OSError:
+			pass
+		self.hits += 1
+		return data
+
+	def put(self, key: str, data: pd.DataFrame) -> bool:
+		"""Store `data`; returns False when the frame cannot be represented in Arrow."""
+		if not all(isinstance(c, str) for c in data.columns) or not isinstance(data.index, pd.RangeIndex):
+			return False
+		path = self._path(key)
+		tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		try:
+			table = pa.Table.from_pandas(data, preserve_index=False)
+			for i, dtype in enumerate(data.dtypes):
+				if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+					# NaN stays a value: a column with nulls would have to be copied to fill them in on read
+					table = table.set_column(i, table.field(i), pa.array(data.iloc[:, i].to_numpy(), from_pandas=False))
+			if self.format == 'feather':
+				# uncompressed and in one record batch, so reads map each column as a single array
+				feather.write_feather(table, tmp, compression='uncompressed', chunksize=max(table.num_rows, 1))
+			else:
+				pq.write_table(table, tmp)
+			os.replace(tmp, path)
+		except Exception:
+			# Mixed-type object columns and the like are simply not cached.
+			self._remove(tmp)
+			return False
+		with self._lock:
+			self._evict(time.time())
+		return True
+
+	def _object_path(self, key: str) -> str:
+		return os.path.join(self.directory, key + OBJECT_SUFFIX)
+
+	def get_object(self, key: str) -> Any:
+		"""The object stored under `key` by `put_object`, or None."""
+		path = self._object_path(key)
+		try:
+			with open(path, 'rb') as f:
+				obj = pickle.load(f)
+		except FileNotFoundError:
+			return None
+		except Exception:
+			# written by an incompatible version of the code, or truncated
+			self._remove(path)
+			return None
+		try:
+			os.utime(path)
+		except OSError:
+			pass
+		return obj
+
+	def put_object(self, key: str, obj: Any) -> bool:
+		path = self._object_path(key)
+		tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		try:
+			with open(tmp, 'wb') as f:
+				pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+			os.replace(tmp, path)
+		except Exception:
+			self._remove(tmp)
+			return False
+		with self._lock:
+			self._evict(time.time())
+		return True
+
+	def _source_prefix(self, file_path: str, variant: str) -> str:
+		return hashlib.sha256(_head(file_path) + f"\0{variant}\0{LOADER_VERSION}".encode('utf-8')).hexdigest()[:32]
+
+	def remember_source(self, file_path: str, key: str, variant: str = '', content_hash: str = None):
+		"""Record that entry `key` was built from `file_path`, for `find_base` to match later versions of it."""
+		size = os.path.getsize(file_path)
+		content_hash = self.digest(file_path, content_hash)
+		record = {
+			'key': key,
+			'size': size,
+			'sha256': content_hash,
+			'tail': hashlib.sha256(_read_range(file_path, size - TAIL_BYTES, size)).hexdigest(),
+		}
+		path = os.path.join(self.directory, f"{self._source_prefix(file_path, variant)}-{content_hash[:32]}{SOURCE_SUFFIX}")
+		tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		try:
+			with open(tmp, 'w') as f:
+				json.dump(record, f)
+			os.replace(tmp, path)
+		except OSError:
+			self._remove(tmp)
+
+	def find_base(self, file_path: str, variant: str = '', content_hash: str = None) -> Optional[Dict[str, Any]]:
+		"""The recorded source that `file_path` extends with whole rows, or None.
+
+		Returns its record (`key`, `size`, `sha256`): the file's first `size`
+		bytes are exactly that source and end with a line break. The largest
+		such source still in the cache wins.
+
+		The candidates' prefixes are hashed in a single read of the file. When
+		`content_hash` is not given and the file's hash is not known yet, that
+		read continues to the end and remembers the hash for `key_for`, so a
+		grown file is read once in all.
+		"""
+		size = os.path.getsize(file_path)
+		prefix = self._source_prefix(file_path, variant) + '-'
+		records = []
+		for name in os.listdir(self.directory):
+			if not (name.startswith(prefix) and name.endswith(SOURCE_SUFFIX)):
+				continue
+			try:
+				with open(os.path.join(self.directory, name)) as f:
+					records.append(json.load(f))
+			except (OSError, ValueError):
+				continue
+		candidates = []
+		for record in sorted(records, key=lambda r: r.get('size', 0), reverse=True):
+			base_size = record.get('size', 0)
+			if not 0 < base_size < size:
+				continue
+			if not (os.path.exists(self._path(record['key'])) or os.path.exists(self._object_path(record['key']))):
+				continue
+			# cheap checks first: the old file ended a line and its last bytes are unchanged
+			tail = _read_range(file_path, base_size - TAIL_BYTES, base_size)
+			if tail.endswith(b'\n') and hashlib.sha256(tail).hexdigest() == record.get('tail'):
+				candidates.append(record)
+		if not candidates:
+			return None
+		stat_key = self._stat_key(file_path)
+		whole = content_hash is None and stat_key not in self._digests
+		full, prefixes = hash_prefixes(file_path, [r['size'] for r in candidates], whole)
+		if full is not None:
+			self._digests[stat_key] = full
+		for record in candidates:
+			if prefixes.get(record['size']) == record.get('sha256'):
+				return record
+		return None
+
+	def _entries(self):
+		for name in os.listdir(self.directory):
+			if not name.endswith(tuple(FORMATS.values()) + (OBJECT_SUFFIX, SOURCE_SUFFIX)):
+				continue
+			path = os.path.join(self.directory, name)
+			try:
+				st = os.stat(path)
+			except OSError:
+				continue
+			yield path, st.st_size, st.st_mtime
+
+	def _evict(self, now: float):
+		# caller holds the lock
+		entries = sorted(self._entries(), key=lambda e: e[2])
+		if self.max_age:
+			for path, _, mtime in entries:
+				if now - mtime > self.max_age:
+					self._remove(path)
+			entries = [e for e in entries if now - e[2] <= self.max_age]
+		total = sum(size for _, size, _ in entries)
+		for path, size, _ in entries:
+			if not self.max_bytes or total <= self.max_bytes:
+				break
+			self._remove(path)
+			total -= size
+
+	@staticmethod
+	def _remove(path: str):
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+
+	def clear(self):
+		with self._lock:
+			for path, _, _ in list(self._entries()):
+				self._remove(path)
+
+	def stats(self) -> Dict[str, int]:
+		entries = list(self._entries())
+		return {'hits': self.hits, 'misses': self.misses, 'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+
+def get_dataset_cache() -> Optional[DatasetCache]:
+	"""Process-wide dataset cache, or None when disabled, pyarrow is missing or the directory is unusable or not private."""
+	global _shared_cache
+	if os.environ.get("DATASET_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+		return None
+	with _shared_lock:
+		if _shared_cache is None:
+			try:
+				_shared_cache = DatasetCache()
+			except Exception:
+				# Caching parsed data is an optimization; loads work without it.
+				return None
+		return _shared_cache
@@ -0,0 +1,186 @@
+"""
+dtype_optimizer.py
+Shrink a freshly loaded DataFrame to compact dtypes.
+
+Parsers leave every text column as Python strings and every number as
+int64/float64. `optimize_dtypes` converts, column by column:
+
+- low-cardinality text to `category`
+- date-like text to `datetime64`
+- integers to the narrowest integer type of at least 32 bits that holds
+  their range (int8/int16 would wrap silently in numpy arithmetic on
+  `.values`, such as a product or a scaled sum, in analysis or user code)
+- floats to float32 when that is lossless
+- optionally, remaining object text to Arrow-backed strings
+
+and reports memory before and after. Every conversion is value-preserving;
+columns that would lose information are left as they are.
+"""
+
+import os
+import warnings
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+OPTIMIZE_DTYPES = os.environ.get("INGEST_OPTIMIZE_DTYPES", "1").lower() not in ("0", "false", "no")
+ARROW_STRINGS = os.environ.get("INGEST_ARROW_STRINGS", "").lower() in ("1", "true", "yes")
+
+# A text column becomes categorical when it has at most this share of distinct values
+CATEGORY_MAX_RATIO = 0.5
+# Share of sampled values that must parse with one date format
+DATE_MIN_PARSED = 0.95
+DATE_SAMPLE = 1000
+# Narrowest integer width kept; smaller types overflow in everyday arithmetic
+MIN_INT_BYTES = 4
+
+
+def _is_text(series: pd.Series) -> bool:
+	return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def _as_datetime(series: pd.Series):
+	"""The column parsed as dates with one inferred format, or None when it is not date-like."""
+	values = series.dropna()
+	if len(values) == 0:
+		return None
+	sample = values.iloc[:DATE_SAMPLE].astype(str)
+	# plain numbers (ids, amounts, years) are not dates
+	if pd.to_numeric(sample, errors='coerce').notna().mean() > 0.5:
+		return None
+	fmt = pd.tseries.api.guess_datetime_format(sample.iloc[0])
+	if fmt is None:
+		return None
+	parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+	if parsed.notna().mean() < DATE_MIN_PARSED:
+		return None
+	parsed = pd.to_datetime(series, format=fmt, errors='coerce')
+	# values that did not match the format would be lost
+	if parsed.notna().sum() != len(values):
+		return None
+	return parsed
+
+
+def _downcast_int(series: pd.Series) -> pd.Series:
+	narrow = pd.to_numeric(series, downcast='integer')
+	if narrow.dtype.itemsize >= MIN_INT_BYTES or narrow.dtype.itemsize >= series.dtype.itemsize:
+		return narrow
+	# nullable integers keep their mask
+	return narrow.astype('Int32' if pd.api.types.is_extension_array_dtype(narrow) else 'int32')
+
+
+def _downcast_float(series: pd.Series):
+	narrow = series.astype('float32')
+	if np.array_equal(narrow.to_numpy(dtype='float64'), series.to_numpy(dtype='float64'), equal_nan=True):
+		return narrow
+	return None
+
+
+def optimize_dtypes(data: pd.DataFrame, arrow_strings: bool = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+	"""Return a copy of `data` with compact dtypes and a report of what changed."""
+	arrow_strings = ARROW_STRINGS if arrow_strings is None else arrow_strings
+	before = int(data.memory_usage(deep=True).sum())
+	converted: Dict[str, str] = {}
+	columns = {}
+	rows = len(data)
+	for col in data.columns:
+		series = data[col]
+		old = str(series.dtype)
+		new = None
+		if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series):
+			pass
+		elif pd.api.types.is_integer_dtype(series):
+			new = _downcast_int(series)
+		elif pd.api.types.is_float_dtype(series):
+			new = _downcast_float(series)
+		elif _is_text(series):
+			with warnings.catch_warnings():
+				warnings.simplefilter('ignore')
+				new = _as_datetime(series)
+			if new is None and rows and series.nunique(dropna=True) <= rows * CATEGORY_MAX_RATIO:
+				new = series.astype('category')
+			if new is None and arrow_strings and pd.api.types.is_object_dtype(series) and pd.api.types.infer_dtype(series, skipna=True) == 'string':
+				new = series.astype(pd.StringDtype('pyarrow'))
+		if new is not None and str(new.dtype) != old:
+			columns[col] = new
+			converted[str(col)] = f"{old} -> {new.dtype}"
+	if columns:
+		# shallow copy: untouched columns keep sharing memory with the input
+		data = data.copy(deep=False)
+		for col, values in columns.items():
+			data[col] = values
+	after = int(data.memory_usage(deep=True).sum())
+	return data, {'memory_before': before, 'memory_after': after, 'converted': converted}
+
+
+
+def _conform(old: pd.Series, new: pd.Series):
+	"""`new` converted to the dtype of `old`, or None when its values do not fit it."""
+	if new.isna().all():
+		return new.astype(old.dtype) if not isinstance(old.dtype, pd.CategoricalDtype) else pd.Series(pd.Categorical(new, categories=old.cat.categories))
+	if isinstance(old.dtype, pd.CategoricalDtype):
+		return new if _is_text(new) else None
+	if pd.api.types.is_bool_dtype(old):
+		return new if pd.api.types.is_bool_dtype(new) else None
+	if pd.api.types.is_numeric_dtype(old):
+		if not pd.api.types.is_numeric_dtype(new) or pd.api.types.is_bool_dtype(new):
+			return None
+		if pd.api.types.is_integer_dtype(old) and pd.api.types.is_integer_dtype(new):
+			info = np.iinfo(getattr(old.dtype, 'numpy_dtype', old.dtype))
+			# keep the narrow type when the new values fit it; otherwise concat widens to the narrowest that holds both
+			return new.astype(old.dtype) if info.min <= new.min() and new.max() <= info.max else _downcast_int(new)
+		if old.dtype == np.float32 and pd.api.types.is_float_dtype(new):
+			narrow = _downcast_float(new)
+			return new if narrow is None else narrow
+		return new
+	if pd.api.types.is_datetime64_any_dtype(old):
+		if _is_text(new):
+			with warnings.catch_warnings():
+				warnings.simplefilter('ignore')
+				new = _as_datetime(new)
+		if new is None or not pd.api.types.is_datetime64_any_dtype(new):
+			return None
+		try:
+			# same unit and time zone as the existing dates
+			return new.astype(old.dtype)
+		except (TypeError, ValueError):
+			return None
+	return new if _is_text(new) else None
+
+
+def append_rows(data: pd.DataFrame, new_rows: pd.DataFrame):
+	"""`data` followed by `new_rows`, converted to the dtypes `data` already has.
+
+	Categories gain the new values, narrow numbers stay narrow where the new
+	values fit, date text is parsed like the existing dates. Returns None when
+	the new rows do not fit (other columns, text in a numeric column, dates
+	that do not parse); reload the whole file then.
+	"""
+	if list(new_rows.columns) != list(data.columns):
+		return None
+	combined = {}
+	for col in data.columns:
+		old = data[col]
+		new = _conform(old, new_rows[col].reset_index(drop=True))
+		if new is None:
+			return None
+		if isinstance(old.dtype, pd.CategoricalDtype):
+			categories = old.cat.categories
+			added = pd.Index(new.dropna().unique(), dtype=categories.dtype).difference(categories)
+			if len(added):
+				# one contiguous array: Arrow converts chunked (appended) categories very slowly
+				grown = pd.Index(np.concatenate([categories.to_numpy(), added.to_numpy()]), dtype=categories.dtype)
+				dtype = pd.CategoricalDtype(grown, ordered=old.cat.ordered)
+			else:
+				dtype = old.dtype
+			# existing codes stay valid as the category list only grows; new rows are coded against it
+			codes = np.concatenate([old.cat.codes.to_numpy(), dtype.categories.get_indexer(new)])
+			combined[col] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+			continue
+		values = pd.concat([old.reset_index(drop=True), new], ignore_index=True)
+		# numbers may widen; anything else changing type means the rows did not really fit
+		if values.dtype != old.dtype and not (pd.api.types.is_numeric_dtype(old) and pd.api.types.is_numeric_dtype(values)):
+			return None
+		combined[col] = values
+	return pd.DataFrame(combined, columns=data.columns)
@@ -0,0 +1,324 @@
+"""
+fake_ollama.py
+Deterministic stand-in for the Ollama HTTP API, for offline tests and benchmarks.
+
+Implements /api/tags, /api/ps, /api/version, /api/generate and /api/chat with
+configurable latency, prefill and decode speed, streaming chunk size and
+failure injection. Responses are derived from a hash of the prompt, so the same
+request always gets the same text. Prefix caching is simulated per model: the
+part of a prompt shared with the previous one is not counted as prompt-eval
+work, mirroring Ollama's KV-cache reuse.
+
+Run standalone and point the app at it:
+
+    python fake_ollama.py --port 11435 --tps 40 --latency 0.2
+    OLLAMA_HOST=http://127.0.0.1:11435 streamlit run web_ui.py
+
+or in-process:
+
+    server = FakeOllamaServer(FakeOllamaConfig(tokens_per_second=200)).start()
+    os.environ["OLLAMA_HOST"] = server.url
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+WORDS = (
+	"data distribution mean median variance outlier trend correlation column value "
+	"missing quality segment growth customer revenue pattern signal cluster forecast "
+	"recommend analysis feature metric sample insight significant strong weak range"
+).split()
+
+
+@dataclass
+class FakeOllamaConfig:
+	"""Behaviour of the fake server; all times in seconds."""
+	models: List[str] = field(default_factory=lambda: ["llama3.2:latest"])
+	latency: float = 0.05  # fixed delay before prefill starts
+	prefill_tokens_per_second: float = 2000.0  # 0 = instant prefill
+	tokens_per_second: float = 100.0  # decode speed; 0 = instant
+	chunk_tokens: int = 1  # tokens per streamed chunk
+	response_tokens: int = 64  # capped by options.num_predict
+	load_seconds: float = 0.0  # simulated model load on first use / empty prompt
+	failure_rate: float = 0.0  # probability of an HTTP 500
+	stall_rate: float = 0.0  # probability of never answering (until the client gives up)
+	parallel: int = 4  # concurrent generations, like OLLAMA_NUM_PARALLEL
+	seed: int = 0
+
+
+def _now() -> str:
+	return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _tokens(text: str) -> List[int]:
+	# ~4 characters per token, same estimate the prompt builder uses
+	return [int.from_bytes(hashlib.blake2b(text[i:i + 4].encode("utf-8"), digest_size=4).digest(), "little") for i in range(0, len(text), 4)]
+
+
+class _FakeState:
+	def __init__(self, config: FakeOllamaConfig):
+		self.config = config
+		self.random = random.Random(config.seed)
+		self.random_lock = threading.Lock()
+		self.slots = threading.Semaphore(max(config.parallel, 1))
+		self.loaded: Dict[str, float] = {}
+		self.last_prompt_tokens: Dict[str, List[int]] = {}
+		self.lock = threading.Lock()
+		self.requests = 0
+
+	def roll(self) -> float:
+		with self.random_lock:
+			return self.random.random()
+
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	state: _FakeState = None
+
+	def log_message(self, *args):
+		pass
+
+	def _json(self, status: int, payload: Dict[str, Any]):
+		body = json.dumps(payload).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		config = self.state.config
+		if self.path == "/api/tags":
+			models = [{"name": m, "model": m, "modified_at": _now(), "size": 0, "digest": hashlib.sha256(m.encode()).hexdigest(), "details": {"family": "fake"}} for m in config.models]
+			self._json(200, {"models": models})
+		elif self.path == "/api/ps":
+			with self.state.lock:
+				loaded = list(self.state.loaded)
+			self._json(200, {"models": [{"name": m, "model": m, "size": 0, "digest": hashlib.sha256(m.encode()).hexdigest()} for m in loaded]})
+		elif self.path == "/api/version":
+			self._json(200, {"version": "0.0.0-fake"})
+		elif self.path == "/":
+			body = b"Ollama is running"
+			self.send_response(200)
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+		else:
+			self._json(404, {"error": "not found"})
+
+	def do_POST(self):
+		length = int(self.headers.get("Content-Length") or 0)
+		try:
+			request = json.loads(self.rfile.read(length) or b"{}")
+		except ValueError:
+			self._json(400, {"error": "invalid JSON"})
+			return
+		if self.path == "/api/generate":
+			self._generate(request, chat=False)
+		elif self.path == "/api/chat":
+			self._generate(request, chat=True)
+		else:
+			self._json(404, {"error": "not found"})
+
+	def _generate(self, request: Dict[str, Any], chat: bool):
+		state = self.state
+		config = state.config
+		model = request.get("model", "")
+		if model not in config.models:
+			self._json(404, {"error": f"model '{model}' not found"})
+			return
+		with state.lock:
+			state.requests += 1
+		if config.failure_rate and state.roll() < config.failure_rate:
+			self._json(500, {"error": "injected failure"})
+			return
+		if config.stall_rate and state.roll() < config.stall_rate:
+			time.sleep(3600)
+			return
+
+		if chat:
+			prompt = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in request.get("messages", []))
+		else:
+			prompt = request.get("prompt") or ""
+		stream = request.get("stream", True)
+		options = request.get("options") or {}
+		started = time.perf_counter()
+
+		with state.slots:
+			load_seconds = 0.0
+			with state.lock:
+				needs_load = model not in state.loaded
+				state.loaded[model] = time.time()
+			if needs_load and config.load_seconds:
+				time.sleep(config.load_seconds)
+				load_seconds = config.load_seconds
+
+			if not prompt and not chat:
+				# An empty prompt only loads the model
+				self._send(stream, [], model, chat, {"done": True, "done_reason": "load", "load_duration": int(load_seconds * 1e9), "total_duration": int((time.perf_counter() - started) * 1e9)})
+				return
+
+			time.sleep(config.latency)
+			context = request.get("context") or []
+			prompt_tokens = list(context) + _tokens(prompt)
+			with state.lock:
+				previous = state.last_prompt_tokens.get(model, [])
+				state.last_prompt_tokens[model] = prompt_tokens
+			reused = 0
+			for a, b in zip(previous, prompt_tokens):
+				if a != b:
+					break
+				reused += 1
+			prompt_eval_count = max(len(prompt_tokens) - reused, 1)
+			t_prefill = time.perf_counter()
+			if config.prefill_tokens_per_second:
+				time.sleep(prompt_eval_count / config.prefill_tokens_per_second)
+			prompt_eval_seconds = time.perf_counter() - t_prefill
+
+			rng = random.Random(hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).digest())
+			n_tokens = int(options.get("num_predict") or config.response_tokens)
+			n_tokens = max(min(n_tokens, config.response_tokens), 0)
+			words = [rng.choice(WORDS) for _ in range(n_tokens)]
+			chunks = [" ".join(words[i:i + config.chunk_tokens]) + " " for i in range(0, n_tokens, max(config.chunk_tokens, 1))]
+			final = {
+				"done": True,
+				"done_reason": "stop",
+				"load_duration": int(load_seconds * 1e9),
+				"prompt_eval_count": prompt_eval_count,
+				"prompt_eval_duration": int(prompt_eval_seconds * 1e9),
+				"eval_count": n_tokens,
+			}
+			if not chat:
+				# like Ollama: the prompt's tokens followed by one per generated token
+				final["context"] = prompt_tokens + [int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=4).digest(), "little") for w in words]
+			self._send(stream, chunks, model, chat, final, started=started, decode_delay=(config.chunk_tokens / config.tokens_per_second) if config.tokens_per_second else 0.0)
+
+	def _send(self, stream: bool, chunks: List[str], model: str, chat: bool, final: Dict[str, Any], started: float = None, decode_delay: float = 0.0):
+		started = started or time.perf_counter()
+
+		def message(text: str, extra: Dict[str, Any] = None) -> Dict[str, Any]:
+			payload = {"model": model, "created_at": _now(), "done": False}
+			if chat:
+				payload["message"] = {"role": "assistant", "content": text}
+			else:
+				payload["response"] = text
+			payload.update(extra or {})
+			return payload
+
+		t_decode = time.perf_counter()
+		if not stream:
+			time.sleep(decode_delay * len(chunks))
+			final["eval_duration"] = int((time.perf_counter() - t_decode) * 1e9)
+			final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+			self._json(200, message("".join(chunks), final))
+			return
+
+		self.send_response(200)
+		self.send_header("Content-Type", "application/x-ndjson")
+		self.send_header("Transfer-Encoding", "chunked")
+		self.end_headers()
+		try:
+			for text in chunks:
+				time.sleep(decode_delay)
+				self._write_chunk(json.dumps(message(text)) + "\n")
+			final["eval_duration"] = int((time.perf_counter() - t_decode) * 1e9)
+			final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+			self._write_chunk(json.dumps(message("", final)) + "\n")
+			self.wfile.write(b"0\r\n\r\n")
+		except (BrokenPipeError, ConnectionResetError):
+			# the client cancelled the request; stop generating like Ollama does
+			pass
+
+	def _write_chunk(self, line: str):
+		data = line.encode("utf-8")
+		self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+		self.wfile.flush()
+
+
+class FakeOllamaServer:
+	"""Run the fake API on a background thread; use `url` as OLLAMA_HOST."""
+
+	def __init__(self, config: FakeOllamaConfig = None, host: str = "127.0.0.1", port: int = 0):
+		self.config = config or FakeOllamaConfig()
+		self.state = _FakeState(self.config)
+		handler = type("FakeOllamaHandler", (_Handler,), {"state": self.state})
+		self.httpd = ThreadingHTTPServer((host, port), handler)
+		self.httpd.daemon_threads = True
+		self._thread = None
+
+	@property
+	def url(self) -> str:
+		host, port = self.httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	@property
+	def request_count(self) -> int:
+		return self.state.requests
+
+	def start(self) -> "FakeOllamaServer":
+		self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-ollama", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self.httpd.shutdown()
+		self.httpd.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+
+def main():
+	defaults = FakeOllamaConfig()
+	parser = argparse.ArgumentParser(description="Deterministic fake Ollama server")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=11435)
+	parser.add_argument("--models", default=",".join(defaults.models), help="comma-separated model names")
+	parser.add_argument("--latency", type=float, default=defaults.latency)
+	parser.add_argument("--prefill-tps", type=float, default=defaults.prefill_tokens_per_second)
+	parser.add_argument("--tps", type=float, default=defaults.tokens_per_second)
+	parser.add_argument("--chunk-tokens", type=int, default=defaults.chunk_tokens)
+	parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens)
+	parser.add_argument("--load-seconds", type=float, default=defaults.load_seconds)
+	parser.add_argument("--failure-rate", type=float, default=defaults.failure_rate)
+	parser.add_argument("--stall-rate", type=float, default=defaults.stall_rate)
+	parser.add_argument("--parallel", type=int, default=defaults.parallel)
+	parser.add_argument("--seed", type=int, default=defaults.seed)
+	args = parser.parse_args()
+
+	config = FakeOllamaConfig(
+		models=[m.strip() for m in args.models.split(",") if m.strip()],
+		latency=args.latency,
+		prefill_tokens_per_second=args.prefill_tps,
+		tokens_per_second=args.tps,
+		chunk_tokens=args.chunk_tokens,
+		response_tokens=args.response_tokens,
+		load_seconds=args.load_seconds,
+		failure_rate=args.failure_rate,
+		stall_rate=args.stall_rate,
+		parallel=args.parallel,
+		seed=args.seed,
+	)
+	server = FakeOllamaServer(config, host=args.host, port=args.port)
+	print(f"Fake Ollama listening on {server.url}")
+	try:
+		server.httpd.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.httpd.server_close()
+
+
+if __name__ == "__main__":
+	main()
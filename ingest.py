@@ -0,0 +1,713 @@
+"""
+ingest.py
+File readers used by the analytics agent, with a choice of parse engine.
+
+Excel workbooks are read one sheet at a time: with the Rust calamine reader
+when python-calamine is installed, otherwise with openpyxl in read-only mode.
+`excel_sheets` lists the sheets without parsing any cells.
+
+CSV and JSON-lines text can be parsed by pandas' C parser or by pyarrow's
+multi-threaded readers. pyarrow is several times faster on large files but is
+optional; when it is missing, or fails on a file it cannot handle (ragged rows,
+odd encodings), reading falls back to pandas.
+
+The engine is picked per file: 'auto' uses pyarrow for files of at least
+INGEST_PYARROW_MIN_MB, where its start-up cost pays off. INGEST_PARSE_ENGINE
+forces 'pandas' or 'pyarrow' for every file.
+
+Compressed files (.gz, .zst, .bz2) and single-file .zip archives are
+decompressed on the fly while parsing; nothing is extracted to disk. The
+format is taken from the inner name, e.g. `export.csv.gz` or the member of
+`export.zip`.
+
+Parquet, Feather and SQLite files take a column list and row filters that are
+pushed down to the reader, so only the selected columns (and, for Parquet,
+the row groups whose statistics can match) are read. Filters use pyarrow's
+form: a list of `(column, op, value)` tuples that must all hold, or a list of
+such lists, any of which may hold. For text formats the same selection is
+applied after parsing (CSV still skips unused columns while parsing).
+Filter values given as text (as typed in the upload panel) are converted to
+the column's type first, so '02139' stays text for a text column and '5' is
+a number for a numeric one; a value that does not fit raises ValueError.
+
+Uncompressed CSV and JSON-lines files can also be read from a byte offset
+(`read_appended`, `read_chunks(offset=...)`), so rows appended to a file that
+was already loaded are parsed without re-reading the rest.
+"""
+
+import bz2
+import gzip
+import operator
+import os
+import sqlite3
+import struct
+import zipfile
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+	import pyarrow as pa
+	import pyarrow.csv as pa_csv
+	import pyarrow.dataset as pa_ds
+	import pyarrow.feather as pa_feather
+	import pyarrow.json as pa_json
+	import pyarrow.parquet as pa_parquet
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+	pa = None
+
+try:
+	import python_calamine
+except ImportError:
+	python_calamine = None
+
+ENGINES = ('auto', 'pandas', 'pyarrow')
+PARSE_ENGINE = os.environ.get("INGEST_PARSE_ENGINE", "auto")
+PYARROW_MIN_BYTES = int(float(os.environ.get("INGEST_PYARROW_MIN_MB", "1")) * 1024 * 1024)
+# Bytes of text per streamed pyarrow batch
+PYARROW_BLOCK_BYTES = 16 * 1024 * 1024
+# pandas chunk size when parsing appended rows in one go
+APPEND_CHUNK_ROWS = 500000
+
+CSV_SUFFIXES = ('.csv',)
+JSON_LINES_SUFFIXES = ('.ndjson', '.jsonl')
+EXCEL_SUFFIXES = ('.xlsx', '.xls')
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+FEATHER_SUFFIXES = ('.feather', '.arrow')
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd', '.bz2': 'bz2'}
+# Size estimate for compressed text whose uncompressed size is not recorded
+COMPRESSION_RATIO_GUESS = 5
+
+# Extensions accepted for upload, compressed variants included
+UPLOAD_TYPES = [
+	'csv', 'xlsx', 'xls', 'json', 'ndjson', 'jsonl', 'parquet', 'pq', 'feather', 'arrow',
+	'sqlite', 'sqlite3', 'db', 'gz', 'zst', 'bz2', 'zip',
+]
+
+FILTER_OPS = {
+	'=': operator.eq, '==': operator.eq, '!=': operator.ne,
+	'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+	'in': None, 'not in': None,
+}
+
+
+def _zip_member(file_path: str) -> zipfile.ZipInfo:
+	with zipfile.ZipFile(file_path) as archive:
+		members = [
+			info for info in archive.infolist()
+			if not info.is_dir() and not info.filename.startswith('__MACOSX/') and not os.path.basename(info.filename).startswith('._')
+		]
+	if len(members) != 1:
+		raise ValueError(f"Zip archives must contain exactly one data file, found {len(members)}.")
+	return members[0]
+
+
+def inner_name(file_path: str) -> Tuple[str, Optional[str]]:
+	"""(lower-cased name of the data inside, compression) for a possibly compressed file."""
+	low = file_path.lower()
+	for suffix, codec in COMPRESSION_SUFFIXES.items():
+		if low.endswith(suffix):
+			return low[:-len(suffix)], codec
+	if low.endswith('.zip'):
+		return _zip_member(file_path).filename.lower(), 'zip'
+	return low, None
+
+
+@contextmanager
+def open_stream(file_path: str, offset: int = 0) -> Iterator[BinaryIO]:
+	"""Binary stream of a file's contents, decompressed on the fly; uncompressed files can start at `offset`."""
+	_, codec = inner_name(file_path)
+	if offset and codec is not None:
+		raise ValueError("Compressed files can only be read from the start.")
+	if codec is None:
+		with open(file_path, 'rb') as f:
+			f.seek(offset)
+			yield f
+	elif codec == 'zip':
+		with zipfile.ZipFile(file_path) as archive, archive.open(_zip_member(file_path)) as f:
+			yield f
+	elif pa is not None:
+		# Arrow decompresses natively, zstd included
+		with pa.input_stream(file_path, compression=codec) as f:
+			yield f
+	elif codec == 'gzip':
+		with gzip.open(file_path, 'rb') as f:
+			yield f
+	elif codec == 'bz2':
+		with bz2.open(file_path, 'rb') as f:
+			yield f
+	else:
+		import zstandard
+		with zstandard.open(file_path, 'rb') as f:
+			yield f
+
+
+def data_size(file_path: str) -> int:
+	"""Uncompressed size of the data in bytes; estimated when the container does not record it."""
+	_, codec = inner_name(file_path)
+	size = os.path.getsize(file_path)
+	if codec == 'zip':
+		return _zip_member(file_path).file_size
+	if codec == 'gzip' and size >= 4:
+		# ISIZE trailer: uncompressed length modulo 4 GiB
+		with open(file_path, 'rb') as f:
+			f.seek(-4, os.SEEK_END)
+			isize = struct.unpack('<I', f.read(4))[0]
+		if isize >= size:
+			return isize
+	if codec is not None:
+		return size * COMPRESSION_RATIO_GUESS
+	return size
+
+
+def pick_engine(file_path: str, engine: str = None) -> str:
+	"""Resolve 'auto' (or None) to the engine that should parse `file_path`."""
+	engine = engine or PARSE_ENGINE
+	if engine not in ENGINES:
+		raise ValueError(f"Parse engine must be one of {ENGINES}, got {engine!r}")
+	if engine == 'pyarrow' and pa is None:
+		return 'pandas'
+	if engine == 'auto':
+		if pa is None:
+			return 'pandas'
+		try:
+			size = data_size(file_path)
+		except (OSError, ValueError, zipfile.BadZipFile):
+			return 'pandas'
+		return 'pyarrow' if size >= PYARROW_MIN_BYTES else 'pandas'
+	return engine
+
+
+def _to_pandas(table) -> pd.DataFrame:
+	# pyarrow infers ISO dates; hand them over as datetime64 rather than Python dates
+	return table.to_pandas(date_as_object=False)
+
+
+def read_csv(file_path: str, engine: str = None, columns: List[str] = None) -> Tuple[pd.DataFrame, str]:
+	"""Parse a CSV file, only `columns` when given; returns the frame and the engine that parsed it."""
+	if pick_engine(file_path, engine) == 'pyarrow':
+		try:
+			convert = pa_csv.ConvertOptions(include_columns=columns) if columns else None
+			with open_stream(file_path) as f:
+				return _to_pandas(pa_csv.read_csv(f, convert_options=convert)), 'pyarrow'
+		except (pa.ArrowInvalid, pa.ArrowNotImplementedError, UnicodeDecodeError, KeyError):
+			pass
+	with open_stream(file_path) as f:
+		return pd.read_csv(f, usecols=columns), 'pandas'
+
+
+def read_json_lines(file_path: str, engine: str = None) -> Tuple[pd.DataFrame, str]:
+	"""Parse newline-delimited JSON."""
+	if pick_engine(file_path, engine) == 'pyarrow':
+		try:
+			with open_stream(file_path) as f:
+				return _to_pandas(pa_json.read_json(f)), 'pyarrow'
+		except (pa.ArrowInvalid, pa.ArrowNotImplementedError, UnicodeDecodeError):
+			pass
+	with open_stream(file_path) as f:
+		return pd.read_json(f, lines=True), 'pandas'
+
+
+def read_json(file_path: str, engine: str = None) -> Tuple[pd.DataFrame, str]:
+	"""Parse a JSON document, or JSON lines when the file is not a single document."""
+	try:
+		# pyarrow only reads line-delimited JSON; whole documents go through pandas
+		with open_stream(file_path) as f:
+			return pd.read_json(f), 'pandas'
+	except ValueError:
+		return read_json_lines(file_path, engine)
+
+
+def _normalize_filters(filters) -> List[List[tuple]]:
+	"""Filters as a list of alternatives, each a list of (column, op, value) conditions."""
+	if not filters:
+		return []
+	groups = filters if isinstance(filters[0], list) else [filters]
+	for group in groups:
+		for condition in group:
+			if len(condition) != 3 or condition[1] not in FILTER_OPS:
+				raise ValueError(f"Filters are (column, op, value) with op one of {sorted(FILTER_OPS)}, got {condition!r}")
+	return [[tuple(c) for c in group] for group in groups]
+
+
+def _parse_value(col: str, kind: Optional[str], value):
+	if kind == 'text':
+		return value if value is None or isinstance(value, str) else str(value)
+	if not isinstance(value, str):
+		return value
+	text = value.strip()
+	try:
+		if kind == 'number':
+			try:
+				return int(text)
+			except ValueError:
+				return float(text)
+		if kind == 'datetime':
+			return pd.Timestamp(text)
+	except ValueError:
+		raise ValueError(f"Column {col!r} holds {'numbers' if kind == 'number' else 'dates'}; {value!r} is not one.") from None
+	if kind == 'bool':
+		if text.lower() in ('true', 'yes', '1'):
+			return True
+		if text.lower() in ('false', 'no', '0'):
+			return False
+		raise ValueError(f"Column {col!r} holds true/false values; {value!r} is not one.")
+	return value
+
+
+def typed_filters(filters, kinds) -> List[List[tuple]]:
+	"""`filters` with each value converted to its column's kind ('number', 'text', 'bool' or 'datetime').
+
+	Columns missing from `kinds`, or of another kind, keep their values as given.
+	"""
+	groups = []
+	for group in _normalize_filters(filters):
+		typed = []
+		for col, op, value in group:
+			kind = kinds.get(col)
+			if op in ('in', 'not in'):
+				value = [_parse_value(col, kind, v) for v in value]
+			else:
+				value = _parse_value(col, kind, value)
+			typed.append((col, op, value))
+		groups.append(typed)
+	return groups
+
+
+def _arrow_kinds(schema) -> dict:
+	kinds = {}
+	for field in schema:
+		t = field.type
+		if pa.types.is_dictionary(t):
+			t = t.value_type
+		if pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_decimal(t):
+			kinds[field.name] = 'number'
+		elif pa.types.is_string(t) or pa.types.is_large_string(t) or getattr(pa.types, 'is_string_view', lambda _: False)(t):
+			kinds[field.name] = 'text'
+		elif pa.types.is_boolean(t):
+			kinds[field.name] = 'bool'
+		elif pa.types.is_timestamp(t) or pa.types.is_date(t):
+			kinds[field.name] = 'datetime'
+	return kinds
+
+
+def _frame_kinds(data: pd.DataFrame) -> dict:
+	kinds = {}
+	for col in data.columns:
+		dtype = data[col].dtype
+		if isinstance(dtype, pd.CategoricalDtype):
+			dtype = dtype.categories.dtype
+		if pd.api.types.is_bool_dtype(dtype):
+			kinds[col] = 'bool'
+		elif pd.api.types.is_numeric_dtype(dtype):
+			kinds[col] = 'number'
+		elif pd.api.types.is_datetime64_any_dtype(dtype):
+			kinds[col] = 'datetime'
+		elif pd.api.types.is_string_dtype(dtype):
+			kinds[col] = 'text'
+	return kinds
+
+
+@contextmanager
+def _filter_errors(groups):
+	# a value that still does not fit the column surfaces as a plain message, not an Arrow kernel error
+	try:
+		yield
+	except (pa.ArrowNotImplementedError, pa.ArrowTypeError, pa.ArrowInvalid) as e:
+		if not groups:
+			raise
+		raise ValueError(f"The row filter does not fit the column types: {e}") from e
+
+
+def filter_columns(filters) -> List[str]:
+	"""Columns referenced by `filters`, in order of first use."""
+	names = []
+	for group in _normalize_filters(filters):
+		for col, _, _ in group:
+			if col not in names:
+				names.append(col)
+	return names
+
+
+def select(data: pd.DataFrame, columns: List[str] = None, filters=None) -> pd.DataFrame:
+	"""Rows of `data` matching `filters`, restricted to `columns`; for readers without pushdown."""
+	groups = typed_filters(filters, _frame_kinds(data)) if filters else []
+	if groups:
+		keep = np.zeros(len(data), dtype=bool)
+		for group in groups:
+			match = np.ones(len(data), dtype=bool)
+			for col, op, value in group:
+				if op in ('in', 'not in'):
+					hit = data[col].isin(value).to_numpy()
+					match &= hit if op == 'in' else ~hit
+				else:
+					try:
+						match &= FILTER_OPS[op](data[col], value).fillna(False).to_numpy(dtype=bool)
+					except TypeError as e:
+						raise ValueError(f"The row filter does not fit the column types: {e}") from e
+			keep |= match
+		data = data[keep].reset_index(drop=True)
+	if columns:
+		data = data[list(columns)]
+	return data
+
+
+def _require_pyarrow(kind: str):
+	if pa is None:
+		raise ValueError(f"Reading {kind} files requires pyarrow.")
+
+
+@contextmanager
+def _arrow_source(file_path: str):
+	# Parquet and Feather need random access: compressed copies are decompressed into memory
+	if inner_name(file_path)[1] is None:
+		yield file_path
+	else:
+		with open_stream(file_path) as f:
+			yield pa.BufferReader(f.read())
+
+
+def read_parquet(file_path: str, columns: List[str] = None, filters=None) -> Tuple[pd.DataFrame, str]:
+	"""Read a Parquet file; only `columns` are decoded and row groups that cannot match `filters` are skipped."""
+	_require_pyarrow('Parquet')
+	with _arrow_source(file_path) as source:
+		groups = typed_filters(filters, _arrow_kinds(pa_parquet.read_schema(source))) if filters else []
+		with _filter_errors(groups):
+			table = pa_parquet.read_table(source, columns=columns or None, filters=groups or None, memory_map=isinstance(source, str))
+	return _to_pandas(table), 'pyarrow'
+
+
+def read_feather(file_path: str, columns: List[str] = None, filters=None) -> Tuple[pd.DataFrame, str]:
+	"""Read a Feather (Arrow IPC) file memory-mapped; unselected columns are never touched."""
+	_require_pyarrow('Feather')
+	groups = _normalize_filters(filters)
+	with _arrow_source(file_path) as source:
+		if isinstance(source, str) and groups:
+			dataset = pa_ds.dataset(source, format='feather')
+			groups = typed_filters(groups, _arrow_kinds(dataset.schema))
+			with _filter_errors(groups):
+				table = dataset.to_table(columns=columns or None, filter=pa_parquet.filters_to_expression(groups))
+		else:
+			needed = list(dict.fromkeys(list(columns) + filter_columns(groups))) if columns else None
+			table = pa_feather.read_table(source, columns=needed, memory_map=isinstance(source, str))
+			if groups:
+				groups = typed_filters(groups, _arrow_kinds(table.schema))
+				with _filter_errors(groups):
+					table = table.filter(pa_parquet.filters_to_expression(groups))
+			if columns:
+				table = table.select(list(columns))
+	return _to_pandas(table), 'pyarrow'
+
+
+def _quote(name: str) -> str:
+	return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sqlite_connect(file_path: str) -> sqlite3.Connection:
+	if inner_name(file_path)[1] is not None:
+		raise ValueError("SQLite databases cannot be read from a compressed file; upload the .db itself.")
+	# read-only, so a user-supplied query cannot modify the upload
+	return sqlite3.connect(f"{Path(file_path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def sqlite_tables(file_path: str) -> List[str]:
+	"""Tables and views of a SQLite database."""
+	with closing(_sqlite_connect(file_path)) as conn:
+		rows = conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall()
+	return [name for (name,) in rows]
+
+
+def _sqlite_table(file_path: str, table: str = None) -> str:
+	if table is None:
+		tables = sqlite_tables(file_path)
+		if not tables:
+			raise ValueError("The SQLite database has no tables.")
+		table = tables[0]
+	return table
+
+
+def _sqlite_source(file_path: str, table: str = None, query: str = None) -> str:
+	if query:
+		return f"({query.strip().rstrip(';')})"
+	return _quote(_sqlite_table(file_path, table))
+
+
+def _sqlite_kinds(conn: sqlite3.Connection, table: str = None) -> dict:
+	"""Kinds of a table's columns from their declared types (SQLite's affinity rules); {} for queries."""
+	if table is None:
+		return {}
+	kinds = {}
+	for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({_quote(table)})"):
+		declared = (declared or '').upper()
+		if 'INT' in declared or any(t in declared for t in ('REAL', 'FLOA', 'DOUB')):
+			kinds[name] = 'number'
+		elif any(t in declared for t in ('CHAR', 'CLOB', 'TEXT')):
+			kinds[name] = 'text'
+	return kinds
+
+
+def _sql_where(filters) -> Tuple[str, list]:
+	alternatives, params = [], []
+	for group in _normalize_filters(filters):
+		parts = []
+		for col, op, value in group:
+			if op in ('in', 'not in'):
+				values = list(value)
+				parts.append(f"{_quote(col)} {op.upper()} ({', '.join('?' * len(values))})")
+				params.extend(values)
+			else:
+				parts.append(f"{_quote(col)} {'=' if op == '==' else op} ?")
+				params.append(value)
+		alternatives.append('(' + ' AND '.join(parts) + ')')
+	return ' OR '.join(alternatives), params
+
+
+def read_sqlite(file_path: str, table: str = None, query: str = None, columns: List[str] = None, filters=None, limit: int = None) -> Tuple[pd.DataFrame, str]:
+	"""Read a table (default: the first) or the result of `query` from a SQLite database.
+
+	Column selection, filters and `limit` become part of the SQL, so SQLite
+	only returns the matching rows and columns.
+	"""
+	select_list = ', '.join(_quote(c) for c in columns) if columns else '*'
+	table = None if query else _sqlite_table(file_path, table)
+	sql = f"SELECT {select_list} FROM {_sqlite_source(file_path, table, query)} AS source"
+	with closing(_sqlite_connect(file_path)) as conn:
+		if filters:
+			# a bound number never equals text such as '02139', so values follow the declared column types
+			filters = typed_filters(filters, _sqlite_kinds(conn, table))
+		where, params = _sql_where(filters)
+		if where:
+			sql += f" WHERE {where}"
+		if limit is not None:
+			sql += " LIMIT ?"
+			params.append(int(limit))
+		return pd.read_sql_query(sql, conn, params=params), 'sqlite'
+
+
+def list_columns(file_path: str, table: str = None, query: str = None) -> List[str]:
+	"""Column names of a Parquet, Feather or SQLite source, read from its schema."""
+	name, _ = inner_name(file_path)
+	if name.endswith(SQLITE_SUFFIXES):
+		with closing(_sqlite_connect(file_path)) as conn:
+			cursor = conn.execute(f"SELECT * FROM {_sqlite_source(file_path, table, query)} AS source LIMIT 0")
+			return [d[0] for d in cursor.description]
+	_require_pyarrow('Parquet and Feather')
+	with _arrow_source(file_path) as source:
+		if name.endswith(PARQUET_SUFFIXES):
+			return list(pa_parquet.read_schema(source).names)
+		if name.endswith(FEATHER_SUFFIXES):
+			return list(pa.ipc.open_file(pa.memory_map(source) if isinstance(source, str) else source).schema.names)
+	raise ValueError("Column listing supports Parquet, Feather and SQLite files.")
+
+
+def excel_sheets(file_path: str) -> List[str]:
+	"""Sheet names of a workbook, read from its index without loading any cells."""
+	name, codec = inner_name(file_path)
+	if codec is not None:
+		with open_stream(file_path) as f, pd.ExcelFile(f) as workbook:
+			return list(workbook.sheet_names)
+	if python_calamine is not None:
+		return list(python_calamine.CalamineWorkbook.from_path(file_path).sheet_names)
+	if name.endswith('.xlsx'):
+		import openpyxl
+		workbook = openpyxl.load_workbook(file_path, read_only=True)
+		try:
+			return list(workbook.sheetnames)
+		finally:
+			workbook.close()
+	with pd.ExcelFile(file_path) as workbook:
+		return list(workbook.sheet_names)
+
+
+def read_excel(file_path: str, sheet_name=None) -> Tuple[pd.DataFrame, str]:
+	"""Read one sheet (by name or position, default the first) of a workbook."""
+	sheet_name = 0 if sheet_name is None else sheet_name
+	name, codec = inner_name(file_path)
+	if codec is not None:
+		# workbooks are zip files themselves and need random access
+		with open_stream(file_path) as f:
+			return pd.read_excel(f, sheet_name=sheet_name), 'pandas'
+	if python_calamine is not None:
+		try:
+			return pd.read_excel(file_path, sheet_name=sheet_name, engine='calamine'), 'calamine'
+		except Exception:
+			pass
+	if name.endswith('.xlsx'):
+		# pandas opens the workbook read-only and parses only the requested sheet
+		return pd.read_excel(file_path, sheet_name=sheet_name, engine='openpyxl'), 'openpyxl'
+	return pd.read_excel(file_path, sheet_name=sheet_name), 'pandas'
+
+
+def read_file(file_path: str, engine: str = None, sheet_name=None, columns: List[str] = None, filters=None, table: str = None, query: str = None) -> Tuple[pd.DataFrame, str]:
+	"""Load a CSV, Excel, JSON, JSON-lines, Parquet, Feather or SQLite file; returns (frame, engine used).
+
+	`sheet_name` picks the worksheet of an Excel file, `table` or `query` the
+	data of a SQLite database; each is ignored for other formats. Only
+	`columns` (default: all) and rows matching `filters` are returned.
+	"""
+	name, _ = inner_name(file_path)
+	if name.endswith(PARQUET_SUFFIXES):
+		return read_parquet(file_path, columns, filters)
+	if name.endswith(FEATHER_SUFFIXES):
+		return read_feather(file_path, columns, filters)
+	if name.endswith(SQLITE_SUFFIXES):
+		return read_sqlite(file_path, table, query, columns, filters)
+	if name.endswith(CSV_SUFFIXES):
+		needed = list(dict.fromkeys(list(columns) + filter_columns(filters))) if columns else None
+		data, used = read_csv(file_path, engine, needed)
+	elif name.endswith(EXCEL_SUFFIXES):
+		data, used = read_excel(file_path, sheet_name)
+	elif name.endswith(JSON_LINES_SUFFIXES):
+		data, used = read_json_lines(file_path, engine)
+	elif name.endswith('.json'):
+		data, used = read_json(file_path, engine)
+	else:
+		raise ValueError("Unsupported file format. Use CSV, Excel, JSON, JSON lines, Parquet, Feather or SQLite, optionally gzip/zstd/bz2-compressed or zipped.")
+	return select(data, columns, filters), used
+
+
+def read_head(file_path: str, rows: int, engine: str = None, sheet_name=None, columns: List[str] = None, filters=None, table: str = None, query: str = None) -> pd.DataFrame:
+	"""The first `rows` rows of what `read_file` would return, reading little more than that.
+
+	Used for an instant preview: the cost depends on `rows`, not the file
+	size, except for whole JSON documents and compressed Parquet/Feather,
+	which are read in full.
+	"""
+	name, codec = inner_name(file_path)
+	if name.endswith(SQLITE_SUFFIXES):
+		return read_sqlite(file_path, table, query, columns, filters, limit=rows)[0]
+	if name.endswith(PARQUET_SUFFIXES + FEATHER_SUFFIXES) and codec is None and pa is not None:
+		if filters:
+			dataset = pa_ds.dataset(file_path, format='parquet' if name.endswith(PARQUET_SUFFIXES) else 'feather')
+			groups = typed_filters(filters, _arrow_kinds(dataset.schema))
+			with _filter_errors(groups):
+				return _to_pandas(dataset.head(rows, columns=columns or None, filter=pa_parquet.filters_to_expression(groups)))
+		if name.endswith(PARQUET_SUFFIXES):
+			# decodes only the start of the first row group
+			batches = pa_parquet.ParquetFile(file_path).iter_batches(batch_size=rows, columns=columns or None)
+			head = next(batches, None)
+			return _to_pandas(head) if head is not None else read_parquet(file_path, columns)[0]
+		with pa.ipc.open_file(pa.memory_map(file_path)) as reader:
+			batches, count = [], 0
+			for i in range(reader.num_record_batches):
+				if count >= rows:
+					break
+				batch = reader.get_batch(i)
+				batches.append(batch.select(list(columns)) if columns else batch)
+				count += batch.num_rows
+			table = pa.Table.from_batches(batches, schema=None if batches else reader.schema)
+		return _to_pandas(table.slice(0, rows))
+	if filters:
+		# the first rows that match may lie anywhere in the file
+		return read_file(file_path, engine, sheet_name, columns, filters)[0].head(rows)
+	if name.endswith(CSV_SUFFIXES):
+		with open_stream(file_path) as f:
+			data = pd.read_csv(f, nrows=rows, usecols=columns)
+	elif name.endswith(JSON_LINES_SUFFIXES):
+		with open_stream(file_path) as f:
+			data = pd.read_json(f, lines=True, nrows=rows)
+	elif name.endswith(EXCEL_SUFFIXES):
+		sheet = 0 if sheet_name is None else sheet_name
+		if codec is None and python_calamine is not None:
+			data = pd.read_excel(file_path, sheet_name=sheet, nrows=rows, engine='calamine')
+		else:
+			with open_stream(file_path) as f:
+				data = pd.read_excel(f, sheet_name=sheet, nrows=rows)
+	else:
+		return read_file(file_path, engine, sheet_name, columns, filters)[0].head(rows)
+	return select(data, columns)
+
+
+def is_excel(file_path: str) -> bool:
+	return inner_name(file_path)[0].endswith(EXCEL_SUFFIXES)
+
+
+def is_sqlite(file_path: str) -> bool:
+	return inner_name(file_path)[0].endswith(SQLITE_SUFFIXES)
+
+
+def is_columnar(file_path: str) -> bool:
+	"""Parquet or Feather: typed and column-addressable, so projection is cheap."""
+	return inner_name(file_path)[0].endswith(PARQUET_SUFFIXES + FEATHER_SUFFIXES)
+
+
+def can_stream(file_path: str) -> bool:
+	"""Whether `read_chunks` can read this file incrementally."""
+	return inner_name(file_path)[0].endswith(CSV_SUFFIXES + JSON_LINES_SUFFIXES)
+
+
+def can_append(file_path: str) -> bool:
+	"""Whether rows appended to this file can be parsed on their own, from a byte offset."""
+	name, codec = inner_name(file_path)
+	return codec is None and name.endswith(CSV_SUFFIXES + JSON_LINES_SUFFIXES)
+
+
+def _csv_options(offset: int, columns: List[str], text_columns) -> dict:
+	# past the header the column names come from the rows already loaded; text
+	# columns stay text even when the new rows happen to look numeric
+	if not offset:
+		return {}
+	return {'columns': list(columns), 'text_columns': [c for c in text_columns if c in columns]}
+
+
+def _pyarrow_csv_chunks(file_path: str, offset: int = 0, columns: List[str] = None, text_columns=()) -> Iterator[pd.DataFrame]:
+	options = _csv_options(offset, columns, text_columns)
+	read_options = pa_csv.ReadOptions(block_size=PYARROW_BLOCK_BYTES, column_names=options.get('columns'))
+	convert = pa_csv.ConvertOptions(column_types={c: pa.string() for c in options.get('text_columns', ())})
+	with open_stream(file_path, offset) as f:
+		reader = pa_csv.open_csv(f, read_options=read_options, convert_options=convert)
+		for batch in reader:
+			yield _to_pandas(batch)
+
+
+def _pandas_chunks(file_path: str, chunk_rows: int, lines_json: bool, offset: int = 0, columns: List[str] = None, text_columns=()) -> Iterator[pd.DataFrame]:
+	with open_stream(file_path, offset) as f:
+		if lines_json:
+			reader = pd.read_json(f, lines=True, chunksize=chunk_rows)
+		else:
+			options = _csv_options(offset, columns, text_columns)
+			header = {'header': None, 'names': options['columns'], 'dtype': {c: str for c in options['text_columns']}} if options else {}
+			reader = pd.read_csv(f, chunksize=chunk_rows, **header)
+		with reader:
+			yield from reader
+
+
+def read_appended(file_path: str, offset: int, columns: List[str], engine: str = None, text_columns=()) -> Tuple[pd.DataFrame, str]:
+	"""Parse only the rows after byte `offset` (a row boundary) of an uncompressed CSV or JSON-lines file.
+
+	`columns` are the column names of the rows before `offset`; `text_columns`
+	are read as text whatever the new values look like, so their type matches
+	the rows already loaded.
+	"""
+	chunks, engine = read_chunks(file_path, APPEND_CHUNK_ROWS, engine, offset, columns, text_columns)
+	with closing(chunks):
+		parts = list(chunks)
+	if not parts:
+		return pd.DataFrame(columns=list(columns)), engine
+	return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0], engine
+
+
+def read_chunks(file_path: str, chunk_rows: int, engine: str = None, offset: int = 0, columns: List[str] = None, text_columns=()) -> Tuple[Iterator[pd.DataFrame], str]:
+	"""Iterate over a CSV or JSON-lines file in chunks; returns (chunks, engine).
+
+	pyarrow chunks are sized in bytes rather than rows. A pyarrow stream can
+	still fail part-way (a type that changes late in the file), so callers
+	should be ready to restart with engine='pandas'.
+
+	With `offset` only the rows after that byte are read (see `read_appended`
+	for `columns` and `text_columns`).
+	"""
+	if offset and not can_append(file_path):
+		raise ValueError("Only uncompressed CSV and JSON-lines files can be read from an offset.")
+	name, _ = inner_name(file_path)
+	if name.endswith(CSV_SUFFIXES):
+		if pick_engine(file_path, engine) == 'pyarrow':
+			return _pyarrow_csv_chunks(file_path, offset, columns, text_columns), 'pyarrow'
+		return _pandas_chunks(file_path, chunk_rows, False, offset, columns, text_columns), 'pandas'
+	if name.endswith(JSON_LINES_SUFFIXES):
+		return _pandas_chunks(file_path, chunk_rows, True, offset), 'pandas'
+	raise ValueError("Streaming ingest supports CSV and JSON-lines files.")
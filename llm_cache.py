@@ -0,0 +1,124 @@
+"""
+llm_cache.py
+Persistent, content-addressed cache for Ollama responses.
+
+Entries are keyed by a hash of (model name, full prompt, generation options)
+and stored in a SQLite file, so repeated analyses of the same dataset are
+served from disk even after the process or container restarts. The cache is
+bounded by total size and entry age; least recently used entries go first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = os.environ.get("APP_CACHE_DIR", "/tmp/app_cache")
+DEFAULT_MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+DEFAULT_MAX_AGE = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def make_cache_key(model: str, prompt: str, options: Dict[str, Any] = None) -> str:
+	"""Stable key for a generation request."""
+	h = hashlib.sha256()
+	h.update(model.encode("utf-8"))
+	h.update(b"\0")
+	h.update(hashlib.sha256(prompt.encode("utf-8")).digest())
+	h.update(b"\0")
+	h.update(json.dumps(options or {}, sort_keys=True, default=str).encode("utf-8"))
+	return h.hexdigest()
+
+
+class LLMResponseCache:
+	"""SQLite-backed LRU cache of model responses with size and age limits."""
+
+	def __init__(self, path: str = None, max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE):
+		if path is None:
+			os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
+			path = os.path.join(DEFAULT_CACHE_DIR, "llm_responses.sqlite")
+		self.path = path
+		self.max_bytes = max_bytes
+		self.max_age = max_age
+		self.hits = 0
+		self.misses = 0
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(path, check_same_thread=False)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS responses ("
+			"key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, "
+			"created REAL, last_access REAL, hits INTEGER DEFAULT 0)"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+		self._conn.commit()
+
+	def get(self, key: str) -> Optional[str]:
+		"""Return the cached response for `key`, or None on a miss or expired entry."""
+		now = time.time()
+		with self._lock:
+			row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+			if row is None or (self.max_age and now - row[1] > self.max_age):
+				self.misses += 1
+				return None
+			self._conn.execute("UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+			self._conn.commit()
+			self.hits += 1
+			return row[0]
+
+	def put(self, key: str, response: str, model: str = None):
+		now = time.time()
+		size = len(response.encode("utf-8"))
+		with self._lock:
+			self._conn.execute(
+				"INSERT OR REPLACE INTO responses (key, model, response, size, created, last_access, hits) VALUES (?, ?, ?, ?, ?, ?, 0)",
+				(key, model, response, size, now, now),
+			)
+			self._evict(now)
+			self._conn.commit()
+
+	def _evict(self, now: float):
+		# caller holds the lock
+		if self.max_age:
+			self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+		if self.max_bytes:
+			total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+			if total > self.max_bytes:
+				excess = total - self.max_bytes
+				victims = []
+				for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+					victims.append((key,))
+					excess -= size
+					if excess <= 0:
+						break
+				self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+	def clear(self):
+		with self._lock:
+			self._conn.execute("DELETE FROM responses")
+			self._conn.commit()
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+		return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+	"""Process-wide cache instance, or None when disabled or the directory is unusable."""
+	global _shared_cache
+	if os.environ.get("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+		return None
+	with _shared_lock:
+		if _shared_cache is None:
+			try:
+				_shared_cache = LLMResponseCache()
+			except Exception:
+				# An unwritable cache dir should never break analyses.
+				return None
+		return _shared_cache
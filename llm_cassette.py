@@ -0,0 +1,173 @@
+"""
+llm_cassette.py
+Record and replay Ollama interactions with their timing.
+
+In record mode every generation made through the request layers is appended to
+a JSONL cassette: the request (model, a hash of the prompt, options), each
+streamed chunk and its offset from the start of the request. In replay mode
+the same chunks are served back on the recorded schedule, optionally scaled,
+without touching Ollama. This reproduces production latency profiles locally
+and lets the non-LLM code paths be benchmarked with realistic response sizes.
+
+Enable through the environment (read by `llm_client`):
+
+    OLLAMA_CASSETTE=cassettes/prod.jsonl OLLAMA_CASSETTE_MODE=record
+    OLLAMA_CASSETTE=cassettes/prod.jsonl OLLAMA_CASSETTE_MODE=replay OLLAMA_CASSETTE_LATENCY_SCALE=0.5
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm_cache import make_cache_key
+
+MODES = ('record', 'replay')
+
+
+class CassetteMissError(LookupError):
+	"""Raised in replay mode when no recorded interaction matches a request."""
+
+
+def request_key(model: str, prompt: str, options: Dict[str, Any] = None, kwargs: Dict[str, Any] = None) -> str:
+	"""Match key for a request; `keep_alive` does not change the response and is ignored."""
+	extra = {k: v for k, v in (kwargs or {}).items() if k != 'keep_alive'}
+	if 'context' in extra and extra['context'] is not None:
+		extra['context'] = hashlib.sha256(json.dumps(list(extra['context'])).encode('utf-8')).hexdigest()
+	return make_cache_key(model, prompt, {'options': options or {}, 'kwargs': extra})
+
+
+class Cassette:
+	"""A JSONL file of recorded interactions.
+
+	`on_miss` controls replay of requests that were never recorded: 'error'
+	raises `CassetteMissError`, 'sequence' serves recorded interactions in order,
+	which keeps response sizes and timings realistic when prompts have changed.
+
+	Prompts embed rows of the dataset, so they are only written with
+	`store_prompts`; replay matches on the request key either way. The recorded
+	responses can still quote the data, so review a cassette before committing
+	it as a fixture.
+	"""
+
+	def __init__(self, path: str, mode: str = 'replay', latency_scale: float = 1.0, on_miss: str = 'error', store_prompts: bool = False):
+		if mode not in MODES:
+			raise ValueError(f"Cassette mode must be one of {MODES}, got {mode!r}")
+		self.path = path
+		self.mode = mode
+		self.latency_scale = latency_scale
+		self.on_miss = on_miss
+		self.store_prompts = store_prompts
+		self._lock = threading.Lock()
+		self._entries: Dict[str, List[Dict[str, Any]]] = {}
+		self._ordered: List[Dict[str, Any]] = []
+		self._replayed: Dict[str, int] = {}
+		self._next = 0
+		# replay counters: exact matches vs requests whose prompt was never recorded
+		self.matched = 0
+		self.missed = 0
+		if mode == 'replay':
+			self._load()
+		else:
+			os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+	def _load(self):
+		with open(self.path, encoding='utf-8') as f:
+			for line in f:
+				line = line.strip()
+				if not line:
+					continue
+				entry = json.loads(line)
+				self._entries.setdefault(entry['key'], []).append(entry)
+				self._ordered.append(entry)
+
+	def __len__(self) -> int:
+		return len(self._ordered)
+
+	def lookup(self, key: str) -> Dict[str, Any]:
+		"""Recorded interaction for `key`; repeated requests cycle through their recordings."""
+		with self._lock:
+			matches = self._entries.get(key)
+			if matches:
+				i = self._replayed.get(key, 0)
+				self._replayed[key] = i + 1
+				self.matched += 1
+				return matches[i % len(matches)]
+			self.missed += 1
+			if self.on_miss == 'sequence' and self._ordered:
+				entry = self._ordered[self._next % len(self._ordered)]
+				self._next += 1
+				return entry
+		raise CassetteMissError(f"No recorded Ollama response for request {key[:12]} in {self.path}")
+
+	def schedule(self, entry: Dict[str, Any]) -> List[Tuple[float, Dict[str, Any]]]:
+		"""(offset in seconds from request start, chunk) pairs, scaled for replay."""
+		return [(c['t'] * self.latency_scale, c['chunk']) for c in entry['chunks']]
+
+	def add(self, key: str, model: str, prompt: str, options: Dict[str, Any], chunks: List[Tuple[float, Dict[str, Any]]]):
+		"""Append one completed interaction."""
+		entry = {
+			'key': key,
+			'recorded_at': datetime.now().isoformat(),
+			'model': model,
+			'prompt_sha256': hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+			'prompt_chars': len(prompt),
+			'options': options or {},
+			'total_seconds': chunks[-1][0] if chunks else 0.0,
+			'chunks': [{'t': round(t, 4), 'chunk': chunk} for t, chunk in chunks],
+		}
+		if self.store_prompts:
+			entry['prompt'] = prompt
+		line = json.dumps(entry, default=str)
+		with self._lock:
+			with open(self.path, 'a', encoding='utf-8') as f:
+				f.write(line + '\n')
+
+
+class Recording:
+	"""Collects chunks of one live request with their offsets."""
+
+	def __init__(self, cassette: Cassette, model: str, prompt: str, options: Dict[str, Any], kwargs: Dict[str, Any]):
+		self.cassette = cassette
+		self.model = model
+		self.prompt = prompt
+		self.options = options
+		self.key = request_key(model, prompt, options, kwargs)
+		self.started = time.perf_counter()
+		self.chunks: List[Tuple[float, Dict[str, Any]]] = []
+
+	def add(self, chunk: Dict[str, Any]):
+		self.chunks.append((time.perf_counter() - self.started, chunk))
+
+	def save(self):
+		self.cassette.add(self.key, self.model, self.prompt, self.options, self.chunks)
+
+
+def cassette_from_env() -> Optional[Cassette]:
+	"""Cassette configured by OLLAMA_CASSETTE / OLLAMA_CASSETTE_MODE, if any."""
+	path = os.environ.get('OLLAMA_CASSETTE')
+	if not path:
+		return None
+	return Cassette(
+		path,
+		mode=os.environ.get('OLLAMA_CASSETTE_MODE', 'replay'),
+		latency_scale=float(os.environ.get('OLLAMA_CASSETTE_LATENCY_SCALE', '1.0')),
+		on_miss=os.environ.get('OLLAMA_CASSETTE_ON_MISS', 'error'),
+		store_prompts=os.environ.get('OLLAMA_CASSETTE_STORE_PROMPTS', '').lower() in ('1', 'true', 'yes'),
+	)
+
+
+_shared_cassette: Optional[Cassette] = None
+_shared_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+	"""Process-wide cassette from the environment, so all layers share one file."""
+	global _shared_cassette
+	with _shared_lock:
+		if _shared_cassette is None:
+			_shared_cassette = cassette_from_env()
+		return _shared_cassette
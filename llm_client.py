@@ -0,0 +1,361 @@
+"""
+llm_client.py
+Request layer between the analytics agent and the Ollama HTTP API.
+
+Generations run on one long-lived worker pool shared by every agent in the
+process. Callers consume the chunks with a per-call deadline: when it passes
+the caller gets `LLMTimeoutError` straight away and the worker drops the HTTP
+stream, so Ollama stops generating instead of finishing a response nobody reads.
+
+`AsyncOllamaRequestLayer` offers the same on asyncio, with a semaphore bounding
+how many generations run at once on the shared background event loop.
+
+Both layers record to or replay from an `llm_cassette.Cassette` when one is
+configured (OLLAMA_CASSETTE), instead of or in addition to calling Ollama.
+
+Identical requests that are in flight at the same time (same model, prompt,
+options and context) are coalesced: later callers subscribe to the generation
+already running instead of starting another one. Set OLLAMA_SINGLE_FLIGHT=0 to
+disable.
+
+Import-safe: no connection is made until a request is issued.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import ollama
+
+from llm_cassette import Cassette, Recording, get_cassette, request_key
+
+DEFAULT_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "30"))
+MAX_WORKERS = int(os.environ.get("OLLAMA_MAX_WORKERS", "4"))
+SINGLE_FLIGHT = os.environ.get("OLLAMA_SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# In-flight generations by request key, shared by every layer in the process
+_inflight: Dict[str, "_Request"] = {}
+_inflight_lock = threading.Lock()
+flight_stats = {'started': 0, 'coalesced': 0}
+
+
+class LLMTimeoutError(TimeoutError):
+	"""Raised when a generation does not finish before its deadline."""
+
+
+def get_executor() -> ThreadPoolExecutor:
+	"""Return the process-wide worker pool used for Ollama requests."""
+	global _executor
+	with _executor_lock:
+		if _executor is None:
+			_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ollama")
+		return _executor
+
+
+class _Request:
+	"""Hand-off between the worker streaming from Ollama and the callers waiting on it.
+
+	Chunks are kept for the life of the request so a caller that subscribes
+	late still receives the response from the start.
+	"""
+
+	def __init__(self, key: str = None):
+		self.key = key
+		self.events: List[tuple] = []
+		self.cond = threading.Condition()
+		self.subscribers = 0
+		self.cancelled = threading.Event()
+		self.client: Optional[ollama.Client] = None
+		self.recording: Optional[Recording] = None
+
+	def put(self, kind: str, payload: Any = None):
+		with self.cond:
+			self.events.append((kind, payload))
+			self.cond.notify_all()
+		if kind != "chunk":
+			_forget(self)
+
+	def get(self, index: int, timeout: float) -> tuple:
+		"""Event number `index`, waiting up to `timeout`; raises `queue.Empty`."""
+		with self.cond:
+			if not self.cond.wait_for(lambda: len(self.events) > index, timeout):
+				raise queue.Empty
+			return self.events[index]
+
+	def cancel(self):
+		self.cancelled.set()
+		# Closing the HTTP client aborts a read that is still waiting on the first token.
+		http = getattr(self.client, "_client", None)
+		if http is not None:
+			try:
+				http.close()
+			except Exception:
+				pass
+
+
+def _subscribe(key: str) -> Tuple[_Request, bool]:
+	"""Join the in-flight request for `key`, or register a new one; returns (request, started)."""
+	with _inflight_lock:
+		request = _inflight.get(key) if SINGLE_FLIGHT else None
+		started = request is None
+		if started:
+			request = _Request(key)
+			if SINGLE_FLIGHT:
+				_inflight[key] = request
+			flight_stats['started'] += 1
+		else:
+			flight_stats['coalesced'] += 1
+		request.subscribers += 1
+		return request, started
+
+
+def _forget(request: _Request):
+	with _inflight_lock:
+		if _inflight.get(request.key) is request:
+			del _inflight[request.key]
+
+
+def _unsubscribe(request: _Request):
+	# The generation is only dropped once nobody is reading it any more.
+	with _inflight_lock:
+		request.subscribers -= 1
+		if request.subscribers > 0:
+			return
+		if _inflight.get(request.key) is request:
+			del _inflight[request.key]
+	request.cancel()
+
+
+class OllamaRequestLayer:
+	"""Issue cancellable Ollama generations with a deadline per call."""
+
+	def __init__(self, host: str = None, timeout: float = DEFAULT_TIMEOUT, cassette: Cassette = None):
+		self.host = host or os.environ.get("OLLAMA_HOST")
+		self.timeout = timeout
+		self.cassette = cassette if cassette is not None else get_cassette()
+
+	def stream(self, model: str, prompt: str, options: Dict[str, Any] = None, timeout: float = None, **kwargs) -> Iterator[Dict[str, Any]]:
+		"""Yield raw generate chunks; raises `LLMTimeoutError` at the deadline.
+
+		Extra keyword arguments are passed through to `ollama.generate`.
+		Closing the iterator early cancels the request as well.
+		"""
+		timeout = self.timeout if timeout is None else timeout
+		deadline = time.monotonic() + timeout
+		if self.cassette is not None and self.cassette.mode == "replay":
+			yield from self._replay(model, prompt, options, kwargs, timeout, deadline)
+			return
+		request, started = _subscribe(request_key(model, prompt, options, kwargs))
+		if started:
+			if self.cassette is not None:
+				request.recording = Recording(self.cassette, model, prompt, options, kwargs)
+			get_executor().submit(self._run, request, timeout, dict(model=model, prompt=prompt, options=options, **kwargs))
+		try:
+			index = 0
+			while True:
+				remaining = deadline - time.monotonic()
+				try:
+					if remaining <= 0:
+						raise queue.Empty
+					kind, payload = request.get(index, remaining)
+				except queue.Empty:
+					raise LLMTimeoutError(f"Ollama did not finish within {timeout:g}s")
+				index += 1
+				if kind == "chunk":
+					yield payload
+				elif kind == "error":
+					raise payload
+				else:
+					return
+		finally:
+			_unsubscribe(request)
+
+	def _replay(self, model: str, prompt: str, options: Dict[str, Any], kwargs: Dict[str, Any], timeout: float, deadline: float) -> Iterator[Dict[str, Any]]:
+		entry = self.cassette.lookup(request_key(model, prompt, options, kwargs))
+		started = time.monotonic()
+		for offset, chunk in self.cassette.schedule(entry):
+			due = started + offset
+			if due > deadline:
+				time.sleep(max(deadline - time.monotonic(), 0))
+				raise LLMTimeoutError(f"Ollama did not finish within {timeout:g}s")
+			time.sleep(max(due - time.monotonic(), 0))
+			yield chunk
+
+	def generate(self, model: str, prompt: str, options: Dict[str, Any] = None, timeout: float = None, **kwargs) -> Dict[str, Any]:
+		"""Blocking generation; returns the final chunk with the full `response` text."""
+		parts = []
+		last: Dict[str, Any] = {}
+		for chunk in self.stream(model, prompt, options=options, timeout=timeout, **kwargs):
+			parts.append(chunk.get("response", "") or "")
+			last = chunk
+		final = dict(last)
+		final["response"] = "".join(parts)
+		return final
+
+	def _run(self, request: _Request, timeout: float, params: Dict[str, Any]):
+		stream = None
+		try:
+			# The read timeout bounds how long the worker can stay blocked between
+			# chunks, so it is released around the caller's deadline as well.
+			request.client = ollama.Client(host=self.host, timeout=timeout)
+			if request.cancelled.is_set():
+				return
+			stream = request.client.generate(stream=True, **params)
+			for chunk in stream:
+				if request.cancelled.is_set():
+					return
+				if hasattr(chunk, "model_dump"):
+					chunk = chunk.model_dump(exclude_none=True)
+				if request.recording is not None:
+					request.recording.add(chunk)
+				request.put("chunk", chunk)
+			if request.recording is not None:
+				request.recording.save()
+			request.put("done")
+		except Exception as e:
+			if not request.cancelled.is_set():
+				request.put("error", e)
+		finally:
+			if stream is not None:
+				# Dropping the stream closes the response, which aborts generation server-side.
+				try:
+					stream.close()
+				except Exception:
+					pass
+
+
+MAX_CONCURRENCY = int(os.environ.get("OLLAMA_MAX_CONCURRENCY", "4"))
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+	"""Return the background event loop shared by every session in the process."""
+	global _loop
+	with _loop_lock:
+		if _loop is None or _loop.is_closed():
+			_loop = asyncio.new_event_loop()
+			threading.Thread(target=_loop.run_forever, name="ollama-async", daemon=True).start()
+		return _loop
+
+
+def run_coroutine(coro, timeout: float = None):
+	"""Run `coro` on the shared loop and block the calling thread for its result."""
+	return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result(timeout)
+
+
+class _AsyncFlight:
+	"""One generation on the event loop and the number of callers awaiting it."""
+
+	def __init__(self):
+		self.task: Optional[asyncio.Task] = None
+		# set once the generation holds a semaphore slot; deadlines start from here
+		self.running = asyncio.Event()
+		self.waiters = 0
+
+
+class AsyncOllamaRequestLayer:
+	"""Async counterpart of `OllamaRequestLayer` with bounded concurrency.
+
+	At most `max_concurrency` generations run at once per event loop; further
+	calls wait their turn. The deadline covers the generation itself, not the
+	time spent queued, and cancelling drops the HTTP stream. Identical calls
+	on the same loop share one generation, which is dropped only when every
+	caller has given up on it.
+	"""
+
+	def __init__(self, host: str = None, timeout: float = DEFAULT_TIMEOUT, max_concurrency: int = MAX_CONCURRENCY, cassette: Cassette = None):
+		self.host = host or os.environ.get("OLLAMA_HOST")
+		self.timeout = timeout
+		self.max_concurrency = max_concurrency
+		self.cassette = cassette if cassette is not None else get_cassette()
+		# httpx clients, semaphores and in-flight tasks are bound to the loop they were created on
+		self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+	def _loop_state(self):
+		loop = asyncio.get_running_loop()
+		state = self._per_loop.get(loop)
+		if state is None:
+			state = (ollama.AsyncClient(host=self.host, timeout=self.timeout), asyncio.Semaphore(self.max_concurrency), {})
+			self._per_loop[loop] = state
+		return state
+
+	async def generate(self, model: str, prompt: str, options: Dict[str, Any] = None, timeout: float = None, **kwargs) -> Dict[str, Any]:
+		"""Generate a full response; raises `LLMTimeoutError` at the deadline."""
+		timeout = self.timeout if timeout is None else timeout
+		client, semaphore, flights = self._loop_state()
+		key = request_key(model, prompt, options, kwargs)
+		flight = flights.get(key) if SINGLE_FLIGHT else None
+		with _inflight_lock:
+			flight_stats['started' if flight is None else 'coalesced'] += 1
+		if flight is None:
+			flight = _AsyncFlight()
+			flight.task = asyncio.ensure_future(self._fly(flight, client, semaphore, model, prompt, options, kwargs))
+			if SINGLE_FLIGHT:
+				flights[key] = flight
+				flight.task.add_done_callback(lambda _: flights.pop(key) if flights.get(key) is flight else None)
+		flight.waiters += 1
+		try:
+			await flight.running.wait()
+			try:
+				return dict(await asyncio.wait_for(asyncio.shield(flight.task), timeout))
+			except asyncio.TimeoutError:
+				raise LLMTimeoutError(f"Ollama did not finish within {timeout:g}s")
+		finally:
+			flight.waiters -= 1
+			if flight.waiters == 0 and not flight.task.done():
+				flight.task.cancel()
+
+	async def _fly(self, flight: "_AsyncFlight", client, semaphore: asyncio.Semaphore, model: str, prompt: str, options: Dict[str, Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+		async with semaphore:
+			flight.running.set()
+			return await self._collect(client, model, prompt, options, kwargs)
+
+	async def _collect(self, client, model: str, prompt: str, options: Dict[str, Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+		parts = []
+		last: Dict[str, Any] = {}
+		async for chunk in self._chunks(client, model, prompt, options, kwargs):
+			parts.append(chunk.get("response", "") or "")
+			last = chunk
+		final = dict(last)
+		final["response"] = "".join(parts)
+		return final
+
+	async def _chunks(self, client, model: str, prompt: str, options: Dict[str, Any], kwargs: Dict[str, Any]):
+		if self.cassette is not None and self.cassette.mode == "replay":
+			entry = self.cassette.lookup(request_key(model, prompt, options, kwargs))
+			started = time.monotonic()
+			for offset, chunk in self.cassette.schedule(entry):
+				await asyncio.sleep(max(started + offset - time.monotonic(), 0))
+				yield chunk
+			return
+		recording = Recording(self.cassette, model, prompt, options, kwargs) if self.cassette is not None else None
+		async for chunk in await client.generate(model=model, prompt=prompt, options=options, stream=True, **kwargs):
+			if hasattr(chunk, "model_dump"):
+				chunk = chunk.model_dump(exclude_none=True)
+			if recording is not None:
+				recording.add(chunk)
+			yield chunk
+		if recording is not None:
+			recording.save()
+
+
+_async_layer: Optional[AsyncOllamaRequestLayer] = None
+
+
+def get_async_layer() -> AsyncOllamaRequestLayer:
+	"""Process-wide async layer, so the concurrency bound applies across sessions."""
+	global _async_layer
+	with _loop_lock:
+		if _async_layer is None:
+			_async_layer = AsyncOllamaRequestLayer()
+		return _async_layer
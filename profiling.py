@@ -0,0 +1,533 @@
+"""
+profiling.py
+Column profiles of a dataset: built chunk by chunk, or once for a loaded frame.
+
+`StreamingProfile.update` folds one DataFrame chunk at a time into running
+statistics, so files much larger than memory can be summarized in a single
+pass with bounded memory:
+
+- per numeric column: count, mean and variance (Welford/Chan merge), min, max,
+  and a KLL sketch for the quartiles
+- per column: missing counts
+- per categorical column: Misra-Gries counts of the most frequent values,
+  exact up to MAX_TRACKED_VALUES distinct values, and a HyperLogLog sketch of
+  the number of distinct values beyond that
+- pairwise co-moments of the numeric columns, for exact correlations
+- hashes of the distinct rows, for exact duplicate counts up to
+  INGEST_DUPLICATE_INDEX_ROWS distinct rows, and a HyperLogLog sketch of the
+  row hashes that estimates the count beyond that
+- a uniform reservoir sample of whole rows (bottom-k on random keys), used for
+  plots and the remaining sample-based statistics
+
+Two profiles over different parts of a dataset can be combined with `merge`;
+a profile of a file extended with new rows is its old profile merged with a
+profile of the new rows.
+
+`DatasetProfile` holds the same statistics, exact, for a DataFrame in memory.
+It is built once per loaded frame and shared by every analysis and prompt
+builder, so a round of analyses does not rescan the data for each one.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from correlations import CoMoments, get_correlation_store
+from outliers import OUTLIER_METHOD, count_outliers
+from sketches import HyperLogLog, KLLSketch, MisraGries, hash_rows, hash_values
+
+DEFAULT_SAMPLE_ROWS = int(os.environ.get("INGEST_SAMPLE_ROWS", "50000"))
+# Distinct values counted exactly per categorical column; beyond that counts carry an error bound
+MAX_TRACKED_VALUES = 20000
+
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+# Distinct rows whose hashes are kept for exact duplicate counts (8 bytes each, about 32 MB);
+# larger files get an estimate from DUPLICATE_SKETCH_PRECISION instead
+DUPLICATE_INDEX_ROWS = int(os.environ.get("INGEST_DUPLICATE_INDEX_ROWS", "4000000"))
+# HyperLogLog precision for the distinct-row estimate: 64 KB, 0.4% relative standard error
+DUPLICATE_SKETCH_PRECISION = 16
+# KLL accuracy parameter for streamed quartiles: rank error about 0.3%
+QUANTILE_SKETCH_K = 1000
+# Most frequent values kept per categorical column of a DatasetProfile
+TOP_VALUES = 20
+
+
+def column_kind(series: pd.Series) -> str:
+	"""'numeric', 'datetime' or 'categorical' (text, categories, booleans and anything else)."""
+	if pd.api.types.is_bool_dtype(series):
+		return 'categorical'
+	if pd.api.types.is_numeric_dtype(series):
+		return 'numeric'
+	if pd.api.types.is_datetime64_any_dtype(series):
+		return 'datetime'
+	return 'categorical'
+
+
+class NumericMoments:
+	"""Count, mean, M2, min and max of a numeric column, mergeable across chunks."""
+
+	__slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+	def __init__(self):
+		self.count = 0
+		self.mean = 0.0
+		self.m2 = 0.0
+		self.min = np.nan
+		self.max = np.nan
+
+	def update(self, values: np.ndarray):
+		values = values[~np.isnan(values)]
+		if len(values) == 0:
+			return
+		other = NumericMoments()
+		other.count = len(values)
+		other.mean = float(values.mean())
+		other.m2 = float(((values - other.mean) ** 2).sum())
+		other.min = float(values.min())
+		other.max = float(values.max())
+		self.merge(other)
+
+	def merge(self, other: "NumericMoments"):
+		if other.count == 0:
+			return
+		if self.count == 0:
+			self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+			return
+		total = self.count + other.count
+		delta = other.mean - self.mean
+		self.mean += delta * other.count / total
+		self.m2 += other.m2 + delta * delta * self.count * other.count / total
+		self.count = total
+		self.min = min(self.min, other.min)
+		self.max = max(self.max, other.max)
+
+	@property
+	def variance(self) -> float:
+		# sample variance, as pandas reports it
+		return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+	@property
+	def std(self) -> float:
+		return float(np.sqrt(self.variance))
+
+
+class CategoryCounts:
+	"""Top values and distinct count of a categorical column, mergeable across chunks.
+
+	Exact until `max_tracked` distinct values have been seen. After that the
+	top counts are Misra-Gries lower bounds, at most `error_bound` short, and
+	the distinct count is a HyperLogLog estimate.
+	"""
+
+	__slots__ = ('heavy', 'distinct_sketch')
+
+	def __init__(self, max_tracked: int = MAX_TRACKED_VALUES):
+		self.heavy = MisraGries(max_tracked)
+		self.distinct_sketch = HyperLogLog()
+
+	def update(self, series: pd.Series, hashes: np.ndarray = None):
+		"""Add a chunk of the column; `hashes` are its `hash_values` when already computed."""
+		counts = series.value_counts()
+		if hashes is None:
+			# hashing each distinct value once per chunk is enough for the distinct count
+			self.distinct_sketch.update(counts.index.to_series())
+		else:
+			self.distinct_sketch.add_hashes(hashes)
+		self.heavy.add_counts(counts)
+
+	def merge(self, other: "CategoryCounts"):
+		self.heavy.merge(other.heavy)
+		self.distinct_sketch.merge(other.distinct_sketch)
+
+	def top(self, n: int = 5) -> Dict[Any, int]:
+		return self.heavy.top(n)
+
+	@property
+	def truncated(self) -> bool:
+		return not self.heavy.exact
+
+	@property
+	def distinct(self) -> int:
+		"""Distinct values seen; an estimate once the counts were truncated."""
+		if self.heavy.exact:
+			return len(self.heavy.counts)
+		return int(round(self.distinct_sketch.estimate()))
+
+
+class DuplicateIndex:
+	"""Hashes of the distinct rows seen so far, for counting duplicate rows across chunks.
+
+	Exact up to 64-bit hash collisions. Hashes are kept in sorted runs that are
+	merged as they pile up (like a binary counter), so adding a chunk costs
+	about its own size. Past `max_rows` distinct rows the index is dropped, so
+	its memory stays bounded, and the count becomes an estimate: the rows seen
+	minus a HyperLogLog estimate of the distinct rows.
+	"""
+
+	__slots__ = ('runs', 'duplicates', 'distinct', 'max_rows', 'overflowed', 'rows', 'sketch')
+
+	def __init__(self, max_rows: int = DUPLICATE_INDEX_ROWS):
+		self.runs: List[np.ndarray] = []
+		self.duplicates = 0
+		self.distinct = 0
+		self.max_rows = max_rows
+		self.overflowed = False
+		self.rows = 0
+		self.sketch = HyperLogLog(DUPLICATE_SKETCH_PRECISION)
+
+	def update(self, chunk: pd.DataFrame, known: Dict[Any, np.ndarray] = None):
+		hashes = hash_rows(chunk, known)
+		self.rows += len(hashes)
+		self.sketch.add_hashes(hashes)
+		self.add_hashes(hashes)
+
+	def add_hashes(self, hashes: np.ndarray):
+		if self.overflowed:
+			return
+		# sort-based; faster than np.unique on 64-bit hashes
+		hashes = np.sort(hashes)
+		unique = hashes[np.concatenate([[True], hashes[1:] != hashes[:-1]])] if len(hashes) else hashes
+		seen = np.zeros(len(unique), dtype=bool)
+		for run in self.runs:
+			position = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+			seen |= run[position] == unique
+		self.duplicates += len(hashes) - len(unique) + int(seen.sum())
+		new = unique[~seen]
+		self.distinct += len(new)
+		if self.distinct > self.max_rows:
+			self.runs, self.overflowed = [], True
+			return
+		if len(new) == 0:
+			return
+		self.runs.append(new)
+		while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+			last = self.runs.pop()
+			self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind='stable')
+
+	def merge(self, other: "DuplicateIndex"):
+		if other.overflowed:
+			self.runs, self.overflowed = [], True
+		self.duplicates += other.duplicates
+		self.rows += other.rows
+		self.sketch.merge(other.sketch)
+		for run in other.runs:
+			self.add_hashes(run)
+
+	@property
+	def exact(self) -> bool:
+		return not self.overflowed
+
+	@property
+	def count(self) -> int:
+		"""Duplicate rows (after their first occurrence); estimated once the index overflowed."""
+		if not self.overflowed:
+			return self.duplicates
+		return max(self.rows - int(round(self.sketch.estimate())), 0)
+
+	@property
+	def error(self) -> int:
+		"""Standard error of `count` in rows; 0 while it is exact."""
+		if not self.overflowed:
+			return 0
+		return int(round(self.sketch.estimate() * self.sketch.relative_error))
+
+
+class StreamingProfile:
+	"""Single-pass profile of a dataset read in chunks."""
+
+	def __init__(self, sample_size: int = DEFAULT_SAMPLE_ROWS, seed: int = 42):
+		self.sample_size = sample_size
+		self.rows = 0
+		self.chunks = 0
+		self.columns: List[str] = []
+		self.kinds: Dict[str, str] = {}
+		self.missing: Dict[str, int] = {}
+		self.numeric: Dict[str, NumericMoments] = {}
+		self.quantiles: Dict[str, KLLSketch] = {}
+		self.comoments: Optional[CoMoments] = None
+		self.duplicates = DuplicateIndex()
+		self.categorical: Dict[str, CategoryCounts] = {}
+		# columns whose values did not all parse as the type of the first chunk
+		self.mixed_types: Dict[str, int] = {}
+		self._rng = np.random.default_rng(seed)
+		self._sample: Optional[pd.DataFrame] = None
+		self._sample_keys = np.empty(0)
+
+	def update(self, chunk: pd.DataFrame):
+		"""Fold one chunk of rows into the profile."""
+		if not self.columns:
+			self.columns = list(chunk.columns)
+			self.kinds = {c: column_kind(chunk[c]) for c in chunk.columns}
+			self.missing = {c: 0 for c in chunk.columns}
+		for col, n in chunk.isnull().sum().items():
+			self.missing[col] = self.missing.get(col, 0) + int(n)
+		numeric_values: Dict[str, np.ndarray] = {}
+		# value hashes shared by the distinct-count sketches and the duplicate index
+		hashes: Dict[str, np.ndarray] = {}
+		for col, kind in self.kinds.items():
+			if col not in chunk.columns:
+				continue
+			series = chunk[col]
+			if kind == 'numeric':
+				if not pd.api.types.is_numeric_dtype(series):
+					# a later chunk holds text in a numeric column
+					coerced = pd.to_numeric(series, errors='coerce')
+					self.mixed_types[col] = self.mixed_types.get(col, 0) + int(coerced.isnull().sum() - series.isnull().sum())
+					series = coerced
+				values = series.to_numpy(dtype='float64', na_value=np.nan)
+				numeric_values[col] = values
+				self.numeric.setdefault(col, NumericMoments()).update(values)
+				self.quantiles.setdefault(col, KLLSketch(QUANTILE_SKETCH_K, seed=len(self.quantiles))).update(values)
+			elif kind == 'categorical':
+				hashes[col] = hash_values(series)
+				self.categorical.setdefault(col, CategoryCounts()).update(series, hashes[col])
+		if self.comoments is None:
+			self.comoments = CoMoments(self.columns_of('numeric'))
+		if self.comoments.columns:
+			missing = np.full(len(chunk), np.nan)
+			self.comoments.update(np.column_stack([numeric_values.get(c, missing) for c in self.comoments.columns]))
+		self.duplicates.update(chunk.reindex(columns=self.columns), hashes)
+		self._add_to_sample(chunk, self._rng.random(len(chunk)))
+		self.rows += len(chunk)
+		self.chunks += 1
+
+	def empty_like(self) -> "StreamingProfile":
+		"""A new profile with this one's columns and kinds, for more rows of the same dataset."""
+		profile = StreamingProfile(self.sample_size, seed=self.rows)
+		profile.columns, profile.kinds = list(self.columns), dict(self.kinds)
+		profile.missing = {c: 0 for c in self.columns}
+		return profile
+
+	def _add_to_sample(self, chunk: pd.DataFrame, keys: np.ndarray):
+		# bottom-k: the rows with the smallest random keys form a uniform sample
+		if self._sample is not None and len(self._sample) >= self.sample_size:
+			accept = keys < self._sample_keys.max()
+			chunk, keys = chunk[accept], keys[accept]
+			if len(chunk) == 0:
+				return
+		combined = chunk if self._sample is None else pd.concat([self._sample, chunk], ignore_index=True)
+		combined_keys = np.concatenate([self._sample_keys, keys])
+		if len(combined) > self.sample_size:
+			keep = np.sort(np.argpartition(combined_keys, self.sample_size)[:self.sample_size])
+			combined, combined_keys = combined.iloc[keep], combined_keys[keep]
+		self._sample = combined.reset_index(drop=True)
+		self._sample_keys = combined_keys
+
+	def merge(self, other: "StreamingProfile"):
+		"""Combine with the profile of another part of the same dataset."""
+		if not self.columns:
+			self.columns, self.kinds = list(other.columns), dict(other.kinds)
+		for col, n in other.missing.items():
+			self.missing[col] = self.missing.get(col, 0) + n
+		for col, moments in other.numeric.items():
+			self.numeric.setdefault(col, NumericMoments()).merge(moments)
+		for col, sketch in other.quantiles.items():
+			self.quantiles.setdefault(col, KLLSketch(QUANTILE_SKETCH_K, seed=len(self.quantiles))).merge(sketch)
+		if other.comoments is not None:
+			if self.comoments is None:
+				self.comoments = CoMoments(other.comoments.columns)
+			self.comoments.merge(other.comoments)
+		self.duplicates.merge(other.duplicates)
+		for col, counts in other.categorical.items():
+			self.categorical.setdefault(col, CategoryCounts()).merge(counts)
+		for col, n in other.mixed_types.items():
+			self.mixed_types[col] = self.mixed_types.get(col, 0) + n
+		if other._sample is not None:
+			self._add_to_sample(other._sample, other._sample_keys)
+		self.rows += other.rows
+		self.chunks += other.chunks
+
+	@property
+	def sample(self) -> pd.DataFrame:
+		"""Uniform random sample of at most `sample_size` rows, in file order."""
+		if self._sample is None:
+			return pd.DataFrame(columns=self.columns)
+		return self._sample
+
+	@property
+	def shape(self):
+		return (self.rows, len(self.columns))
+
+	def columns_of(self, kind: str) -> List[str]:
+		return [c for c in self.columns if self.kinds.get(c) == kind]
+
+	def missing_counts(self) -> pd.Series:
+		return pd.Series(self.missing, dtype='int64').reindex(self.columns)
+
+	def describe(self) -> pd.DataFrame:
+		"""`DataFrame.describe()` equivalent for the numeric columns.
+
+		Count, mean, std, min and max are exact; quartiles come from the KLL
+		sketches, within `quartile_rank_error` of the true rank.
+		"""
+		cols = [c for c in self.columns_of('numeric') if c in self.numeric]
+		table = {}
+		for col in cols:
+			m = self.numeric[col]
+			q25, q50, q75 = self.quantiles[col].quantiles([0.25, 0.5, 0.75])
+			table[col] = [m.count, m.mean if m.count else np.nan, m.std, m.min, q25, q50, q75, m.max]
+		return pd.DataFrame(table, index=DESCRIBE_INDEX, dtype='float64')
+
+	def correlations(self) -> Optional[pd.DataFrame]:
+		"""Exact Pearson correlations of the numeric columns; None with fewer than two."""
+		if self.comoments is None or len(self.comoments.columns) < 2:
+			return None
+		return self.comoments.correlations()
+
+	def duplicate_rows(self) -> int:
+		"""Duplicate row count: exact, or estimated when the file had too many distinct rows to index (see `duplicates.exact`)."""
+		return self.duplicates.count
+
+	def categorical_summary(self, top: int = 5) -> Dict[str, Dict[str, Any]]:
+		summary = {}
+		for col in self.columns_of('categorical'):
+			counts = self.categorical.get(col)
+			if counts is None:
+				continue
+			values = counts.top(top)
+			summary[col] = {
+				'unique_count': counts.distinct,
+				'most_frequent': next(iter(values), None),
+				'value_counts': values,
+			}
+			if counts.truncated:
+				summary[col]['unique_count_is_estimate'] = True
+				summary[col]['value_counts_max_undercount'] = counts.heavy.error_bound
+		return summary
+
+	def error_bounds(self) -> Dict[str, float]:
+		"""Error bounds of the sketched statistics: quartile rank error and relative standard error of distinct counts."""
+		bounds = {}
+		if self.quantiles:
+			bounds['quartile_rank'] = round(max(s.rank_error for s in self.quantiles.values()), 4)
+		if any(c.truncated for c in self.categorical.values()):
+			bounds['unique_count_relative'] = round(HyperLogLog().relative_error, 4)
+		return bounds
+
+	def to_dict(self) -> Dict[str, Any]:
+		return {
+			'rows': self.rows,
+			'columns': len(self.columns),
+			'chunks': self.chunks,
+			'sample_rows': len(self.sample),
+		}
+
+
+class DatasetProfile:
+	"""Exact column statistics of an in-memory DataFrame, computed once and shared.
+
+	Kinds, missing counts, the numeric `describe()` table, categorical
+	cardinality and top values and datetime ranges are computed on
+	construction. Correlations, duplicate rows, outlier counts and
+	numeric-looking text columns are computed on first use and kept. A frame
+	that is modified in place needs a new profile.
+
+	`fingerprint` identifies the data across profiles and sessions (the
+	dataset cache key); with it, correlations come from the shared
+	`CorrelationStore`.
+	"""
+
+	def __init__(self, data: pd.DataFrame, fingerprint: str = None):
+		self._data = data
+		self.fingerprint = fingerprint
+		self._lock = threading.Lock()
+		self._memo: Dict[str, Any] = {}
+		self.rows = len(data)
+		self.columns: List[str] = list(data.columns)
+		self.kinds: Dict[str, str] = {c: column_kind(data[c]) for c in self.columns}
+		self.missing = data.isnull().sum().astype('int64')
+		numeric = self.columns_of('numeric')
+		if numeric:
+			self._describe = data[numeric].describe().reindex(DESCRIBE_INDEX).astype('float64')
+		else:
+			self._describe = pd.DataFrame(index=DESCRIBE_INDEX, dtype='float64')
+		self.value_counts: Dict[str, pd.Series] = {}
+		self.unique_counts: Dict[str, int] = {}
+		for col in self.columns_of('categorical'):
+			counts = data[col].value_counts()
+			self.unique_counts[col] = len(counts)
+			self.value_counts[col] = counts.head(TOP_VALUES)
+		self.date_ranges: Dict[str, tuple] = {col: (data[col].min(), data[col].max()) for col in self.columns_of('datetime')}
+
+	def describes(self, data: pd.DataFrame) -> bool:
+		"""Whether this is the profile of `data` (the same object)."""
+		return data is self._data
+
+	@property
+	def shape(self):
+		return (self.rows, len(self.columns))
+
+	def columns_of(self, kind: str) -> List[str]:
+		return [c for c in self.columns if self.kinds.get(c) == kind]
+
+	def missing_counts(self) -> pd.Series:
+		return self.missing
+
+	def describe(self) -> pd.DataFrame:
+		"""`DataFrame.describe()` of the numeric columns."""
+		return self._describe
+
+	def stat(self, column: str, name: str) -> float:
+		"""One entry of the describe table, e.g. stat('price', 'std')."""
+		return float(self._describe.at[name, column])
+
+	def categorical_summary(self, top: int = 5) -> Dict[str, Dict[str, Any]]:
+		summary = {}
+		for col, counts in self.value_counts.items():
+			values = {k: int(v) for k, v in counts.head(top).items()}
+			summary[col] = {
+				'unique_count': self.unique_counts[col],
+				'most_frequent': next(iter(values), None),
+				'value_counts': values,
+			}
+		return summary
+
+	def _cached(self, name: str, compute):
+		# concurrent analyses wait for the first computation instead of repeating it
+		with self._lock:
+			if name not in self._memo:
+				self._memo[name] = compute()
+			return self._memo[name]
+
+	def correlations(self) -> Optional[pd.DataFrame]:
+		"""Pearson correlations of the numeric columns; None with fewer than two."""
+		numeric = self.columns_of('numeric')
+		if len(numeric) < 2:
+			return None
+		def compute():
+			# centring on the known means keeps the product sums well conditioned
+			shift = self._describe.loc['mean', numeric].to_numpy()
+			return get_correlation_store().correlations(self._data, numeric, self.fingerprint, shift)
+		return self._cached('correlations', compute)
+
+	def duplicate_rows(self) -> int:
+		return self._cached('duplicate_rows', lambda: int(self._data.duplicated().sum()))
+
+	def outlier_counts(self, method: str = None) -> Dict[str, int]:
+		"""Outlying values per numeric column by `method` (default OUTLIER_METHOD); see `outliers`."""
+		method = method or OUTLIER_METHOD
+		numeric = self.columns_of('numeric')
+		return self._cached(f'outliers_{method}', lambda: count_outliers(self._data, numeric, method, stats=self._describe))
+
+	def numeric_text_columns(self) -> List[str]:
+		"""Text columns whose values mostly parse as numbers."""
+		def compute():
+			found = []
+			for col in self.columns_of('categorical'):
+				series = self._data[col]
+				if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+					continue
+				# parse each distinct value once; codes map the result back to the rows
+				codes, uniques = pd.factorize(series)
+				failed = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').isnull().to_numpy()
+				unparsed = int(failed[codes[codes >= 0]].sum()) + int((codes < 0).sum())
+				if not failed.all() and unparsed < self.rows * 0.5:
+					found.append(col)
+			return found
+		return self._cached('numeric_text_columns', compute)
+
+	def to_dict(self) -> Dict[str, Any]:
+		return {'rows': self.rows, 'columns': len(self.columns)}
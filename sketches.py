@@ -0,0 +1,357 @@
+"""
+sketches.py
+Mergeable summaries for profiling data in one pass with bounded memory.
+
+- `KLLSketch`: quantiles with a rank error of about 1.3% (k=200, 99% confidence)
+- `HyperLogLog`: distinct counts with a relative standard error of
+  1.04 / sqrt(2^p), 0.8% at the default p=14, in 16 KB
+- `MisraGries`: the most frequent values; every reported count is at most
+  `error_bound` below the true count, and any value occurring more than
+  n / (k + 1) times is guaranteed to be reported
+
+Each sketch takes a whole chunk at a time (numpy/pandas operations, no
+per-value Python) and `merge` combines sketches built over different chunks
+or partitions of the same column into the sketch of their union.
+
+`hash_values` gives the 64-bit hashes HyperLogLog needs, `hash_rows` one hash
+per row for duplicate detection. Strings are hashed
+straight from their Arrow buffers with a vectorized polynomial hash, several
+times faster than pandas' `hash_pandas_object` on text.
+"""
+
+import math
+import threading
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+	import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+	pa = None
+
+DEFAULT_KLL_K = 200
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_TOP_K = 64
+
+_U64 = np.uint64
+_SEED = _U64(0x9E3779B97F4A7C15)
+_BASE = _U64(0x100000001B3)
+_NULL_HASH = _U64(0x6A09E667F3BCC909)
+# Bytes of string data hashed per step; bounds the size of the power tables
+_HASH_SLICE_BYTES = 4 * 1024 * 1024
+
+_powers_lock = threading.Lock()
+_powers = np.ones(1, dtype=np.uint64)
+_inverse_powers = np.ones(1, dtype=np.uint64)
+
+
+def _fmix64(h: np.ndarray) -> np.ndarray:
+	# MurmurHash3 finalizer: spreads every input bit over the whole word
+	h = h ^ (h >> _U64(33))
+	h = h * _U64(0xFF51AFD7ED558CCD)
+	h = h ^ (h >> _U64(33))
+	h = h * _U64(0xC4CEB9FE1A85EC53)
+	return h ^ (h >> _U64(33))
+
+
+def _power_tables(n: int):
+	"""BASE**i and BASE**-i modulo 2**64 for i < n (BASE is odd, so it is invertible)."""
+	global _powers, _inverse_powers
+	with _powers_lock:
+		if len(_powers) < n:
+			size = max(n, 2 * len(_powers))
+			step = np.full(size, _BASE, dtype=np.uint64)
+			step[0] = 1
+			_powers = np.cumprod(step, dtype=np.uint64)
+			step[1:] = pow(int(_BASE), -1, 1 << 64)
+			_inverse_powers = np.cumprod(step, dtype=np.uint64)
+		return _powers, _inverse_powers
+
+
+def _hash_string_array(array) -> np.ndarray:
+	array = array.cast(pa.large_string())
+	offsets = np.frombuffer(array.buffers()[1], dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+	data = np.frombuffer(array.buffers()[2], dtype=np.uint8) if array.buffers()[2] is not None else np.empty(0, dtype=np.uint8)
+	out = np.empty(len(array), dtype=np.uint64)
+	start = 0
+	while start < len(array):
+		# rows whose bytes fit the slice budget (at least one row)
+		stop = int(np.searchsorted(offsets, offsets[start] + _HASH_SLICE_BYTES, side='right')) - 1
+		stop = min(max(stop, start + 1), len(array))
+		base = offsets[start]
+		rel = offsets[start:stop + 1] - base
+		chunk = data[base:base + rel[-1]].astype(np.uint64)
+		powers, inverse = _power_tables(len(chunk) + 1)
+		prefix = np.zeros(len(chunk) + 1, dtype=np.uint64)
+		# sum of byte * BASE**position, modulo 2**64
+		np.cumsum(chunk * powers[:len(chunk)], out=prefix[1:])
+		raw = (prefix[rel[1:]] - prefix[rel[:-1]]) * inverse[rel[:-1]]
+		out[start:stop] = raw + np.diff(rel).astype(np.uint64) * _SEED
+		start = stop
+	return _fmix64(out + _SEED)
+
+
+def hash_values(series: pd.Series) -> np.ndarray:
+	"""64-bit hashes of the non-null values of a column, equal for equal values."""
+	# a plain RangeIndex: lookups on a large string index are slow and not needed here
+	series = pd.Series(series.array)
+	if series.hasnans:
+		series = series.dropna()
+	if isinstance(series.dtype, pd.CategoricalDtype):
+		categories = hash_values(pd.Series(series.cat.categories))
+		return categories[series.cat.codes.to_numpy()]
+	if pd.api.types.is_datetime64_any_dtype(series):
+		return _fmix64(series.to_numpy(dtype='int64').view(np.uint64) + _SEED)
+	if pd.api.types.is_numeric_dtype(series):
+		# hashed as float64 so 5 and 5.0 agree across chunks parsed with different types;
+		# + 0.0 folds -0.0 into 0.0
+		return _fmix64((series.to_numpy(dtype='float64') + 0.0).view(np.uint64) + _SEED)
+	if pa is not None:
+		try:
+			array = pa.array(series, from_pandas=True)
+		except (pa.ArrowInvalid, pa.ArrowTypeError):
+			array = pa.array(series.astype(str))
+		if isinstance(array, pa.ChunkedArray):
+			array = array.combine_chunks()
+		if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+			return _hash_string_array(array)
+	return pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy(dtype=np.uint64)
+
+
+def hash_rows(data: pd.DataFrame, known: Dict[Any, np.ndarray] = None) -> np.ndarray:
+	"""64-bit hash of each row of a frame, missing values included; equal rows hash equal.
+
+	`known` may map column names to their `hash_values`, already computed.
+	"""
+	known = known or {}
+	hashes = np.full(len(data), _SEED, dtype=np.uint64)
+	for i, col in enumerate(data.columns):
+		series = data.iloc[:, i]
+		column = np.full(len(data), _NULL_HASH, dtype=np.uint64)
+		present = series.notna().to_numpy()
+		column[present] = known[col] if col in known else hash_values(series)
+		hashes = _fmix64(hashes * _BASE + column)
+	return hashes
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+	# exact through float64 for each 32-bit half
+	high = (x >> _U64(32)).astype(np.float64)
+	low = (x & _U64(0xFFFFFFFF)).astype(np.float64)
+	return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def _sigma(x: float) -> float:
+	if x == 1:
+		return math.inf
+	y, z = 1.0, x
+	while True:
+		x *= x
+		previous = z
+		z += x * y
+		y += y
+		if z == previous:
+			return z
+
+
+def _tau(x: float) -> float:
+	if x == 0 or x == 1:
+		return 0.0
+	y, z = 1.0, 1 - x
+	while True:
+		x = math.sqrt(x)
+		previous = z
+		y *= 0.5
+		z -= (1 - x) ** 2 * y
+		if z == previous:
+			return z / 3
+
+
+class HyperLogLog:
+	"""Distinct-count estimate in 2**p one-byte registers."""
+
+	__slots__ = ('p', 'registers')
+
+	def __init__(self, p: int = DEFAULT_HLL_PRECISION):
+		self.p = p
+		self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+	def update(self, series: pd.Series):
+		self.add_hashes(hash_values(series))
+
+	def add_hashes(self, hashes: np.ndarray):
+		if len(hashes) == 0:
+			return
+		index = (hashes >> _U64(64 - self.p)).astype(np.intp)
+		rest = hashes & _U64((1 << (64 - self.p)) - 1)
+		# position of the first 1 bit in the remaining 64-p bits
+		rank = ((64 - self.p) - _bit_length(rest) + 1).astype(np.uint8)
+		np.maximum.at(self.registers, index, rank)
+
+	def merge(self, other: "HyperLogLog"):
+		if other.p != self.p:
+			raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+		np.maximum(self.registers, other.registers, out=self.registers)
+
+	def estimate(self) -> float:
+		# Ertl's improved estimator ("New cardinality estimation algorithms for
+		# HyperLogLog sketches", 2017): unbiased from 0 to 2**64 without the
+		# linear-counting switch or empirical bias tables
+		m = len(self.registers)
+		q = 64 - self.p
+		histogram = np.bincount(self.registers, minlength=q + 2)
+		z = m * _tau(1 - histogram[q + 1] / m)
+		for k in range(q, 0, -1):
+			z = 0.5 * (z + histogram[k])
+		z += m * _sigma(histogram[0] / m)
+		return m * m / (2 * math.log(2) * z)
+
+	@property
+	def relative_error(self) -> float:
+		"""Relative standard error of `estimate`."""
+		return 1.04 / math.sqrt(len(self.registers))
+
+
+class KLLSketch:
+	"""Quantile sketch (Karnin, Lang, Liberty) over float values.
+
+	Levels hold items of weight 2**level; a full level is sorted and every
+	other item, from a random start, moves up a level.
+	"""
+
+	__slots__ = ('k', 'levels', 'n', 'min', 'max', '_rng')
+
+	def __init__(self, k: int = DEFAULT_KLL_K, seed: int = None):
+		self.k = k
+		self.levels: List[np.ndarray] = [np.empty(0)]
+		self.n = 0
+		self.min = np.nan
+		self.max = np.nan
+		self._rng = np.random.default_rng(seed)
+
+	def _capacity(self, level: int) -> int:
+		depth = len(self.levels) - level - 1
+		return max(8, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+	def update(self, values):
+		values = np.asarray(values, dtype='float64')
+		values = values[~np.isnan(values)]
+		if len(values) == 0:
+			return
+		self.n += len(values)
+		self.min = float(np.nanmin([self.min, values.min()]))
+		self.max = float(np.nanmax([self.max, values.max()]))
+		self.levels[0] = np.concatenate([self.levels[0], values])
+		self._compress()
+
+	def merge(self, other: "KLLSketch"):
+		if other.n == 0:
+			return
+		while len(self.levels) < len(other.levels):
+			self.levels.append(np.empty(0))
+		for level, items in enumerate(other.levels):
+			self.levels[level] = np.concatenate([self.levels[level], items])
+		self.n += other.n
+		self.min = float(np.nanmin([self.min, other.min]))
+		self.max = float(np.nanmax([self.max, other.max]))
+		self._compress()
+
+	def _compress(self):
+		level = 0
+		while level < len(self.levels):
+			items = self.levels[level]
+			if len(items) <= self._capacity(level):
+				level += 1
+				continue
+			if level + 1 == len(self.levels):
+				self.levels.append(np.empty(0))
+			items = np.sort(items)
+			# an odd item out stays behind at this level
+			keep = items[len(items) - len(items) % 2:]
+			promoted = items[self._rng.integers(2):len(items) - len(items) % 2:2]
+			self.levels[level] = keep
+			self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+			# capacities shrink as the sketch grows a level; start over from the bottom
+			level = 0
+
+	def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+		if self.n == 0:
+			return np.full(len(qs), np.nan)
+		items = np.concatenate(self.levels)
+		weights = np.concatenate([np.full(len(items_), 2 ** level, dtype='float64') for level, items_ in enumerate(self.levels)])
+		order = np.argsort(items, kind='stable')
+		items, cumulative = items[order], np.cumsum(weights[order])
+		result = []
+		for q in qs:
+			if q <= 0:
+				result.append(self.min)
+			elif q >= 1:
+				result.append(self.max)
+			else:
+				index = int(np.searchsorted(cumulative, q * cumulative[-1], side='left'))
+				result.append(float(items[min(index, len(items) - 1)]))
+		return np.array(result)
+
+	def quantile(self, q: float) -> float:
+		return float(self.quantiles([q])[0])
+
+	@property
+	def rank_error(self) -> float:
+		"""Normalized rank error at 99% confidence (the DataSketches KLL bound for this k)."""
+		return 2.296 / self.k ** 0.9723
+
+
+class MisraGries:
+	"""The `k` most frequent values of a column with deterministic error bounds.
+
+	Counts are lower bounds: each is at most `error_bound` below the true
+	count. While no more than `k` distinct values have been seen the counts
+	are exact.
+	"""
+
+	__slots__ = ('k', 'counts', 'n')
+
+	def __init__(self, k: int = DEFAULT_TOP_K):
+		self.k = k
+		self.counts = pd.Series(dtype='int64')
+		self.n = 0
+
+	@staticmethod
+	def _reduce(counts: pd.Series, k: int) -> pd.Series:
+		# subtract the (k+1)-th largest count from every counter and drop those at zero
+		if len(counts) <= k:
+			return counts
+		counts = counts.sort_values(ascending=False, kind='stable')
+		counts = counts.iloc[:k] - counts.iloc[k]
+		return counts[counts > 0]
+
+	def update(self, series: pd.Series):
+		self.add_counts(series.value_counts())
+
+	def add_counts(self, counts: pd.Series):
+		"""Fold in exact value counts of a chunk (as from `value_counts()`)."""
+		self.n += int(counts.sum())
+		self._add(self._reduce(counts, self.k))
+
+	def merge(self, other: "MisraGries"):
+		self.n += other.n
+		self._add(other.counts)
+
+	def _add(self, counts: pd.Series):
+		if len(self.counts):
+			counts = self.counts.add(counts, fill_value=0).astype('int64')
+		self.counts = self._reduce(counts, self.k).astype('int64')
+
+	@property
+	def error_bound(self) -> int:
+		"""Largest possible undercount of any reported value."""
+		return int((self.n - int(self.counts.sum())) // (self.k + 1))
+
+	@property
+	def exact(self) -> bool:
+		return self.n == int(self.counts.sum())
+
+	def top(self, n: int = 5) -> Dict[Any, int]:
+		return {k: int(v) for k, v in self.counts.nlargest(n).items()}
@@ -0,0 +1,16 @@
+"""Shared setup for the pytest suite: import path and an offline environment.
+
+The shared caches are switched off and OLLAMA_HOST points at a closed port,
+so no test touches /tmp/app_cache or a real Ollama server; tests that need a
+server start `fake_ollama.FakeOllamaServer` themselves.
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault('OLLAMA_HOST', 'http://127.0.0.1:9')
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+os.environ.setdefault('DATASET_CACHE_DISABLED', '1')
@@ -0,0 +1,38 @@
+"""Background loads: the newest request is the last to write the agent's data_cache."""
+from concurrent.futures import CancelledError, wait
+
+import pandas as pd
+
+from analytics_core import OllamaAnalyticsAgent
+
+
+def write_csv(path, rows):
+    pd.DataFrame({'x': range(rows)}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_superseded_loads_do_not_overwrite_newest(tmp_path):
+    agent = OllamaAnalyticsAgent()
+    agent.dataset_cache = None
+    paths = [write_csv(tmp_path / f'{rows}.csv', rows) for rows in (10, 20, 30)]
+    # hold the lock so all three are queued before any runs, as with quick reselection
+    with agent._load_lock:
+        futures = [agent.load_in_background(path, streaming=False) for path in paths]
+    wait(futures, timeout=30)
+    assert len(futures[-1].result()) == 30
+    assert len(agent.data_cache['current_data']) == 30
+    for future in futures[:-1]:
+        try:
+            assert future.result() is None
+        except CancelledError:
+            pass
+
+
+def test_running_load_is_followed_by_newest(tmp_path):
+    agent = OllamaAnalyticsAgent()
+    agent.dataset_cache = None
+    first = agent.load_in_background(write_csv(tmp_path / 'a.csv', 10), streaming=False)
+    second = agent.load_in_background(write_csv(tmp_path / 'b.csv', 20), streaming=False)
+    wait([first, second], timeout=30)
+    assert len(second.result()) == 20
+    assert len(agent.data_cache['current_data']) == 20
@@ -0,0 +1,30 @@
+"""Recorded cassettes replay by request key and leave prompts out unless asked."""
+import json
+
+from llm_cassette import Cassette, request_key
+
+PROMPT = "Dataset sample:\nname,email\nAda,ada@example.com\n\nQuestion: summarise"
+
+
+def record(path, **kwargs):
+    cassette = Cassette(str(path), mode='record', **kwargs)
+    key = request_key('llama3.2:latest', PROMPT)
+    cassette.add(key, 'llama3.2:latest', PROMPT, {}, [(0.1, {'response': 'ok', 'done': True})])
+    return key
+
+
+def test_prompts_not_stored_by_default(tmp_path):
+    path = tmp_path / 'run.jsonl'
+    key = record(path)
+    text = path.read_text()
+    assert 'ada@example.com' not in text
+    entry = json.loads(text)
+    assert 'prompt' not in entry and entry['prompt_sha256']
+    replay = Cassette(str(path))
+    assert replay.lookup(key)['chunks'][0]['chunk']['response'] == 'ok'
+
+
+def test_prompts_stored_on_request(tmp_path):
+    path = tmp_path / 'run.jsonl'
+    record(path, store_prompts=True)
+    assert json.loads(path.read_text())['prompt'] == PROMPT
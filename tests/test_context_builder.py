@@ -0,0 +1,11 @@
+"""Compaction of analysis statistics into the prompt budget."""
+import pandas as pd
+
+from context_builder import compact_payload
+
+
+def test_describe_count_kept_at_full_detail_only():
+    stats = {'numeric_stats': pd.DataFrame({'a': [1, 2, None], 'b': [1, 2, 3]}).describe().to_dict()}
+    assert '"count":2.0' in compact_payload(stats, 10000)
+    compact = compact_payload(stats, 30)
+    assert '"count"' not in compact and '"mean":1.5' in compact
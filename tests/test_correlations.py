@@ -0,0 +1,95 @@
+"""correlation_matrix, CoMoments and CorrelationStore against DataFrame.corr()."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlations
+from correlations import CoMoments, CorrelationStore, correlation_matrix
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    rows = 5000
+    data = pd.DataFrame(rng.normal(size=(rows, 6)), columns=list('abcdef'))
+    data['b'] = data['a'] * 2 + rng.normal(size=rows) * 0.1
+    data['c'] = 3.0  # constant: no correlation
+    data.loc[rng.random(rows) < 0.2, 'd'] = np.nan
+    data.loc[rng.random(rows) < 0.3, 'e'] = np.nan
+    data['f'] = data['f'] + 1e6
+    data['g'] = rng.integers(0, 100, rows).astype('int16')
+    data['h'] = pd.array(rng.integers(0, 5, rows), dtype='Int64')
+    data.loc[::7, 'h'] = pd.NA
+    return data
+
+
+def assert_same(result, expected):
+    assert list(result.index) == list(expected.index)
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(dtype='float64'), rtol=0, atol=1e-9, equal_nan=True)
+
+
+def test_matches_pandas_with_missing_values(frame):
+    assert_same(correlation_matrix(frame), frame.corr())
+
+
+def test_blockwise_matches_single_block(frame, monkeypatch):
+    monkeypatch.setattr(correlations, 'BLOCK_CELLS', 1000)
+    assert_same(correlation_matrix(frame), frame.corr())
+
+
+def test_shift_does_not_change_result(frame):
+    means = frame.mean().to_numpy()
+    assert_same(correlation_matrix(frame, shift=means), frame.corr())
+
+
+def test_merge_of_parts_equals_whole(frame):
+    columns = list(frame.columns)
+    values = frame.to_numpy(dtype='float64', na_value=np.nan)
+    parts = [CoMoments(columns), CoMoments(columns), CoMoments(columns)]
+    for i, start in enumerate(range(0, len(values), 700)):
+        parts[i % 3].update(values[start:start + 700])
+    parts[0].merge(parts[1])
+    parts[0].merge(parts[2])
+    assert_same(parts[0].correlations(), frame.corr())
+
+
+def test_merge_into_empty(frame):
+    values = frame.to_numpy(dtype='float64', na_value=np.nan)
+    filled = CoMoments(list(frame.columns))
+    filled.update(values)
+    empty = CoMoments(list(frame.columns))
+    empty.merge(filled)
+    assert_same(empty.correlations(), frame.corr())
+
+
+def test_store_computes_once_and_serves_subsets(frame, monkeypatch):
+    store = CorrelationStore()
+    calls = []
+    compute = correlations.correlation_matrix
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return compute(*args, **kwargs)
+
+    monkeypatch.setattr(correlations, 'correlation_matrix', counting)
+    columns = list(frame.columns)
+    full = store.correlations(frame, columns, 'dataset')
+    again = store.correlations(frame, columns, 'dataset')
+    subset = store.correlations(frame, ['g', 'a'], 'dataset')
+    assert len(calls) == 1
+    assert again is full
+    assert_same(subset, frame[['g', 'a']].corr())
+    # another dataset, or no fingerprint, is computed anew
+    store.correlations(frame, columns, 'other')
+    store.correlations(frame, columns)
+    assert len(calls) == 3
+
+
+def test_store_evicts_least_recently_used(frame):
+    columns = list(frame.columns)
+    store = CorrelationStore(max_bytes=len(columns) ** 2 * 8 * 2)
+    for name in ('one', 'two', 'three'):
+        store.correlations(frame, columns, name)
+    assert store.get('one', columns) is None
+    assert store.get('three', columns) is not None
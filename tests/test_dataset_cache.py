@@ -0,0 +1,48 @@
+"""DatasetCache round trips, content keys and the private-directory check."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_cache import DatasetCache, check_private
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'x': [1.5, np.nan, 3.0],
+        'n': pd.array([1, None, 3], dtype='Int64'),
+        'c': pd.Categorical(['a', 'b', 'a']),
+        's': ['u', None, 'w'],
+        't': pd.to_datetime(['2024-01-01', None, '2024-01-03']),
+    })
+
+
+@pytest.mark.parametrize('fmt', ['feather', 'parquet'])
+def test_round_trip(tmp_path, frame, fmt):
+    cache = DatasetCache(str(tmp_path / 'cache'), fmt=fmt)
+    assert cache.put('key', frame)
+    pd.testing.assert_frame_equal(cache.get('key'), frame)
+    assert cache.get('missing') is None
+
+
+def test_key_follows_content(tmp_path):
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    first.write_text('a,b\n1,2\n')
+    second.write_text('a,b\n1,2\n')
+    assert cache.key_for(str(first)) == cache.key_for(str(second))
+    assert cache.key_for(str(first), variant='pyarrow') != cache.key_for(str(first))
+    second.write_text('a,b\n1,30\n')
+    assert cache.key_for(str(first)) != cache.key_for(str(second))
+
+
+def test_refuses_shared_directory(tmp_path):
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        check_private(str(shared))
+    with pytest.raises(PermissionError):
+        DatasetCache(str(shared))
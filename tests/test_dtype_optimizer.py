@@ -0,0 +1,59 @@
+"""Optimized dtypes keep values and the aggregates the analyses compute."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from dtype_optimizer import append_rows, optimize_dtypes
+from outliers import count_outliers
+from profiling import DatasetProfile
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(3)
+    rows = 5000
+    return pd.DataFrame({
+        'small': rng.integers(0, 100, rows),
+        'medium': rng.integers(-20000, 20000, rows),
+        'large': rng.integers(0, 2 ** 40, rows),
+        'nullable': pd.array(rng.integers(0, 50, rows), dtype='Int64'),
+        'price': rng.integers(0, 1000, rows) / 4,
+        'label': rng.choice(['a', 'b', 'c'], rows),
+    })
+
+
+def test_integers_stay_at_least_32_bit(frame):
+    optimized, report = optimize_dtypes(frame)
+    assert optimized['small'].dtype == np.int32
+    assert optimized['medium'].dtype == np.int32
+    assert optimized['large'].dtype == np.int64
+    assert optimized['nullable'].dtype == 'Int32'
+    assert 'small' in report['converted']
+
+
+def test_raw_arithmetic_does_not_wrap(frame):
+    optimized, _ = optimize_dtypes(frame)
+    # products and scaled sums on .values: int8/int16 would overflow here
+    for col in ('small', 'medium'):
+        original, narrow = frame[col].values, optimized[col].values
+        assert (narrow * 1000).sum() == (original * 1000).sum()
+        assert (narrow * narrow).max() == (original * original).max()
+
+
+def test_analysis_aggregates_match(frame):
+    optimized, _ = optimize_dtypes(frame)
+    before, after = DatasetProfile(frame), DatasetProfile(optimized)
+    pd.testing.assert_frame_equal(after.describe(), before.describe(), check_dtype=False)
+    pd.testing.assert_frame_equal(after.correlations(), before.correlations(), rtol=1e-12)
+    assert after.duplicate_rows() == before.duplicate_rows()
+    assert count_outliers(optimized) == count_outliers(frame)
+    numeric = frame.select_dtypes('number').columns
+    pd.testing.assert_series_equal(optimized[numeric].sum(), frame[numeric].sum(), check_dtype=False)
+
+
+def test_appended_rows_widen_only_when_needed(frame):
+    optimized, _ = optimize_dtypes(frame)
+    fits = append_rows(optimized, frame.tail(3).reset_index(drop=True))
+    assert fits['small'].dtype == np.int32
+    grown = frame.tail(3).reset_index(drop=True).assign(small=[2 ** 40] * 3)
+    assert append_rows(optimized, grown)['small'].dtype == np.int64
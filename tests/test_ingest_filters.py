@@ -0,0 +1,76 @@
+"""Row filters given as text are read as the column's type by every pushdown reader."""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import ingest
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'zip': ['02139', '10001', '02139'],
+        'n': [1, 2, 3],
+        'when': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01']),
+        'flag': [True, False, True],
+    })
+
+
+@pytest.fixture(params=['parquet', 'feather', 'db', 'csv'])
+def source(request, tmp_path, frame):
+    path = tmp_path / f'data.{request.param}'
+    if request.param == 'parquet':
+        frame.to_parquet(path)
+    elif request.param == 'feather':
+        frame.to_feather(path)
+    elif request.param == 'csv':
+        frame.to_csv(path, index=False)
+    else:
+        with sqlite3.connect(path) as conn:
+            frame.to_sql('data', conn, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('condition, rows', [
+    (('zip', '=', '02139'), 2),
+    (('zip', 'in', ['02139', '99999']), 2),
+    (('n', '>', '1'), 2),
+    (('n', 'not in', ['1', '3']), 1),
+])
+def test_text_values_follow_column_type(source, condition, rows):
+    if source.endswith('.csv') and condition[0] == 'zip':
+        pytest.skip("CSV parsing reads zip codes as numbers")
+    assert len(ingest.read_file(source, filters=[condition])[0]) == rows
+    assert len(ingest.read_head(source, 10, filters=[condition])) == rows
+
+
+def test_digits_in_text_column_are_not_numbers(tmp_path, frame):
+    # a zip code typed as 02139 used to become the number 2139
+    for suffix in ('parquet', 'feather'):
+        path = str(tmp_path / f'zips.{suffix}')
+        getattr(frame, f'to_{suffix}')(path)
+        assert len(ingest.read_file(path, filters=[('zip', '=', '02139')])[0]) == 2
+        assert len(ingest.read_file(path, filters=[('zip', '=', 2139)])[0]) == 0
+
+
+@pytest.mark.parametrize('suffix', ['parquet', 'feather'])
+def test_dates_and_flags(tmp_path, frame, suffix):
+    path = str(tmp_path / f'data.{suffix}')
+    getattr(frame, f'to_{suffix}')(path)
+    assert len(ingest.read_file(path, filters=[('when', '>', '2024-01-15')])[0]) == 2
+    assert len(ingest.read_file(path, filters=[('flag', '=', 'true')])[0]) == 2
+
+
+def test_value_that_does_not_fit_is_a_plain_error(source):
+    with pytest.raises(ValueError, match="'n' holds numbers"):
+        ingest.read_file(source, filters=[('n', '=', 'abc')])
+
+
+def test_agent_reports_filter_error(tmp_path, frame):
+    from analytics_core import OllamaAnalyticsAgent
+    path = str(tmp_path / 'data.parquet')
+    frame.to_parquet(path)
+    agent = OllamaAnalyticsAgent()
+    assert agent.load_and_analyze_data(path, filters=[('n', '=', 'abc')]) is None
+    assert "'n' holds numbers" in agent.data_cache['load_error']
@@ -0,0 +1,50 @@
+"""LLMResponseCache round trips and the agent's use of it."""
+import pytest
+
+from analytics_core import OllamaAnalyticsAgent
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from llm_cache import LLMResponseCache, make_cache_key
+from llm_client import OllamaRequestLayer
+
+MODEL = "llama3.2:latest"
+
+
+@pytest.fixture
+def server():
+    server = FakeOllamaServer(FakeOllamaConfig(latency=0.05, tokens_per_second=500, response_tokens=16)).start()
+    yield server
+    server.stop()
+
+
+def test_round_trip(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'responses.sqlite'))
+    key = make_cache_key(MODEL, 'prompt', {'temperature': 0.7})
+    assert cache.get(key) is None
+    cache.put(key, 'answer', model=MODEL)
+    assert cache.get(key) == 'answer'
+    assert make_cache_key(MODEL, 'prompt', {'temperature': 0.1}) != key
+    reopened = LLMResponseCache(str(tmp_path / 'responses.sqlite'))
+    assert reopened.get(key) == 'answer'
+
+
+def test_agent_answers_repeat_prompt_from_cache(server, tmp_path):
+    agent = OllamaAnalyticsAgent(model_name=MODEL)
+    agent.llm = OllamaRequestLayer(host=server.url, timeout=10)
+    agent.response_cache = LLMResponseCache(str(tmp_path / 'responses.sqlite'))
+    first = agent.ask_ollama_stream('Summarise the data', context='rows: 3')
+    assert not first.startswith('[ERROR]')
+    requests = server.request_count
+    second = agent.ask_ollama_stream('Summarise the data', context='rows: 3')
+    assert second == first
+    assert server.request_count == requests
+    assert agent.conversation_history[-1]['cached'] is True
+
+
+def test_bypassing_cache_asks_again(server, tmp_path):
+    agent = OllamaAnalyticsAgent(model_name=MODEL)
+    agent.llm = OllamaRequestLayer(host=server.url, timeout=10)
+    agent.response_cache = LLMResponseCache(str(tmp_path / 'responses.sqlite'))
+    agent.ask_ollama_stream('Summarise the data')
+    requests = server.request_count
+    agent.ask_ollama_stream('Summarise the data', use_cache=False)
+    assert server.request_count == requests + 1
@@ -0,0 +1,73 @@
+"""OllamaRequestLayer against fake_ollama: deadlines and single-flight coalescing."""
+import threading
+import time
+
+import pytest
+
+import llm_client
+from analytics_core import OllamaAnalyticsAgent
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from llm_client import LLMTimeoutError, OllamaRequestLayer
+
+MODEL = "llama3.2:latest"
+
+
+@pytest.fixture
+def server():
+    server = FakeOllamaServer(FakeOllamaConfig(latency=0.2, tokens_per_second=500, response_tokens=16)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def slow_server():
+    server = FakeOllamaServer(FakeOllamaConfig(latency=5.0)).start()
+    yield server
+    server.stop()
+
+
+def test_stream_raises_at_deadline(slow_server):
+    layer = OllamaRequestLayer(host=slow_server.url, timeout=0.5)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        for _ in layer.stream(MODEL, 'slow prompt'):
+            pass
+    assert time.monotonic() - started < 1.5
+
+
+def test_agent_reports_timeout(slow_server):
+    agent = OllamaAnalyticsAgent(model_name=MODEL, timeout=0.5)
+    agent.llm = OllamaRequestLayer(host=slow_server.url, timeout=0.5)
+    started = time.monotonic()
+    assert agent.ask_ollama_stream('Summarise the data', use_cache=False) == "[ERROR] Ollama timeout"
+    assert time.monotonic() - started < 1.5
+
+
+def test_identical_streams_share_one_request(server):
+    layer = OllamaRequestLayer(host=server.url, timeout=10)
+    before = dict(llm_client.flight_stats)
+    requests = server.request_count
+    barrier = threading.Barrier(3)
+    results = []
+
+    def ask():
+        barrier.wait()
+        results.append(layer.generate(MODEL, 'same prompt', options={'num_predict': 16})['response'])
+
+    threads = [threading.Thread(target=ask) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(results) == 3 and len(set(results)) == 1 and results[0]
+    assert server.request_count - requests == 1
+    assert llm_client.flight_stats['started'] - before['started'] == 1
+    assert llm_client.flight_stats['coalesced'] - before['coalesced'] == 2
+
+
+def test_different_prompts_are_not_coalesced(server):
+    layer = OllamaRequestLayer(host=server.url, timeout=10)
+    requests = server.request_count
+    layer.generate(MODEL, 'first prompt')
+    layer.generate(MODEL, 'second prompt')
+    assert server.request_count - requests == 2
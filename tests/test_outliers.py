@@ -0,0 +1,66 @@
+"""Vectorized count_outliers against a plain per-column loop."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import outliers
+from outliers import count_outliers
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(1)
+    rows = 4000
+    data = pd.DataFrame({
+        'normal': rng.normal(size=rows),
+        'heavy': rng.standard_t(2, size=rows) * 10,
+        'ints': rng.integers(0, 50, rows),
+        'skewed': rng.exponential(size=rows),
+        'constant': np.full(rows, 7.0),
+        'flag': rng.random(rows) < 0.5,
+        'label': rng.choice(['x', 'y'], rows),
+    })
+    data.loc[rng.random(rows) < 0.1, 'normal'] = np.nan
+    data.loc[:3, 'normal'] = [50.0, -50.0, 40.0, np.nan]
+    return data
+
+
+def loop_counts(data, method):
+    counts = {}
+    for col in ('normal', 'heavy', 'ints', 'skewed', 'constant'):
+        values = data[col].dropna().astype('float64')
+        if method == 'iqr':
+            q1, q3 = values.quantile(0.25), values.quantile(0.75)
+            spread = q3 - q1
+            hits = (values < q1 - 1.5 * spread) | (values > q3 + 1.5 * spread)
+        elif method == 'zscore':
+            hits = (values - values.mean()).abs() > 3 * values.std()
+        else:
+            deviation = (values - values.median()).abs()
+            mad = deviation.median()
+            hits = 0.6745 * deviation > 3.5 * mad if mad > 0 else values != values
+        counts[col] = int(hits.sum())
+    return counts
+
+
+@pytest.mark.parametrize('method', outliers.METHODS)
+def test_matches_loop(frame, method):
+    assert count_outliers(frame, method=method) == loop_counts(frame, method)
+
+
+@pytest.mark.parametrize('method', ['iqr', 'zscore'])
+def test_describe_stats_give_same_counts(frame, method):
+    stats = frame.describe()
+    assert count_outliers(frame, method=method, stats=stats) == count_outliers(frame, method=method)
+
+
+@pytest.mark.parametrize('method', outliers.METHODS)
+def test_blockwise_matches_single_block(frame, method, monkeypatch):
+    expected = count_outliers(frame, method=method)
+    monkeypatch.setattr(outliers, 'BLOCK_CELLS', 4000)
+    assert count_outliers(frame, method=method) == expected
+
+
+def test_unknown_method_is_rejected(frame):
+    with pytest.raises(ValueError):
+        count_outliers(frame, method='percentile')
@@ -0,0 +1,54 @@
+"""Streamed duplicate counts: exact while indexed, estimated with a stated error beyond."""
+import numpy as np
+import pandas as pd
+
+from profiling import DuplicateIndex, StreamingProfile
+
+
+def frame(rows, distinct, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'a': rng.integers(0, distinct, rows), 'b': 'x'})
+
+
+def profile_of(data, max_rows, chunk=5000):
+    profile = StreamingProfile()
+    profile.duplicates = DuplicateIndex(max_rows)
+    for start in range(0, len(data), chunk):
+        profile.update(data.iloc[start:start + chunk])
+    return profile
+
+
+def test_exact_within_index():
+    data = frame(40000, 30000)
+    profile = profile_of(data, max_rows=100000)
+    assert profile.duplicates.exact
+    assert profile.duplicate_rows() == int(data.duplicated().sum())
+    assert profile.duplicates.error == 0
+
+
+def test_estimate_beyond_index():
+    data = frame(200000, 150000)
+    profile = profile_of(data, max_rows=10000)
+    assert not profile.duplicates.exact
+    assert profile.duplicates.runs == []
+    expected = int(data.duplicated().sum())
+    # within four standard errors
+    assert abs(profile.duplicate_rows() - expected) <= 4 * profile.duplicates.error
+
+
+def test_merge_keeps_estimate():
+    data = frame(100000, 80000)
+    first, second = profile_of(data.iloc[:50000], 10000), profile_of(data.iloc[50000:], 10000)
+    first.merge(second)
+    assert first.duplicates.rows == 100000
+    assert abs(first.duplicate_rows() - int(data.duplicated().sum())) <= 4 * first.duplicates.error
+
+
+def test_cleaning_summary_states_method():
+    from analytics_core import OllamaAnalyticsAgent
+    data = frame(50000, 40000)
+    for max_rows, method in ((100000, 'exact'), (1000, 'estimate')):
+        profile = profile_of(data, max_rows)
+        issues = OllamaAnalyticsAgent._apply_profile_quality({}, profile, len(profile.sample))
+        assert issues['duplicate_rows'] == profile.duplicate_rows()
+        assert issues['duplicate_rows_method'].startswith(method)
@@ -0,0 +1,45 @@
+"""Streamed analyses: chunks arrive as generated and failures are flagged, not inlined."""
+import pandas as pd
+import pytest
+
+from analytics_core import OllamaAnalyticsAgent, StartedStream
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from llm_client import OllamaRequestLayer
+
+MODEL = "llama3.2:latest"
+
+
+def test_error_chunk_sets_error_instead_of_text():
+    stream = StartedStream(c for c in ['partial ', 'answer', '[ERROR] Ollama timeout'])
+    assert list(stream) == ['partial ', 'answer']
+    assert stream.error == '[ERROR] Ollama timeout'
+    assert stream.seconds is not None
+
+
+def test_exception_sets_error():
+    def chunks():
+        yield 'text'
+        raise RuntimeError('connection reset')
+
+    stream = StartedStream(chunks())
+    assert list(stream) == ['text']
+    assert stream.error == '[ERROR] Error communicating with Ollama: connection reset'
+
+
+@pytest.fixture
+def slow_decoding_server():
+    # 64 tokens at 20 tokens/s: text arrives, then the 1s deadline passes
+    server = FakeOllamaServer(FakeOllamaConfig(latency=0.05, tokens_per_second=20, response_tokens=64)).start()
+    yield server
+    server.stop()
+
+
+def test_stream_failing_partway_keeps_text_and_flags_error(slow_decoding_server):
+    agent = OllamaAnalyticsAgent(model_name=MODEL, timeout=1.0)
+    agent.llm = OllamaRequestLayer(host=slow_decoding_server.url, timeout=1.0)
+    data = pd.DataFrame({'a': [1, 2, 3], 'b': [2.0, 4.0, 7.0]})
+    result = agent.custom_analysis(data, 'What stands out?', stream=True, use_cache=False)
+    text = ''.join(result.insights)
+    assert text and '[ERROR]' not in text
+    assert result.insights == text
+    assert result.error == '[ERROR] Ollama timeout'
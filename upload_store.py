@@ -0,0 +1,143 @@
+"""
+upload_store.py
+Content-addressed store for uploaded files.
+
+Uploads are copied to disk in fixed-size chunks while being hashed, so no
+second in-memory copy of the file is ever made, and stored under the SHA-256
+of their bytes: the same content uploaded twice, by any session and under any
+name, is written once. The original extension is kept so readers can still
+tell the format (`<sha256>.csv.gz`).
+
+Entries not opened for UPLOAD_TTL_HOURS are deleted by `cleanup`, which `put`
+runs at most once per UPLOAD_CLEANUP_INTERVAL seconds. Only files the store
+itself wrote are ever removed.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from typing import BinaryIO, Optional, Tuple
+
+DEFAULT_UPLOAD_DIR = os.environ.get("APP_UPLOAD_DIR", "/tmp/app_uploads")
+DEFAULT_TTL = float(os.environ.get("UPLOAD_TTL_HOURS", "24")) * 3600
+CLEANUP_INTERVAL = float(os.environ.get("UPLOAD_CLEANUP_INTERVAL", "600"))
+CHUNK_BYTES = 1024 * 1024
+
+COMPRESSION_SUFFIXES = ('.gz', '.zst', '.bz2')
+# <sha256><ext>, or an unfinished write <sha256-or-uuid>...tmp
+_ENTRY = re.compile(r'^[0-9a-f]{64}(\.[a-z0-9]{1,10}){0,2}$')
+_PARTIAL = re.compile(r'^upload-[0-9a-f]{32}\.tmp$')
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def _extension(name: str) -> str:
+	"""Lower-cased format suffix of `name`, two parts deep for compressed files (`.csv.gz`)."""
+	base = os.path.basename(name or '').lower()
+	parts = [p for p in base.split('.')[1:] if re.fullmatch(r'[a-z0-9]{1,10}', p)]
+	if not parts:
+		return ''
+	if '.' + parts[-1] in COMPRESSION_SUFFIXES and len(parts) > 1:
+		return '.' + '.'.join(parts[-2:])
+	return '.' + parts[-1]
+
+
+class UploadStore:
+	"""Uploaded files on disk, named by content hash and expired by age."""
+
+	def __init__(self, directory: str = None, ttl: float = DEFAULT_TTL, chunk_bytes: int = CHUNK_BYTES):
+		self.directory = directory or DEFAULT_UPLOAD_DIR
+		os.makedirs(self.directory, exist_ok=True)
+		self.ttl = ttl
+		self.chunk_bytes = chunk_bytes
+		self._lock = threading.Lock()
+		self._last_cleanup = 0.0
+
+	def put(self, stream: BinaryIO, name: str) -> Tuple[str, str]:
+		"""Copy `stream` into the store; returns (sha256 hex digest, path)."""
+		tmp = os.path.join(self.directory, f"upload-{uuid.uuid4().hex}.tmp")
+		h = hashlib.sha256()
+		if hasattr(stream, 'seek'):
+			stream.seek(0)
+		try:
+			with open(tmp, 'wb') as out:
+				for block in iter(lambda: stream.read(self.chunk_bytes), b''):
+					h.update(block)
+					out.write(block)
+			digest = h.hexdigest()
+			path = os.path.join(self.directory, digest + _extension(name))
+			if os.path.exists(path):
+				# same bytes already stored; keep the existing file and refresh its age
+				os.remove(tmp)
+				self.touch(path)
+			else:
+				os.replace(tmp, path)
+		except BaseException:
+			self._remove(tmp)
+			raise
+		finally:
+			if hasattr(stream, 'seek'):
+				stream.seek(0)
+		self._maybe_cleanup()
+		return digest, path
+
+	def touch(self, path: str) -> bool:
+		"""Mark an entry as in use so it is not expired; False when it is gone."""
+		try:
+			os.utime(path)
+			return True
+		except OSError:
+			return False
+
+	def _maybe_cleanup(self):
+		now = time.time()
+		with self._lock:
+			if now - self._last_cleanup < CLEANUP_INTERVAL:
+				return
+			self._last_cleanup = now
+		self.cleanup(now)
+
+	def cleanup(self, now: float = None) -> int:
+		"""Delete entries and abandoned partial writes older than the TTL; returns how many."""
+		now = time.time() if now is None else now
+		removed = 0
+		if not self.ttl:
+			return removed
+		for name in os.listdir(self.directory):
+			if not (_ENTRY.match(name) or _PARTIAL.match(name)):
+				continue
+			path = os.path.join(self.directory, name)
+			try:
+				expired = now - os.stat(path).st_mtime > self.ttl
+			except OSError:
+				continue
+			if expired and self._remove(path):
+				removed += 1
+		return removed
+
+	@staticmethod
+	def _remove(path: str) -> bool:
+		try:
+			os.remove(path)
+			return True
+		except OSError:
+			return False
+
+
+def get_upload_store() -> Optional[UploadStore]:
+	"""Process-wide upload store in APP_UPLOAD_DIR (default /tmp/app_uploads), or None when no directory is writable."""
+	global _shared_store
+	with _shared_lock:
+		if _shared_store is None:
+			# In production `./data` may be mounted read-only, so it is only the last resort.
+			for directory in (DEFAULT_UPLOAD_DIR, os.path.join("data", "uploads")):
+				try:
+					_shared_store = UploadStore(directory)
+					break
+				except OSError:
+					continue
+		return _shared_store
@@ -9,8 +9,11 @@ Run with:
 """
 
 import os
+import time
 import streamlit as st
+import ingest
 from analytics_core import OllamaAnalyticsAgent
+from upload_store import get_upload_store
 
 
 class StreamlitInterface:
@@ -334,9 +337,11 @@ class StreamlitInterface:
                 st.error(f"Cannot connect to Ollama: {e}")
                 st.info("Make sure Ollama is running: `ollama serve`")
 
+            # Preload the model in the background so the first analysis isn't paying for it
+            warm_up = os.environ.get('OLLAMA_WARMUP', '1').lower() not in ('0', 'false', 'no')
             if st.button("Initialize Agent"):
                 if selected_model:
-                    st.session_state.agent = OllamaAnalyticsAgent(selected_model)
+                    st.session_state.agent = OllamaAnalyticsAgent(selected_model, warm_up=warm_up)
                     st.success(f"Agent initialized with {selected_model}")
                 else:
                     st.error("Cannot initialize agent: No model selected or available.")
@@ -344,12 +349,27 @@ class StreamlitInterface:
             try:
                 if 'agent' not in st.session_state and selected_model is not None:
                     # auto-init when a preferred model exists
-                    st.session_state.agent = OllamaAnalyticsAgent(selected_model)
+                    st.session_state.agent = OllamaAnalyticsAgent(selected_model, warm_up=warm_up)
                     st.success(f"Agent auto-initialized with {selected_model}")
             except Exception:
                 # don't crash UI when auto-init fails
                 pass
 
+            current_agent = st.session_state.get('agent')
+            if current_agent is not None and getattr(current_agent, 'warmup_status', 'idle') != 'idle':
+                if current_agent.warmup_status == 'ready':
+                    st.caption(f"Model ready (loaded in {current_agent.warmup_seconds:.1f}s, kept alive {current_agent.keep_alive})")
+                elif current_agent.warmup_status == 'loading':
+                    st.caption("Model loading in the background...")
+                else:
+                    st.caption(f"Model preload failed: {current_agent.warmup_error}")
+
+            use_cache = st.checkbox("Reuse cached AI responses", value=True, help="Serve repeated analyses from the on-disk response cache instead of regenerating them.")
+            cache = getattr(st.session_state.get('agent'), 'response_cache', None)
+            if cache is not None:
+                cache_stats = cache.stats()
+                st.caption(f"Response cache: {cache_stats['entries']} entries, {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+
         # Data upload section with dark theme styling
         st.markdown(
             """
@@ -359,40 +379,33 @@ class StreamlitInterface:
             """,
             unsafe_allow_html=True
         )
-        uploaded_file = st.file_uploader("Choose a data file", type=['csv', 'xlsx', 'json'], help="Supports CSV, Excel, JSON files (Max 100MB)")
+        uploaded_file = st.file_uploader("Choose a data file", type=ingest.UPLOAD_TYPES, help="Supports CSV, Excel, JSON, JSON-lines, Parquet, Feather and SQLite files, also gzip/zstd/bz2-compressed or zipped (Max 100MB)")
         agent = st.session_state.get('agent', None)
         data = st.session_state.get('data', None)
 
-        if uploaded_file and agent:
-            # Choose a writable upload directory. In production `./data` may be mounted read-only.
-            upload_dir = os.environ.get("APP_UPLOAD_DIR")
-            if not upload_dir:
-                # Prefer a temp directory inside the container; fall back to ./data only if /tmp isn't usable.
-                try:
-                    upload_dir = "/tmp/app_uploads"
-                    os.makedirs(upload_dir, exist_ok=True)
-                except Exception:
-                    # Last-resort fallback for local development when ./data is writable.
-                    os.makedirs("data", exist_ok=True)
-                    upload_dir = "data"
-            else:
-                os.makedirs(upload_dir, exist_ok=True)
-
-            file_path = os.path.join(upload_dir, f"temp_{uploaded_file.name}")
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getvalue())
-            with st.spinner("Loading and analyzing data..."):
-                data = agent.load_and_analyze_data(file_path)
+        stored = self._register_upload(uploaded_file) if uploaded_file and agent else None
+        if stored:
+            digest, file_path = stored
+            options = self._pick_source(agent, digest, file_path)
+            # Reruns keep `uploaded_file` set; only load again when the bytes, selection or agent changed.
+            loaded = st.session_state.get('loaded_upload')
+            if loaded is None or loaded[0] is not agent or loaded[1:] != (digest, options) or data is None:
+                # Phase one: a few rows, so the preview and tabs appear at once whatever the file size.
+                data = agent.preview_data(file_path, **options)
+                st.session_state.data = data
                 if data is not None:
-                    st.session_state.data = data
-                    # Intentionally silent on successful load to avoid verbose UI messages
+                    st.session_state.loaded_upload = (agent, digest, options)
+                    # Phase two: the full load and profile run in the background and replace the preview.
+                    future = agent.load_in_background(file_path, content_hash=digest, **options)
+                    st.session_state.pending_load = (agent, future, time.perf_counter(), uploaded_file.name)
                 else:
-                    # show loading/parsing errors from the agent if present
-                    load_err = agent.data_cache.get('load_error') if hasattr(agent, 'data_cache') else None
-                    if load_err:
-                        st.error(f"Failed to load file: {load_err}")
-                    else:
-                        st.error("Failed to load file: unknown error")
+                    st.session_state.pop('loaded_upload', None)
+                    st.session_state.pop('pending_load', None)
+                    self._show_load_error(agent)
+        data = self._finish_pending_load(data)
+        load_message = st.session_state.pop('load_message', None)
+        if load_message and data is not None:
+            st.caption(load_message)
 
         if data is not None and agent is not None:
             # Data preview section with dark theme styling
@@ -405,6 +418,17 @@ class StreamlitInterface:
                 unsafe_allow_html=True
             )
             st.dataframe(data.head())
+            load_info = agent.data_cache.get('load', {}) if hasattr(agent, 'data_cache') else {}
+            if st.session_state.get('pending_load') is not None:
+                self._watch_pending_load(len(data))
+            elif load_info.get('source') == 'stream':
+                if load_info.get('profile_source') == 'append':
+                    profiled = f"Extended the previous profile with {load_info['appended_rows']:,} new rows ({load_info['rows']:,} in total)"
+                elif load_info.get('profile_source') == 'cache':
+                    profiled = f"Reused the profile of these {load_info['rows']:,} rows"
+                else:
+                    profiled = f"Profiled {load_info['rows']:,} rows in chunks"
+                st.caption(f"{profiled}; previews and charts use a {load_info['sample_rows']:,}-row random sample.")
 
             # Analysis section with dark theme styling
             st.markdown(
@@ -428,21 +452,24 @@ class StreamlitInterface:
                 with col1:
                     if st.button("🚀 Run Analysis", key='desc'):
                         with st.spinner("Running descriptive analytics..."):
-                            result = agent.descriptive_analytics(data)
+                            result = agent.descriptive_analytics(self._analysis_data(data), stream=True, use_cache=use_cache)
                 if result is not None:
                     self._display_result(result)
 
             with tabs[1]:
                 st.markdown("### 🔮 Predictive Analytics")
                 numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
-                if numeric_cols:
+                if st.session_state.get('pending_load') is not None:
+                    # The preview's types can differ from the full load's, so targets wait for it.
+                    st.info("The target column can be chosen once the full dataset has loaded.")
+                elif numeric_cols:
                     target_col = st.selectbox("Select target column", numeric_cols, key='target')
                     col1, col2 = st.columns([1, 4])
                     result = None
                     with col1:
                         if st.button("🚀 Run Analysis", key='pred'):
                             with st.spinner("Running predictive analytics..."):
-                                result = agent.predictive_analytics(data, target_col)
+                                result = agent.predictive_analytics(self._analysis_data(data), target_col, stream=True, use_cache=use_cache)
                     if result is not None:
                         self._display_result(result)
                 else:
@@ -455,7 +482,7 @@ class StreamlitInterface:
                 with col1:
                     if st.button("🚀 Get Suggestions", key='clean'):
                         with st.spinner("Assessing data quality..."):
-                            result = agent.data_cleaning_suggestions(data)
+                            result = agent.data_cleaning_suggestions(self._analysis_data(data), stream=True, use_cache=use_cache)
                 if result is not None:
                     self._display_result(result)
 
@@ -466,7 +493,7 @@ class StreamlitInterface:
                 with col1:
                     if st.button("🚀 Get Suggestions", key='viz'):
                         with st.spinner("Preparing visualizations..."):
-                            result = agent.visualization_suggestions(data)
+                            result = agent.visualization_suggestions(self._analysis_data(data), stream=True, use_cache=use_cache)
                 if result is not None:
                     self._display_result(result)
 
@@ -482,14 +509,164 @@ class StreamlitInterface:
                         else:
                             try:
                                 with st.spinner("Running custom analysis..."):
-                                    result = agent.custom_analysis(data, custom_query)
+                                    result = agent.custom_analysis(self._analysis_data(data), custom_query, stream=True, use_cache=use_cache)
                             except Exception as e:
                                 st.exception(e)
                 if result is not None and not isinstance(result, Exception):
-                    if isinstance(result.insights, str) and result.insights.startswith("[ERROR]"):
-                        st.warning(f"Analysis completed with warning: {result.insights}")
                     self._display_result(result)
 
+    def _show_load_error(self, agent):
+        # show loading/parsing errors from the agent if present
+        load_err = agent.data_cache.get('load_error') if hasattr(agent, 'data_cache') else None
+        if load_err:
+            st.error(f"Failed to load file: {load_err}")
+        else:
+            st.error("Failed to load file: unknown error")
+
+    def _finish_pending_load(self, data, wait=False):
+        """Swap the fully loaded frame in for the preview once the background load is done.
+
+        Returns the frame to display: the preview while the load is running
+        (unless `wait`), the full frame afterwards, None if the load failed.
+        """
+        pending = st.session_state.get('pending_load')
+        if pending is None:
+            return data
+        agent, future, started, name = pending
+        if not future.done():
+            if not wait:
+                return data
+            with st.spinner("Finishing the full load..."):
+                future.result()
+        st.session_state.pop('pending_load', None)
+        if agent is not st.session_state.get('agent'):
+            # the model was switched meanwhile; its agent loads the file again
+            st.session_state.pop('loaded_upload', None)
+            return data
+        data = future.result()
+        st.session_state.data = data
+        if data is None:
+            st.session_state.pop('loaded_upload', None)
+            self._show_load_error(agent)
+            return None
+        message = f"Loaded {name} in {time.perf_counter() - started:.2f}s"
+        appended = agent.data_cache.get('load', {}).get('appended_rows')
+        if appended is not None:
+            message += f" · reused the previous upload and parsed only the {appended:,} new rows"
+        report = agent.data_cache.get('dtype_report')
+        if report and report['converted']:
+            message += f" · memory {report['memory_before'] / 1e6:.1f} MB → {report['memory_after'] / 1e6:.1f} MB after optimizing {len(report['converted'])} column types"
+        st.session_state.load_message = message
+        return data
+
+    def _analysis_data(self, data):
+        """The full dataset for an analysis, waiting for a background load to finish."""
+        data = self._finish_pending_load(data, wait=True)
+        if data is None:
+            st.stop()
+        return data
+
+    @st.fragment(run_every=1.0)
+    def _watch_pending_load(self, preview_rows):
+        # Reruns on its own every second; the whole page reruns once the load is done.
+        pending = st.session_state.get('pending_load')
+        if pending is None or pending[1].done():
+            st.rerun()
+        st.caption(f"Showing the first {preview_rows:,} rows; the full dataset is loading in the background ({time.perf_counter() - pending[2]:.0f}s).")
+
+    def _register_upload(self, uploaded_file):
+        """Return (content hash, path on disk) for an upload, writing it only once; None if it cannot be stored.
+
+        The upload is copied into the content-addressed upload store in chunks
+        while it is hashed, so the bytes are never duplicated in memory. The
+        result is reused while Streamlit reports the same `file_id`, so an
+        unchanged upload costs neither a rehash nor a rewrite.
+        """
+        store = get_upload_store()
+        if store is None:
+            st.error("Could not store the upload: no writable upload directory (set APP_UPLOAD_DIR)")
+            return None
+        file_id = getattr(uploaded_file, 'file_id', None)
+        last = st.session_state.get('last_upload')
+        # Refreshing the entry's age keeps it from expiring while the session uses it.
+        if file_id is not None and last and last[0] == file_id and store.touch(last[2]):
+            return last[1], last[2]
+        try:
+            digest, file_path = store.put(uploaded_file, uploaded_file.name)
+        except OSError as e:
+            st.error(f"Could not store the upload: {e}")
+            return None
+        st.session_state.last_upload = (file_id, digest, file_path)
+        return digest, file_path
+
+    def _pick_sheet(self, agent, digest, file_path):
+        """Let the user choose the worksheet of a multi-sheet workbook; None for other files."""
+        if not ingest.is_excel(file_path):
+            return None
+        # Listing sheets only reads the workbook index; remember it per upload anyway.
+        sheet_lists = st.session_state.setdefault('sheet_lists', {})
+        if digest not in sheet_lists:
+            try:
+                sheet_lists[digest] = agent.list_sheets(file_path)
+            except Exception:
+                sheet_lists[digest] = []
+        sheets = sheet_lists[digest]
+        if len(sheets) <= 1:
+            return None
+        return st.selectbox("Worksheet", sheets, key=f"sheet_{digest[:12]}", help="Only the selected sheet is loaded")
+
+    def _pick_source(self, agent, digest, file_path):
+        """Loading options for an upload: worksheet, SQLite table or query, the columns to read and a row filter."""
+        options = {}
+        sheet_name = self._pick_sheet(agent, digest, file_path)
+        if sheet_name is not None:
+            options['sheet_name'] = sheet_name
+        if ingest.is_sqlite(file_path):
+            table_lists = st.session_state.setdefault('table_lists', {})
+            if digest not in table_lists:
+                try:
+                    table_lists[digest] = agent.list_tables(file_path)
+                except Exception:
+                    table_lists[digest] = []
+            tables = table_lists[digest]
+            custom = "Custom SQL query…"
+            choice = st.selectbox("Table", tables + [custom], key=f"table_{digest[:12]}")
+            if choice == custom:
+                default = f'SELECT * FROM "{tables[0]}"' if tables else "SELECT 1"
+                options['query'] = st.text_area("SQL query", default, key=f"query_{digest[:12]}", help="Runs read-only against the uploaded database")
+            else:
+                options['table'] = choice
+        if ingest.is_columnar(file_path) or ingest.is_sqlite(file_path):
+            # Only the schema is read here; the chosen columns are the only ones loaded.
+            try:
+                available = agent.list_columns(file_path, options.get('table'), options.get('query'))
+            except Exception:
+                available = []
+            if len(available) > 1:
+                with st.expander(f"Columns ({len(available)})"):
+                    chosen = st.multiselect("Columns to load", available, default=available, key=f"columns_{digest[:12]}_{options.get('table')}")
+                if chosen and len(chosen) < len(available):
+                    options['columns'] = chosen
+            if available:
+                row_filter = self._pick_filter(available, f"{digest[:12]}_{options.get('table')}")
+                if row_filter:
+                    options['filters'] = [row_filter]
+        return options
+
+    def _pick_filter(self, available, key):
+        """One (column, op, value) row condition, pushed down to the reader; None when left empty."""
+        with st.expander("Row filter"):
+            col_box, op_box, value_box = st.columns([2, 1, 2])
+            column = col_box.selectbox("Column", ["(no filter)"] + available, key=f"filter_col_{key}")
+            op = op_box.selectbox("Condition", ['=', '!=', '<', '<=', '>', '>=', 'in', 'not in'], key=f"filter_op_{key}")
+            text = value_box.text_input("Value", key=f"filter_value_{key}", help="Read as the column's type, so 02139 stays text in a text column; for 'in', separate values with commas")
+        if column == "(no filter)" or not text.strip():
+            return None
+        # The reader converts the text to the column's type and reports values that do not fit.
+        if op in ('in', 'not in'):
+            return (column, op, [v.strip() for v in text.split(',') if v.strip()])
+        return (column, op, text.strip())
+
     def _display_result(self, result):
         # Results section with dark theme styling
         st.markdown(
@@ -505,8 +682,18 @@ class StreamlitInterface:
         # Render insights as Markdown so paragraphs, lists, and code blocks display correctly.
         try:
             insights_text = result.insights
-            if isinstance(insights_text, (dict, list)):
+            if not isinstance(insights_text, (str, dict, list)) and hasattr(insights_text, '__iter__'):
+                # Streamed result: render tokens as they arrive instead of waiting on a spinner.
+                insights_text = st.write_stream(insights_text)
+                # A failure is not part of the streamed text; the result flags it once the stream ends.
+                if result.error and insights_text:
+                    st.warning(f"The answer above is incomplete: {result.error}")
+                elif result.error:
+                    st.warning(f"Analysis completed with warning: {result.error}")
+            elif isinstance(insights_text, (dict, list)):
                 st.json(insights_text)
+            elif isinstance(insights_text, str) and insights_text.startswith("[ERROR]"):
+                st.warning(f"Analysis completed with warning: {insights_text}")
             elif isinstance(insights_text, str):
                 # If the model returned raw HTML, allow safe rendering; otherwise standard Markdown.
                 looks_like_html = insights_text.strip().startswith("<") and ">" in insights_text